@@ -0,0 +1,64 @@
+import os
+import sys
+import timeit
+import importlib.util
+
+from typing import Callable
+
+root_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+plugins_dir = os.path.join(root_dir, 'src', 'arknights')
+
+# 需要 core 的脚本请在 Amiya-Bot 根目录下运行，插件以包的形式导入（如 stage.main）
+sys.path.insert(0, os.getcwd())
+sys.path.insert(1, plugins_dir)
+
+
+def load_module(name: str, path: str):
+    '''
+    按文件路径单独导入插件内不依赖 core 的模块，不触发插件的 __init__
+    '''
+    spec = importlib.util.spec_from_file_location(name, os.path.join(plugins_dir, path))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+
+    return module
+
+
+def open_gamedata():
+    '''
+    使用 Amiya-Bot 已下载的游戏数据，未解压时直接从 gamedata.zip 中读取
+    '''
+    if not os.path.exists('resource/gamedata/version.txt'):
+        sys.exit('resource/gamedata is not available, run this script in the Amiya-Bot root directory.')
+
+    from core.resource.arknightsGameData import ArknightsConfig, ArknightsGameData
+    from arknightsGameData.builder.common import JsonData
+    from arknightsGameData.builder.archive import GameDataArchive, extract_dest
+    from arknightsGameData.builder.operatorBuilder import OperatorCache
+
+    if not os.path.exists(f'{extract_dest}/excel'):
+        JsonData.archive = GameDataArchive.open()
+
+    with open('resource/gamedata/version.txt', mode='r', encoding='utf-8') as file:
+        ArknightsGameData.version = file.read().strip('\n') or 'none'
+
+    ArknightsConfig.initialize()
+    OperatorCache.clear(ArknightsGameData.version)
+
+
+def measure(func: Callable, number: int, repeat: int = 5):
+    '''
+    返回单次调用的最短耗时（毫秒）
+    '''
+    return min(timeit.repeat(func, number=number, repeat=repeat)) / number * 1000
+
+
+def compare(title: str, old: Callable, new: Callable, number: int = 100, repeat: int = 5):
+    old_ms = measure(old, number, repeat)
+    new_ms = measure(new, number, repeat)
+
+    print(f'{title}')
+    print(f'    old: {old_ms:10.4f} ms')
+    print(f'    new: {new_ms:10.4f} ms    x{old_ms / new_ms:.1f}')
+
+    return old_ms, new_ms
@@ -0,0 +1,182 @@
+'''
+寻访模拟：旧的逐抽 random.choices + 逐抽统计，与 GachaEngine 纯 Python 路径和 numpy 路径的对比
+卡池按常规 UP 池构造：六星 2 名 UP 占 50%，五星 3 名 UP 占 50%，其余为填充干员
+'''
+
+import random
+
+from common import load_module, compare
+
+gacha_engine = load_module('gacha_engine', 'gacha/utils/gacha_engine.py')
+
+rarity_range = {6: 2, 5: 8, 4: 50, 3: 40, 2: 0, 1: 0}
+
+
+def build_pool(pickup: int, fillin: int, up_rate: float, rarity: int):
+    pool = {}
+    for i in range(pickup):
+        pool[f'UP{rarity}-{i}'] = up_rate / pickup
+    for i in range(fillin):
+        pool[f'OP{rarity}-{i}'] = (1 - up_rate) / fillin
+    return pool
+
+
+operator_pool = {
+    6: build_pool(2, 60, 0.5, 6),
+    5: build_pool(3, 100, 0.5, 5),
+    4: build_pool(0, 80, 0, 4),
+    3: build_pool(0, 20, 0, 3),
+    2: {},
+    1: {},
+}
+
+
+class OldGacha:
+    '''
+    原先 GachaBuilder 中的 start_gacha、get_rates、choose_operator 与结果统计
+    '''
+
+    def __init__(self, break_even: int = 0):
+        self.break_even = break_even
+
+    def get_rates(self):
+        rates = rarity_range.copy()
+
+        break_even_rate = rates[6]
+
+        if self.break_even > 50:
+            break_even_rate += (self.break_even - 50) * 2
+
+        shift_up_amount = break_even_rate - rates[6]
+        rates[6] = break_even_rate
+
+        for i in range(1, 5):
+            if shift_up_amount >= rates[i]:
+                shift_up_amount -= rates[i]
+                rates[i] = 0
+            else:
+                rates[i] -= shift_up_amount
+                break
+        return rates
+
+    def start_gacha(self, times):
+        operators = []
+
+        for i in range(0, times):
+            self.break_even += 1
+
+            rates = self.get_rates()
+
+            rates_keys = list(rates.keys())
+            rates_weight = list(rates.values())
+
+            rarity = random.choices(rates_keys, weights=rates_weight, k=1)[0]
+
+            if rarity == 6:
+                self.break_even = 0
+            operator = self.choose_operator(rarity)
+            operators.append({'rarity': rarity, 'name': operator})
+
+        return operators
+
+    @staticmethod
+    def choose_operator(rarity):
+        char_pool = operator_pool[rarity]
+
+        names = list(char_pool.keys())
+        weights = list(char_pool.values())
+
+        return random.choices(names, weights=weights, k=1)[0]
+
+    def run(self, times):
+        operators = self.start_gacha(times)
+
+        rarity_sum = [0, 0, 0, 0]
+        high_star = {5: {}, 6: {}}
+
+        ten_gacha = []
+        purple_pack = 0
+        multiple_rainbow = {}
+        for item in operators:
+            rarity = item['rarity']
+            name = item['name']
+
+            rarity_sum[rarity - 3] += 1
+
+            if rarity >= 5:
+                if name not in high_star[rarity]:
+                    high_star[rarity][name] = 0
+                high_star[rarity][name] += 1
+
+            ten_gacha.append(rarity)
+            if len(ten_gacha) >= 10:
+                five = ten_gacha.count(5)
+                six = ten_gacha.count(6)
+
+                if five == 0 and six == 0:
+                    purple_pack += 1
+
+                if six > 1:
+                    if six not in multiple_rainbow:
+                        multiple_rainbow[six] = 0
+                    multiple_rainbow[six] += 1
+                ten_gacha = []
+
+        box_map = {}
+        for item in operators:
+            name = item['name']
+            if name in box_map:
+                box_map[name][2] += 1
+            else:
+                box_map[name] = [name, item['rarity'], 1]
+
+        return rarity_sum, high_star, purple_pack, multiple_rainbow, box_map
+
+
+def new_run(engine, times):
+    result, _ = engine.simulate(times, 0)
+
+    return result.rarity_sum(), result.high_star(), result.ten_gacha(), result.box_counts()
+
+
+def check_same_sequence():
+    '''
+    纯 Python 路径在相同种子下与旧的逐抽模拟得到相同的结果，需在关闭 numpy 路径后调用
+    '''
+    random.seed(2024)
+    old = OldGacha().start_gacha(1000)
+
+    random.seed(2024)
+    result, _ = gacha_engine.GachaEngine(rarity_range, operator_pool).simulate(1000, 0)
+
+    assert [item['rarity'] for item in old] == list(result.rarities)
+    assert [item['name'] for item in old] == list(result.names)
+
+
+if __name__ == '__main__':
+    engine = gacha_engine.GachaEngine(rarity_range, operator_pool)
+
+    # 先关闭 numpy 路径，比较纯 Python 的实现
+    gacha_engine.numpy_threshold = float('inf')
+
+    check_same_sequence()
+
+    for times, number in [(10, 2000), (300, 100), (10000, 5)]:
+        compare(
+            f'{times} pulls, python',
+            lambda: OldGacha().run(times),
+            lambda: new_run(engine, times),
+            number=number,
+        )
+
+    if gacha_engine.np is None:
+        print('numpy is not installed, skip the numpy path.')
+    else:
+        gacha_engine.numpy_threshold = 100
+        for times, number in [(300, 100), (10000, 5)]:
+            compare(
+                f'{times} pulls, numpy',
+                lambda: OldGacha().run(times),
+                lambda: new_run(engine, times),
+                number=number,
+            )
@@ -0,0 +1,61 @@
+'''
+游戏数据初始化：完整解析（init_enemies、init_stages、init_operators、init_materials）与读取快照的对比
+快照写入临时目录，不会覆盖 resource/gamedata/snapshot.pkl
+'''
+
+import os
+import tempfile
+
+from common import open_gamedata, compare
+
+open_gamedata()
+
+from core.resource.arknightsGameData import ArknightsGameData
+from arknightsGameData.builder import (
+    init_enemies,
+    init_stages,
+    init_operators,
+    init_materials,
+    load_snapshot,
+    save_snapshot,
+)
+from arknightsGameData.builder import snapshot
+from arknightsGameData.builder.common import JsonData
+from arknightsGameData.builder.snapshot import GameDataSnapshot
+
+
+def rebuild():
+    JsonData.clear_cache()
+
+    cls = ArknightsGameData
+    cls.enemies = init_enemies()
+    cls.stages, cls.stages_map, cls.side_story_map = init_stages()
+    cls.operators, cls.tokens, cls.birthday = init_operators()
+    cls.materials, cls.materials_map, cls.materials_made, cls.materials_source = init_materials()
+
+
+def load():
+    # 启动时需要先计算 gamedata.zip 的摘要，计入读取快照的耗时
+    data = GameDataSnapshot.load(GameDataSnapshot.get_key(ArknightsGameData.version))
+    assert data is not None
+
+    load_snapshot(ArknightsGameData, data)
+
+
+if __name__ == '__main__':
+    with tempfile.TemporaryDirectory() as temp:
+        snapshot.snapshot_file = os.path.join(temp, 'snapshot.pkl')
+
+        rebuild()
+        save_snapshot(ArknightsGameData, GameDataSnapshot.get_key(ArknightsGameData.version))
+
+        operators = len(ArknightsGameData.operators)
+        stages = len(ArknightsGameData.stages)
+
+        load()
+        assert len(ArknightsGameData.operators) == operators
+        assert len(ArknightsGameData.stages) == stages
+
+        print(f'snapshot: {os.path.getsize(snapshot.snapshot_file) // 1024} KB, {operators} operators, {stages} stages')
+
+        compare('gamedata initialize', rebuild, load, number=1, repeat=3)
@@ -0,0 +1,63 @@
+'''
+干员查询关键词匹配：旧的 get_longest 逐个判断关键词，与 KeywordIndex（Aho-Corasick 自动机）的对比
+关键词取自角色表的干员名、英文名，皮肤表的皮肤名与势力名
+'''
+
+import random
+
+from common import open_gamedata, load_module, compare
+
+open_gamedata()
+
+from arknightsGameData.builder import get_character_table
+from arknightsGameData.builder.common import JsonData
+
+KeywordIndex = load_module('keyword_index', 'arknightsGameData/builder/keywordIndex.py').KeywordIndex
+
+character = get_character_table()
+skins = JsonData.get_json_data('skin_table')['charSkins']
+teams = JsonData.get_json_data('handbook_team_table')
+
+sources = {
+    'name': [n['name'] for n in character.values()] + [n['appellation'] for n in character.values()],
+    'skin_key': list(
+        dict.fromkeys(n['displaySkin']['skinName'] for n in skins.values() if n['displaySkin']['skinName'])
+    ),
+    'group_key': [n['powerName'] for n in teams.values()],
+}
+
+random.seed(2024)
+queries = []
+for words in sources.values():
+    for word in random.sample(words, min(len(words), 100)):
+        queries.append(f'兔兔查看{word}的资料')
+queries += ['兔兔今天天气怎么样', '兔兔签到', '兔兔查看精二立绘']
+
+
+def get_longest(text: str, items: list):
+    # 与 operatorArchives.operatorCore.get_longest 一致
+    res = ''
+    for item in items:
+        if item in text and len(item) >= len(res):
+            res = item
+
+    return res
+
+
+indexes = {key: KeywordIndex(words) for key, words in sources.items()}
+
+
+def old():
+    return [[get_longest(text, words) for words in sources.values()] for text in queries]
+
+
+def new():
+    return [[index.longest(text) for index in indexes.values()] for text in queries]
+
+
+if __name__ == '__main__':
+    assert old() == new()
+
+    print(f'{len(queries)} queries, keywords: { {key: len(words) for key, words in sources.items()} }')
+
+    compare(f'keyword match, {len(queries)} queries', old, new, number=5)
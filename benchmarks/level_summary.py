@@ -0,0 +1,91 @@
+'''
+关卡文件解析：旧的逐个读取完整关卡 JSON 并统计敌人，与 read_level_summary 顺序执行及线程池执行的对比
+'''
+
+from concurrent.futures import ThreadPoolExecutor
+
+from common import open_gamedata, compare
+
+open_gamedata()
+
+from arknightsGameData.builder import read_level_summary
+from arknightsGameData.builder.common import JsonData
+
+enemies_info = JsonData.get_json_data('enemy_handbook_table')
+stage_data = JsonData.get_json_data('stage_table')['stages']
+
+level_ids = [(item['levelId'] or 'no_level').lower() for item in stage_data.values() if item['name']]
+
+
+def old_level_data(level_id: str):
+    '''
+    原先 init_stages 中对每个关卡的处理，完整的关卡数据会放入 JsonData 的缓存
+    '''
+    try:
+        level_data = JsonData.get_json_data(level_id, folder='levels')
+    except Exception:
+        return None
+
+    if level_data:
+        enemies = {}
+        for wave in level_data['waves']:
+            for fragment in wave['fragments']:
+                for action in fragment['actions']:
+                    if action['key'] not in enemies_info['enemyData'] or action['actionType'] != 'SPAWN':
+                        continue
+
+                    if action['key'] not in enemies:
+                        enemies[action['key']] = {**enemies_info['enemyData'][action['key']], 'count': 0}
+
+                    enemies[action['key']]['count'] += action['count']
+
+        level_data['enemiesCount'] = enemies
+
+    return level_data
+
+
+def new_level_data(level_summary: dict):
+    if level_summary is None:
+        return None
+
+    level_data = {}
+    if level_summary:
+        enemies = {}
+        for key, count in level_summary['enemiesCount'].items():
+            if key in enemies_info['enemyData']:
+                enemies[key] = {**enemies_info['enemyData'][key], 'count': count}
+
+        level_data = {**level_summary, 'enemiesCount': enemies}
+
+    return level_data
+
+
+def old():
+    JsonData.clear_cache()
+    return [old_level_data(level_id) for level_id in level_ids]
+
+
+def new_sequential():
+    return [new_level_data(read_level_summary(level_id)) for level_id in level_ids]
+
+
+def new_threaded():
+    with ThreadPoolExecutor() as executor:
+        return [new_level_data(item) for item in executor.map(read_level_summary, level_ids)]
+
+
+if __name__ == '__main__':
+    for old_item, new_item in zip(old(), new_threaded()):
+        if old_item is None or new_item is None:
+            assert old_item is new_item
+        elif old_item:
+            assert old_item['enemiesCount'] == new_item['enemiesCount']
+
+    # 旧的写法会把关卡文件留在缓存中
+    JsonData.clear_cache()
+    JsonData.get_json_data('enemy_handbook_table')
+
+    print(f'{len(level_ids)} level files')
+
+    compare('level files, sequential', old, new_sequential, number=1, repeat=3)
+    compare('level files, thread pool', old, new_threaded, number=1, repeat=3)
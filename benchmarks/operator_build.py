@@ -0,0 +1,126 @@
+'''
+干员构建中的档案、出身与画师查询：旧的逐个干员扫描数据表，与预先建立 origin_map、profile_map 后查表的对比
+'''
+
+import re
+
+from common import open_gamedata, compare, measure
+
+open_gamedata()
+
+from arknightsGameData.builder import init_operators, get_character_table
+from arknightsGameData.builder.common import JsonData
+from arknightsGameData.builder.operatorBuilder import OperatorImpl, Collection
+
+operators, _, _ = init_operators()
+operators = list(operators.values())
+
+character = get_character_table()
+stories_data = JsonData.get_json_data('handbook_info_table')['handbookDict']
+sp_char_groups = JsonData.get_json_data('char_meta_table')['spCharGroups']
+
+
+def old_stories(code: str):
+    stories = []
+    if code in stories_data:
+        for item in stories_data[code]['storyTextAudio']:
+            stories.append({'story_title': item['storyTitle'], 'story_text': item['stories'][0]['storyText']})
+    return stories
+
+
+def old_lookups(operator: OperatorImpl):
+    '''
+    原先 OperatorImpl 的 __race、__origin、__drawer 与 init_operators 中生日、性别的查询
+    '''
+    race = sex = birthday = origin = drawer = None
+
+    for story in old_stories(operator.id):
+        if story['story_title'] == '基础档案':
+            r = re.search(r'\n【种族】.*?(\S+).*?\n', story['story_text'])
+            if r:
+                race = str(r.group(1))
+            break
+
+    for oid, group in sp_char_groups.items():
+        for item in group:
+            if item == operator.id:
+                origin = character[oid]['name']
+
+    skins_list = OperatorImpl.skins.__wrapped__(operator)
+    if skins_list:
+        drawer = skins_list[0]['skin_drawer']
+
+    for story in old_stories(operator.id):
+        if story['story_title'] == '基础档案':
+            r = re.search(r'\n【(生日|出厂日)】.*?(\d+)月(\d+)日\n', story['story_text'])
+            if r:
+                birthday = f'{int(r.group(2))}月{int(r.group(3))}日'
+
+            r = re.search(r'性别】(\S+)(\s+)?\n', story['story_text'])
+            if r:
+                sex = r.group(1)
+
+            break
+
+    return race, sex, birthday, origin, drawer
+
+
+def build_indexes():
+    origin_map = {}
+    for origin_id, group in sp_char_groups.items():
+        for char_id in group:
+            origin_map[char_id] = origin_id
+
+    profile_map = {}
+    for char_id, item in stories_data.items():
+        for story in item['storyTextAudio']:
+            if story['storyTitle'] == '基础档案':
+                profile_map[char_id] = story['stories'][0]['storyText']
+                break
+
+    return origin_map, profile_map
+
+
+def new_lookups(operator: OperatorImpl, origin_map: dict, profile_map: dict):
+    race = sex = birthday = origin = drawer = None
+
+    profile = profile_map.get(operator.id, '')
+    if profile:
+        r = re.search(r'\n【种族】.*?(\S+).*?\n', profile)
+        if r:
+            race = str(r.group(1))
+
+        r = re.search(r'性别】(\S+)(\s+)?\n', profile)
+        if r:
+            sex = r.group(1)
+
+    if operator.id in origin_map:
+        origin = character[origin_map[operator.id]]['name']
+
+    skins_list = sorted(Collection.get_skins_list(operator.id), key=lambda n: n['displaySkin']['getTime'])
+    if skins_list:
+        drawer_list = skins_list[0]['displaySkin']['drawerList']
+        drawer = drawer_list[-1] if drawer_list else ''
+
+    r = re.search(r'\n【(生日|出厂日)】.*?(\d+)月(\d+)日\n', profile)
+    if r:
+        birthday = f'{int(r.group(2))}月{int(r.group(3))}日'
+
+    return race, sex, birthday, origin, drawer
+
+
+def old():
+    return [old_lookups(item) for item in operators]
+
+
+def new():
+    origin_map, profile_map = build_indexes()
+    return [new_lookups(item, origin_map, profile_map) for item in operators]
+
+
+if __name__ == '__main__':
+    assert old() == new()
+
+    print(f'{len(operators)} operators, init_operators: {measure(init_operators, number=1, repeat=3):.1f} ms')
+
+    compare('profile, origin and drawer lookups', old, new, number=3)
@@ -0,0 +1,101 @@
+'''
+公招查询：旧的按标签扫描全部干员再逐个组合筛选，与预先计算的标签组合表的对比
+查询为从公招标签中随机抽取的 5 个标签
+'''
+
+import random
+
+from common import open_gamedata, compare
+
+open_gamedata()
+
+from core.util import all_match
+from core.resource.arknightsGameData import ArknightsGameData
+from arknightsGameData.builder import init_operators
+from recruit.main import Recruit, find_combinations
+
+ArknightsGameData.operators, _, _ = init_operators()
+Recruit.init_combinations_table()
+
+random.seed(2024)
+queries = [random.sample(list(Recruit.tags_bit.keys()), 5) for _ in range(300)]
+
+
+def find_operator_tags_by_tags(tags, max_rarity):
+    res = []
+    for name, item in ArknightsGameData.operators.items():
+        if not item.is_recruit or item.rarity > max_rarity:
+            continue
+        for tag in item.tags:
+            if tag in tags:
+                res.append(
+                    {
+                        'operator_id': item.id,
+                        'operator_name': name,
+                        'operator_rarity': item.rarity,
+                        'operator_tags': tag,
+                    }
+                )
+
+    return sorted(res, key=lambda n: -n['operator_rarity'])
+
+
+def old_find_groups(tags):
+    '''
+    原先 Recruit.action 中的查询过程
+    '''
+    max_rarity = 6 if '高级资深干员' in tags else 5
+
+    groups = []
+    result = find_operator_tags_by_tags(tags, max_rarity=max_rarity)
+    if result:
+        operators = {}
+        for item in result:
+            name = item['operator_name']
+            if name not in operators:
+                operators[name] = item
+            else:
+                operators[name]['operator_tags'] += item['operator_tags']
+
+        for comb in [tags] if len(tags) == 1 else find_combinations(tags):
+            lst = []
+            max_r = 0
+            for name, item in operators.items():
+                rarity = item['operator_rarity']
+                if all_match(item['operator_tags'], comb):
+                    if rarity == 6 and '高级资深干员' not in comb:
+                        continue
+                    if rarity >= 4 or rarity == 1:
+                        if rarity > max_r:
+                            max_r = rarity
+                        lst.append(item)
+                    else:
+                        break
+            else:
+                if lst:
+                    groups.append({'tags': comb, 'max_rarity': max_r, 'operators': lst})
+
+    return sorted(groups, key=lambda n: (-len(n['tags']), -n['max_rarity']))
+
+
+def group_keys(groups):
+    return [(tuple(n['tags']), n['max_rarity'], sorted(m['operator_name'] for m in n['operators'])) for n in groups]
+
+
+if __name__ == '__main__':
+    # 旧的写法按子串匹配标签（如“支援”也会匹配“支援机械”），这里只统计结果不同的查询数量
+    different = len(
+        [tags for tags in queries if group_keys(old_find_groups(tags)) != group_keys(Recruit.find_groups(tags))]
+    )
+
+    print(
+        f'{len(Recruit.tags_bit)} tags, {len(Recruit.combinations_table)} combinations, '
+        f'{different} of {len(queries)} queries differ from substring matching'
+    )
+
+    compare(
+        f'recruit query, {len(queries)} queries',
+        lambda: [old_find_groups(tags) for tags in queries],
+        lambda: [Recruit.find_groups(tags) for tags in queries],
+        number=3,
+    )
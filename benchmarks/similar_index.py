@@ -0,0 +1,69 @@
+'''
+模糊匹配：旧的对全部词表调用 find_most_similar，与 SimilarIndex 按字符倒排剪枝候选词的对比
+词表取自物品表、敌人图鉴与角色表，查询为随机替换或删去一个字的名称
+'''
+
+import random
+
+from common import open_gamedata, compare
+
+open_gamedata()
+
+from core.util import find_most_similar
+from arknightsGameData.builder import get_character_table
+from arknightsGameData.builder.common import JsonData
+from arknightsGameData.builder.similarIndex import SimilarIndex
+
+vocabularies = {
+    'materials': list(dict.fromkeys(n['name'].strip() for n in JsonData.get_json_data('item_table')['items'].values())),
+    'enemies': list(
+        dict.fromkeys(n['name'] for n in JsonData.get_json_data('enemy_handbook_table')['enemyData'].values())
+    ),
+    'operators': list(dict.fromkeys(n['name'] for n in get_character_table().values())),
+}
+
+random.seed(2024)
+
+
+def typo(word: str):
+    chars = list(word)
+    index = random.randrange(len(chars))
+    if len(chars) > 2 and random.random() < 0.5:
+        chars.pop(index)
+    else:
+        chars[index] = random.choice('的一是了我不人在他有这个上们来到时大地为子中你说生国年着就那和要')
+    return ''.join(chars)
+
+
+# 查询至少保留原词的一个字，与整个词表都没有相同字符的查询不在比较范围内
+queries = {}
+for name, words in vocabularies.items():
+    samples = random.sample([n for n in words if len(n) >= 2], 50)
+    queries[name] = [typo(word) for word in samples]
+
+
+if __name__ == '__main__':
+    for name, words in vocabularies.items():
+        index = SimilarIndex(words, cache_size=0)
+
+        assert [find_most_similar(text, words) for text in queries[name]] == [
+            index.find_most_similar(text) for text in queries[name]
+        ]
+
+        candidates = sum(len(index.get_candidates(text)) for text in queries[name]) / len(queries[name])
+        print(f'{name}: {len(words)} words, {candidates:.1f} candidates per query')
+
+        compare(
+            f'{name}, {len(queries[name])} queries',
+            lambda: [find_most_similar(text, words) for text in queries[name]],
+            lambda: [index.find_most_similar(text) for text in queries[name]],
+            number=3,
+        )
+
+    cached = SimilarIndex(vocabularies['operators'])
+    compare(
+        'operators, repeated queries (LRU cache)',
+        lambda: [find_most_similar(text, vocabularies['operators']) for text in queries['operators']],
+        lambda: [cached.find_most_similar(text) for text in queries['operators']],
+        number=3,
+    )
@@ -0,0 +1,91 @@
+'''
+关卡查询：旧的每次读取 sxys.json + any_match + jieba 分词，与关键词自动机的对比
+关卡代号按主线和活动的格式生成，数量与实际游戏数据相近
+'''
+
+import os
+import re
+import json
+import tempfile
+
+import jieba
+
+from common import plugins_dir, load_module, compare
+
+KeywordIndex = load_module('keyword_index', 'arknightsGameData/builder/keywordIndex.py').KeywordIndex
+segment = load_module('stage_index', 'stage/stageIndex.py').segment
+
+sxys_file = os.path.join(plugins_dir, 'stage/sxys.json')
+
+
+def remove_punctuation(text: str):
+    return re.sub(r'[^\w-]', '', text)
+
+
+def any_match(text: str, items: list):
+    for item in items:
+        if item in text:
+            return item
+
+
+stages = [f'{chapter}-{n}' for chapter in range(0, 15) for n in range(1, 23)]
+stages += [
+    f'{prefix}-{n}'
+    for prefix in ['CF', 'IW', 'SV', 'RI', 'BI', 'WD', 'GT', 'OF', 'SA', 'DM', 'MB']
+    for n in range(1, 11)
+]
+stages += [f'S{chapter}-{n}' for chapter in range(2, 8) for n in range(1, 13)]
+side_stories = ['骑兵与猎人', '将进酒', '风雪过境', '画中人', '孤岛风云', '危机合约']
+
+queries = [
+    '地图1-7',
+    '关卡CF-9突袭',
+    '地图将进酒',
+    '关卡10-15磨难',
+    '地图寻觅道路',
+    '地图失落的长生军',
+    '关卡没有的关卡',
+]
+
+
+def old_query(text: str):
+    with open(sxys_file, mode='r', encoding='utf-8') as f:
+        sxys_maps: dict = json.load(f)
+
+    no_punctuation = {remove_punctuation(item): key for item, key in sxys_maps.items()}
+    sxys_titles = list(sxys_maps.keys()) + list(no_punctuation.keys())
+    if any_match(text, sxys_titles):
+        return
+
+    return jieba.lcut(remove_punctuation(text).upper())
+
+
+with open(sxys_file, mode='r', encoding='utf-8') as f:
+    sxys_maps: dict = json.load(f)
+
+sxys_index = KeywordIndex(list(sxys_maps.keys()) + [remove_punctuation(item) for item in sxys_maps.keys()])
+stages_index = KeywordIndex(stages + side_stories)
+
+
+def new_query(text: str):
+    if sxys_index.first(text):
+        return
+
+    return segment(stages_index, remove_punctuation(text).upper())
+
+
+if __name__ == '__main__':
+    with tempfile.TemporaryDirectory() as temp:
+        userdict = os.path.join(temp, 'stages.txt')
+        with open(userdict, mode='w', encoding='utf-8') as file:
+            file.write('\n'.join([f'{name} 500 n' for name in stages + side_stories]))
+
+        jieba.setLogLevel(60)
+        jieba.load_userdict(userdict)
+
+    compare(
+        f'stage query, {len(queries)} queries per call',
+        lambda: [old_query(text) for text in queries],
+        lambda: [new_query(text) for text in queries],
+        number=200,
+    )
@@ -0,0 +1,67 @@
+'''
+技能描述模板：旧的每次整理文本并逐个 replace，与预编译模板单次渲染的对比
+使用 skill_table 中全部技能各等级的描述与 blackboard
+'''
+
+import re
+
+from common import open_gamedata, compare
+
+open_gamedata()
+
+from core.util import integer
+from arknightsGameData.builder.common import JsonData
+from arknightsGameData.builder.operatorBuilder import html_tag_format, parse_template, compile_template
+
+skill_table = JsonData.get_json_data('skill_table')
+
+samples = []
+for skill in skill_table.values():
+    for level in skill['levels']:
+        if level['description']:
+            samples.append((level['blackboard'], level['description']))
+
+
+def old_parse_template(blackboard: list, description: str):
+    formatter = {'0%': lambda v: f'{round(v * 100)}%'}
+    data_dict = {item['key']: item.get('valueStr') or item.get('value') for index, item in enumerate(blackboard)}
+
+    desc = html_tag_format(description.replace('>-{', '>{'))
+    format_str = re.findall(r'({(\S+?)})', desc)
+    if format_str:
+        for desc_item in format_str:
+            key = desc_item[1].split(':')
+            fd = key[0].lower().strip('-')
+            if fd in data_dict:
+                value = integer(data_dict[fd])
+
+                if len(key) >= 2 and key[1] in formatter and value:
+                    value = formatter[key[1]](value)
+
+                desc = desc.replace(desc_item[0], f' [cl {value}@#174CC6 cle] ')
+
+    return desc
+
+
+def old():
+    return [old_parse_template(*n) for n in samples]
+
+
+def new():
+    return [parse_template(*n) for n in samples]
+
+
+def new_uncached():
+    compile_template.cache_clear()
+    return new()
+
+
+if __name__ == '__main__':
+    mismatched = [n for n in samples if old_parse_template(*n) != parse_template(*n)]
+    assert not mismatched, mismatched[:3]
+
+    fallback = len([n for n in samples if compile_template(n[1]).fallback])
+    print(f'{len(samples)} skill descriptions, {fallback} use the replace fallback')
+
+    compare('skill descriptions, templates compiled', old, new, number=3)
+    compare('skill descriptions, including compile', old, new_uncached, number=3)
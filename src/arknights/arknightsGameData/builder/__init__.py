@@ -3,22 +3,61 @@ import re
 import json
 
 from typing import List, Dict
+from concurrent.futures import ThreadPoolExecutor
 from amiyabot import event_bus
-from amiyabot.util import extract_zip
-from collections import Counter
 from core.resource.arknightsGameData import ArknightsGameData, ArknightsGameDataResource, STR_DICT_MAP, STR_DICT_LIST
 from core.database.bot import OperatorIndex
-from core.util import remove_xml_tag, remove_punctuation, sorted_dict
+from core.util import TimeRecorder, integer, remove_xml_tag, remove_punctuation, sorted_dict
 from core import AmiyaBotPluginInstance, GitAutomation, log
 
 from .common import ArknightsConfig, JsonData, SkinsPathCache, gamedata_path
-from .operatorBuilder import OperatorImpl, TokenImpl, Collection, parse_template
+from .operatorBuilder import OperatorImpl, OperatorCache, TokenImpl, Collection, parse_template
+from .snapshot import GameDataSnapshot
+from .archive import GameDataArchive
+from .similarIndex import SimilarIndexes
+from .keywordIndex import KeywordIndex
 from .wiki import PRTS
 from .sklandApi import *
 
 curr_dir = os.path.dirname(__file__)
 repo = 'https://gitee.com/amiya-bot/amiya-bot-assets.git'
 
+enemy_attr_map = {
+    'attributes.maxHp': 'maxHp',
+    'attributes.atk': 'atk',
+    'attributes.def': 'def',
+    'attributes.magicResistance': 'magicResistance',
+    'attributes.moveSpeed': 'moveSpeed',
+    'attributes.baseAttackTime': 'baseAttackTime',
+    'attributes.hpRecoveryPerSec': 'hpRecoveryPerSec',
+    'attributes.massLevel': 'massLevel',
+    'attributes.stunImmune': 'stunImmune',
+    'attributes.silenceImmune': 'silenceImmune',
+    'attributes.sleepImmune': 'sleepImmune',
+    'attributes.frozenImmune': 'frozenImmune',
+    'attributes.levitateImmune': 'levitateImmune',
+    'attributes.disarmedCombatImmune': 'disarmedCombatImmune',
+    'attributes.fearedImmune': 'fearedImmune',
+    'rangeRadius': 'rangeRadius',
+    'lifePointReduce': 'lifePointReduce',
+}
+enemy_attr_paths = [tuple(key.split('.')) for key in enemy_attr_map.keys()]
+enemy_attr_titles = list(enemy_attr_map.values())
+
+snapshot_fields = [
+    'enemies',
+    'stages',
+    'stages_map',
+    'side_story_map',
+    'operators',
+    'tokens',
+    'birthday',
+    'materials',
+    'materials_map',
+    'materials_made',
+    'materials_source',
+]
+
 
 class SkinIndexes:
     url_indexes: Dict[str, str] = {}
@@ -32,6 +71,7 @@ class ArknightsGameDataPluginInstance(AmiyaBotPluginInstance):
             initialize_data()
 
     def uninstall(self):
+        GameDataArchive.close()
         event_bus.unsubscribe('gameDataFetched', initialize_data)
         ArknightsGameData.initialize_methods.remove(gamedata_initialize)
 
@@ -61,6 +101,10 @@ def download_gamedata():
         log.warning(f'资源已不可用，请删除 {gamedata_path} 目录并发送“更新资源”或重启。')
         return
 
+    # 更新前需要释放 gamedata.zip 的文件句柄
+    GameDataArchive.close()
+    JsonData.archive = None
+
     GitAutomation(gamedata_path, repo).update(['--depth 1'])
 
     event_bus.publish('gameDataFetched')
@@ -71,13 +115,24 @@ def gamedata_initialize(cls: ArknightsGameData):
         if not os.path.exists('resource/gamedata/version.txt'):
             return None
 
-        extract_zip(f'{gamedata_path}/gamedata.zip', f'{gamedata_path}/gamedata', overwrite=True)
+        JsonData.clear_cache()
+        JsonData.max_size = int(bot.get_config('jsonCacheSize') or 256) * 1024 * 1024
+
+        source = bot.get_config('gamedataSource') or 'extract'
+        if source == 'extract':
+            GameDataArchive.close()
+            JsonData.archive = None
+            GameDataArchive.extract()
+        else:
+            JsonData.archive = GameDataArchive.open(use_mmap=source == 'mmap')
 
         with open('resource/gamedata/version.txt', mode='r', encoding='utf-8') as file:
             cls.version = file.read().strip('\n') or 'none'
 
         log.info(f'Initializing ArknightsGameData@{cls.version}...')
 
+        OperatorCache.clear(cls.version)
+
         with open('resource/gamedata/indexes/skinUrls.json', mode='r', encoding='utf-8') as file:
             skin_urls = json.load(file)
 
@@ -85,16 +140,70 @@ def gamedata_initialize(cls: ArknightsGameData):
             for skin_id, url in item.items():
                 SkinIndexes.url_indexes[skin_id] = url
 
-        cls.enemies = init_enemies()
-        cls.stages, cls.stages_map, cls.side_story_map = init_stages()
-        cls.operators, cls.tokens, cls.birthday = init_operators()
-        cls.materials, cls.materials_map, cls.materials_made, cls.materials_source = init_materials()
+        time_rec = TimeRecorder()
+
+        snapshot = None
+        snapshot_key = None
+        if bot.get_config('snapshot'):
+            snapshot_key = GameDataSnapshot.get_key(cls.version)
+            snapshot = GameDataSnapshot.load(snapshot_key)
+
+        if snapshot:
+            load_snapshot(cls, snapshot)
+        else:
+            cls.enemies = init_enemies()
+            cls.stages, cls.stages_map, cls.side_story_map = init_stages()
+            cls.operators, cls.tokens, cls.birthday = init_operators()
+            cls.materials, cls.materials_map, cls.materials_made, cls.materials_source = init_materials()
+
+            if snapshot_key:
+                save_snapshot(cls, snapshot_key)
 
         OperatorIndex.truncate_table()
         OperatorIndex.batch_insert([item.dict() for _, item in cls.operators.items()])
-        JsonData.clear_cache()
 
-        log.info(f'ArknightsGameData initialize completed.')
+        stats = JsonData.stats()
+        log.info(
+            f'ArknightsGameData initialize completed ({"snapshot" if snapshot else "rebuild"}: {time_rec.total()}). '
+            f'JsonData cache: {stats["tables"]} tables, {stats["total_size"] // 1024 // 1024}MB, '
+            f'{stats["hits"]} hits, {stats["misses"]} misses, {stats["evictions"]} evictions ({stats["decoder"]}).'
+        )
+
+
+def load_snapshot(cls: ArknightsGameData, snapshot: dict):
+    for field in snapshot_fields:
+        setattr(cls, field, snapshot[field])
+
+    Collection.voice_map = snapshot['voice_map']
+    Collection.skins_map = snapshot['skins_map']
+    Collection.tokens_map = cls.tokens
+
+    # 限定与不可用干员的配置可能在快照生成后发生变化，需要重新应用
+    for item in cls.operators.values():
+        item.limit = item.name in ArknightsConfig.limit
+        item.unavailable = item.name in ArknightsConfig.unavailable
+
+
+def save_snapshot(cls: ArknightsGameData, key: str):
+    GameDataSnapshot.save(
+        key,
+        {
+            **{field: getattr(cls, field) for field in snapshot_fields},
+            'voice_map': Collection.voice_map,
+            'skins_map': Collection.skins_map,
+        },
+    )
+
+
+def get_character_table():
+    '''
+    合并升变干员后的角色表，返回新的字典，不修改 JsonData 中缓存的数据表
+    缓存被淘汰后重新读取也能得到完整的角色表
+    '''
+    return {
+        **JsonData.get_json_data('character_table'),
+        **JsonData.get_json_data('char_patch_table')['patchChars'],
+    }
 
 
 def init_operators():
@@ -105,14 +214,26 @@ def init_operators():
     for item in recruit_group:
         recruit_operators += [n.strip().strip('\r') for n in item.split('/')]
 
-    operators_list = JsonData.get_json_data('character_table')
-    operators_patch_list = JsonData.get_json_data('char_patch_table')['patchChars']
+    operators_list = get_character_table()
     voice_data = JsonData.get_json_data('charword_table')
     skins_data = JsonData.get_json_data('skin_table')['charSkins']
+    stories_data = JsonData.get_json_data('handbook_info_table')['handbookDict']
+    sp_char_groups = JsonData.get_json_data('char_meta_table')['spCharGroups']
 
-    operators_list.update(operators_patch_list)
+    time_rec = TimeRecorder()
 
     Collection.clear_all()
+    Collection.character_table = operators_list
+
+    for origin_id, group in sp_char_groups.items():
+        for char_id in group:
+            Collection.origin_map[char_id] = origin_id
+
+    for char_id, item in stories_data.items():
+        for story in item['storyTextAudio']:
+            if story['storyTitle'] == '基础档案':
+                Collection.profile_map[char_id] = story['stories'][0]['storyText']
+                break
 
     for n, item in voice_data['charWords'].items():
         char_id = item['wordKey']
@@ -152,32 +273,26 @@ def init_operators():
         operators.append(operator)
 
     for item in operators:
-        for story in item.stories():
-            if story['story_title'] == '基础档案':
-                r = re.search(r'\n【(生日|出厂日)】.*?(\d+)月(\d+)日\n', story['story_text'])
-                if r:
-                    month = int(r.group(2))
-                    day = int(r.group(3))
+        r = re.search(r'\n【(生日|出厂日)】.*?(\d+)月(\d+)日\n', Collection.get_profile(item.id))
+        if r:
+            month = int(r.group(2))
+            day = int(r.group(3))
 
-                    if month not in birth:
-                        birth[month] = {}
-                    if day not in birth[month]:
-                        birth[month][day] = []
+            if month not in birth:
+                birth[month] = {}
+            if day not in birth[month]:
+                birth[month][day] = []
 
-                    item.birthday = f'{month}月{day}日'
-                    birth[month][day].append(item)
-
-                r = re.search(r'性别】(\S+)(\s+)?\n', story['story_text'])
-                if r:
-                    item.sex = r.group(1)
-
-                break
+            item.birthday = f'{month}月{day}日'
+            birth[month][day].append(item)
 
     birthdays = {}
     for month, days in birth.items():
         birthdays[month] = sorted_dict(days)
     birthdays = sorted_dict(birthdays)
 
+    log.info(f'{len(operators)} operators built, cost {time_rec.total()}.')
+
     return {item.name: item for item in operators}, Collection.tokens_map, birthdays
 
 
@@ -245,29 +360,63 @@ def init_enemies():
             enemies_data_map[item['key']] = item['value']
 
     data = {}
+    name_index = {}
     for e_id, info in enemies_info['enemyData'].items():
         name = info['name']
 
         if name == '-':
             continue
 
-        counter = Counter(data.keys())
-        if name in counter:
-            name += f'（{counter[name]}）'
-
-        item = {'info': info, 'data': enemies_data_map.get(e_id)}
+        if name in data:
+            index = name_index.get(name, 1)
+            while f'{name}（{index}）' in data:
+                index += 1
+            name_index[name] = index + 1
+            name += f'（{index}）'
+
+        item = {
+            'info': info,
+            'attr_keys': enemy_attr_titles,
+            'attr_table': build_enemy_attrs(enemies_data_map.get(e_id)),
+        }
         data[name] = data[info['enemyId']] = item
 
     return data
 
 
+def build_enemy_attrs(levels: list):
+    '''
+    将各等级的敌人数据整理为与 enemy_attr_titles 对应的数组
+    未定义的属性沿用上一等级的值
+    '''
+    table = []
+    values = [''] * len(enemy_attr_paths)
+
+    for item in levels or []:
+        detail_data = item['enemyData']
+        for index, path in enumerate(enemy_attr_paths):
+            source = detail_data
+            for key in path:
+                if key in source:
+                    source = source[key]
+
+            if source['m_defined']:
+                values[index] = integer(source['m_value'])
+
+        table.append((item['level'], tuple(values)))
+
+    return table
+
+
 def init_stages():
     activity_table = JsonData.get_json_data('activity_table')['basicInfo']
-    operators_list = JsonData.get_json_data('character_table')
+    operators_list = get_character_table()
     enemies_info = JsonData.get_json_data('enemy_handbook_table')
     stage_data = JsonData.get_json_data('stage_table')['stages']
     item_data = JsonData.get_json_data('item_table')['items']
 
+    time_rec = TimeRecorder()
+
     def is_ss(key, item):
         if item['isReplicate']:
             return False
@@ -278,76 +427,125 @@ def init_stages():
     side_story = [item for key, item in activity_table.items() if is_ss(key, item)]
     side_story.sort(key=lambda n: n['startTime'], reverse=True)
 
+    # 活动 ID 索引，按长度分组后只需截取关卡 ID 的子串查表，与逐个判断 ss_code in stage_id 的结果一致
+    side_story_index: Dict[str, List[str]] = {}
+    for ss_item in side_story:
+        if ss_item['id'] not in side_story_index:
+            side_story_index[ss_item['id']] = []
+        side_story_index[ss_item['id']].append(ss_item['name'])
+
+    side_story_id_length = sorted(set(len(n) for n in side_story_index))
+
+    def find_side_story(stage_id: str):
+        names = []
+        for length in side_story_id_length:
+            for i in range(len(stage_id) - length + 1):
+                for ss_name in side_story_index.get(stage_id[i : i + length], []):
+                    if ss_name not in names:
+                        names.append(ss_name)
+        return names
+
     stage_list: STR_DICT_MAP = {}
     stage_map: STR_DICT_LIST = {}
     side_story_map: STR_DICT_MAP = {n['name']: {} for n in side_story}
 
-    for stage_id, item in stage_data.items():
-        if not item['name']:
-            continue
+    stage_items = [(stage_id, item) for stage_id, item in stage_data.items() if item['name']]
+    level_ids = [(item['levelId'] or 'no_level').lower() for _, item in stage_items]
+
+    with ThreadPoolExecutor() as executor:
+        level_summaries = executor.map(read_level_summary, level_ids)
+
+        for (stage_id, item), level_summary in zip(stage_items, level_summaries):
+            if level_summary is None:
+                continue
+
+            level = ''
+            if '#f#' in stage_id:
+                level = '_hard'
+            if 'easy' in stage_id:
+                level = '_easy'
+            if 'tough' in stage_id:
+                level = '_tough'
+
+            stage_key = item['code'] + level
+            stage_key_name = remove_punctuation(item['name']) + level
+
+            level_data = {}
+            if level_summary:
+                enemies = {}
+                for key, count in level_summary['enemiesCount'].items():
+                    if key in enemies_info['enemyData']:
+                        enemies[key] = {**enemies_info['enemyData'][key], 'count': count}
+
+                level_data = {**level_summary, 'enemiesCount': enemies}
+
+            # 掉落信息复制后再写入 detail，不修改 JsonData 中缓存的数据表
+            if item['stageDropInfo']:
+                if item['stageDropInfo']['displayDetailRewards']:
+                    rewards = []
+                    for info in item['stageDropInfo']['displayDetailRewards']:
+                        info = {**info}
+                        if info['type'] == 'CHAR':
+                            info['detail'] = operators_list[info['id']]
+                        else:
+                            if info['id'] in item_data:
+                                info['detail'] = item_data[info['id']]
+                        rewards.append(info)
+
+                    item = {**item, 'stageDropInfo': {**item['stageDropInfo'], 'displayDetailRewards': rewards}}
+
+            stage_list[stage_id] = {**item, 'levelData': level_data, 'activity': ''}
+
+            if item['code'].startswith('GT'):
+                side_story_map['骑兵与猎人'][stage_id] = stage_list[stage_id]
+            elif item['code'].startswith('OF'):
+                side_story_map['火蓝之心'][stage_id] = stage_list[stage_id]
+            else:
+                for ss_name in find_side_story(stage_id):
+                    side_story_map[ss_name][stage_id] = stage_list[stage_id]
 
-        try:
-            level_data = JsonData.get_json_data((item['levelId'] or 'no_level').lower(), folder='levels')
-        except Exception:
-            continue
+            for key in [stage_key, stage_key_name]:
+                if key not in stage_map:
+                    stage_map[key] = []
 
-        level = ''
-        if '#f#' in stage_id:
-            level = '_hard'
-        if 'easy' in stage_id:
-            level = '_easy'
-        if 'tough' in stage_id:
-            level = '_tough'
-
-        stage_key = item['code'] + level
-        stage_key_name = remove_punctuation(item['name']) + level
-
-        if level_data:
-            enemies = {}
-            for wave in level_data['waves']:
-                for fragment in wave['fragments']:
-                    for action in fragment['actions']:
-                        if action['key'] not in enemies_info['enemyData'] or action['actionType'] != 'SPAWN':
-                            continue
-
-                        if action['key'] not in enemies:
-                            enemies[action['key']] = {**enemies_info['enemyData'][action['key']], 'count': 0}
-
-                        enemies[action['key']]['count'] += action['count']
-
-            level_data['enemiesCount'] = enemies
-
-        if item['stageDropInfo']:
-            if item['stageDropInfo']['displayDetailRewards']:
-                for info in item['stageDropInfo']['displayDetailRewards']:
-                    if info['type'] == 'CHAR':
-                        info['detail'] = operators_list[info['id']]
-                    else:
-                        if info['id'] in item_data:
-                            info['detail'] = item_data[info['id']]
-
-        stage_list[stage_id] = {**item, 'levelData': level_data, 'activity': ''}
-
-        if item['code'].startswith('GT'):
-            side_story_map['骑兵与猎人'][stage_id] = stage_list[stage_id]
-        elif item['code'].startswith('OF'):
-            side_story_map['火蓝之心'][stage_id] = stage_list[stage_id]
-        else:
-            for ss_item in side_story:
-                ss_code = ss_item['id']
-                ss_name = ss_item['name']
+                if stage_id not in stage_map[key]:
+                    stage_map[key].append(stage_id)
 
-                if ss_code in stage_id:
-                    side_story_map[ss_name][stage_id] = stage_list[stage_id]
+    log.info(f'{len(stage_list)} stages built, cost {time_rec.total()}.')
+
+    return stage_list, stage_map, side_story_map
 
-        for key in [stage_key, stage_key_name]:
-            if key not in stage_map:
-                stage_map[key] = []
 
-            if stage_id not in stage_map[key]:
-                stage_map[key].append(stage_id)
+def read_level_summary(level_id: str):
+    '''
+    读取关卡文件并只保留关卡页面需要的部分，返回 None 表示关卡文件不可用
+    '''
+    # noinspection PyBroadException
+    try:
+        level_data = JsonData.read_json_data(level_id, folder='levels')
+    except Exception:
+        return None
 
-    return stage_list, stage_map, side_story_map
+    if not level_data:
+        return {}
+
+    enemies = {}
+    for wave in level_data['waves']:
+        for fragment in wave['fragments']:
+            for action in fragment['actions']:
+                if action['actionType'] != 'SPAWN':
+                    continue
+
+                if action['key'] not in enemies:
+                    enemies[action['key']] = 0
+
+                enemies[action['key']] += action['count']
+
+    return {
+        'options': level_data.get('options'),
+        'enemyDbRefs': level_data.get('enemyDbRefs') or [],
+        'enemiesCount': enemies,
+    }
 
 
 async def get_skin_file(skin_data: dict, encode_url: bool = False):
@@ -384,3 +582,6 @@ ArknightsGameData.get_real_name = get_real_name
 ArknightsGameDataResource.get_skin_file = get_skin_file
 ArknightsGameDataResource.get_voice_file = get_voice_file
 ArknightsGameDataResource.parse_template = parse_template
+ArknightsGameDataResource.register_similar_words = SimilarIndexes.register
+ArknightsGameDataResource.find_most_similar = SimilarIndexes.find_most_similar
+ArknightsGameDataResource.build_keyword_index = KeywordIndex
@@ -0,0 +1,97 @@
+import os
+import json
+import mmap
+import zipfile
+
+from typing import Optional
+from amiyabot import log
+
+from .common import gamedata_path
+
+archive_file = f'{gamedata_path}/gamedata.zip'
+extract_dest = f'{gamedata_path}/gamedata'
+manifest_file = f'{extract_dest}/.manifest.json'
+
+
+class MappedFile(mmap.mmap):
+    # zipfile 需要 seekable()，mmap 在 Python 3.13 之前没有提供
+    def seekable(self):
+        return True
+
+
+class GameDataArchive:
+    pack: Optional[zipfile.ZipFile] = None
+    mapped: Optional[MappedFile] = None
+    file = None
+
+    @classmethod
+    def extract(cls):
+        with zipfile.ZipFile(archive_file) as pack:
+            manifest = {info.filename: [info.CRC, info.file_size] for info in pack.infolist() if not info.is_dir()}
+            last_manifest = cls.load_manifest()
+
+            if manifest == last_manifest:
+                log.info('gamedata.zip has not changed, skip extracting.')
+                return
+
+            changed = [
+                name
+                for name, item in manifest.items()
+                if last_manifest.get(name) != item or not os.path.exists(os.path.join(extract_dest, name))
+            ]
+            for name in changed:
+                pack.extract(name, extract_dest)
+
+        for name in last_manifest:
+            path = os.path.join(extract_dest, name)
+            if name not in manifest and os.path.exists(path):
+                os.remove(path)
+
+        with open(f'{manifest_file}.tmp', mode='w', encoding='utf-8') as file:
+            json.dump(manifest, file)
+
+        os.replace(f'{manifest_file}.tmp', manifest_file)
+
+        log.info(f'gamedata.zip extracted, {len(changed)} of {len(manifest)} files changed.')
+
+    @classmethod
+    def load_manifest(cls) -> dict:
+        if not os.path.exists(manifest_file):
+            return {}
+
+        # noinspection PyBroadException
+        try:
+            with open(manifest_file, mode='r', encoding='utf-8') as file:
+                return json.load(file)
+        except Exception:
+            return {}
+
+    @classmethod
+    def open(cls, use_mmap: bool = False):
+        cls.close()
+
+        if use_mmap:
+            cls.file = open(archive_file, mode='rb')
+            cls.mapped = MappedFile(cls.file.fileno(), 0, access=mmap.ACCESS_READ)
+            cls.pack = zipfile.ZipFile(cls.mapped)
+        else:
+            cls.pack = zipfile.ZipFile(archive_file)
+
+        return cls
+
+    @classmethod
+    def read(cls, name: str) -> Optional[bytes]:
+        try:
+            return cls.pack.read(name)
+        except KeyError:
+            return None
+
+    @classmethod
+    def close(cls):
+        for item in [cls.pack, cls.mapped, cls.file]:
+            if item is not None:
+                item.close()
+
+        cls.pack = None
+        cls.mapped = None
+        cls.file = None
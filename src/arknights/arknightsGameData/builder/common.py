@@ -1,12 +1,18 @@
 import os
 import json
 
+from collections import OrderedDict
 from core.resource.arknightsGameData import ArknightsConfig
 from core.database.bot import BotBaseModel, OperatorConfig
 from amiyabot import log
 from amiyabot.database import *
 from amiyabot.network.download import download_async
 
+try:
+    import orjson
+except ModuleNotFoundError:
+    orjson = None
+
 config = {
     'classes': {
         'CASTER': '术师',
@@ -88,26 +94,94 @@ def config_initialize(cls: ArknightsConfig):
 
 
 class JsonData:
-    cache = {}
+    cache: OrderedDict = OrderedDict()
+    sizes = {}
+    archive = None
+
+    max_size = 256 * 1024 * 1024
+    total_size = 0
+    hits = 0
+    misses = 0
+    evictions = 0
 
     @classmethod
     def get_json_data(cls, name: str, folder: str = 'excel'):
-        if name not in cls.cache:
-            path = f'resource/gamedata/gamedata/{folder}/{name}.json'
-            if os.path.exists(path):
-                with open(path, mode='r', encoding='utf-8') as src:
-                    cls.cache[name] = json.load(src)
-            else:
-                return {}
+        if name in cls.cache:
+            cls.hits += 1
+            cls.cache.move_to_end(name)
+            return cls.cache[name]
+
+        content = cls.read_content(name, folder)
+        if content is None:
+            return {}
+
+        cls.misses += 1
+        cls.cache[name] = json_loads(content)
+        cls.sizes[name] = len(content)
+        cls.total_size += len(content)
+
+        # 按最近使用顺序淘汰，至少保留当前读取的数据表
+        while cls.total_size > cls.max_size and len(cls.cache) > 1:
+            evicted, _ = cls.cache.popitem(last=False)
+            cls.total_size -= cls.sizes.pop(evicted)
+            cls.evictions += 1
 
         return cls.cache[name]
 
+    @classmethod
+    def read_json_data(cls, name: str, folder: str = 'excel'):
+        '''
+        读取数据表但不放入缓存，用于只需读取一次的数据（如关卡文件）
+        '''
+        content = cls.read_content(name, folder)
+        if content is None:
+            return {}
+
+        return json_loads(content)
+
+    @classmethod
+    def read_content(cls, name: str, folder: str):
+        if cls.archive:
+            return cls.archive.read(f'{folder}/{name}.json')
+
+        path = f'resource/gamedata/gamedata/{folder}/{name}.json'
+        if os.path.exists(path):
+            with open(path, mode='rb') as src:
+                return src.read()
+
     @classmethod
     def clear_cache(cls, name: str = None):
         if name:
-            del cls.cache[name]
+            if name in cls.cache:
+                del cls.cache[name]
+                cls.total_size -= cls.sizes.pop(name)
         else:
-            cls.cache = {}
+            cls.cache = OrderedDict()
+            cls.sizes = {}
+            cls.total_size = 0
+
+    @classmethod
+    def stats(cls):
+        return {
+            'tables': len(cls.cache),
+            'total_size': cls.total_size,
+            'max_size': cls.max_size,
+            'hits': cls.hits,
+            'misses': cls.misses,
+            'evictions': cls.evictions,
+            'decoder': 'orjson' if orjson else 'json',
+            'largest': sorted(cls.sizes.items(), key=lambda n: -n[1])[:5],
+        }
+
+
+def json_loads(content: bytes):
+    if orjson:
+        try:
+            return orjson.loads(content)
+        except orjson.JSONDecodeError:
+            pass
+
+    return json.loads(content)
 
 
 ArknightsConfig.initialize_methods = [config_initialize]
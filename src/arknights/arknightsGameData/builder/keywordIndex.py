@@ -0,0 +1,90 @@
+from typing import List, Dict, Tuple, Iterable
+from collections import deque
+
+
+class KeywordIndex:
+    '''
+    关键词的 Aho-Corasick 自动机，一次遍历文本即可找出所有出现在文本内的关键词
+    通过 ArknightsGameDataResource.build_keyword_index 提供给干员查询、关卡查询等插件
+    '''
+
+    def __init__(self, keywords: Iterable[str]):
+        self.goto: List[Dict[str, int]] = [{}]
+        self.fail: List[int] = [0]
+        self.output: List[List[str]] = [[]]
+
+        # 关键词在列表中第一次与最后一次出现的位置，分别用于 first 与 longest 的优先级
+        self.first_index: Dict[str, int] = {}
+        self.last_index: Dict[str, int] = {}
+        for index, word in enumerate(keywords):
+            if word:
+                if word not in self.first_index:
+                    self.first_index[word] = index
+                    self.__add(word)
+                self.last_index[word] = index
+
+        self.__build()
+
+    def __add(self, word: str):
+        state = 0
+        for char in word:
+            if char not in self.goto[state]:
+                self.goto.append({})
+                self.fail.append(0)
+                self.output.append([])
+                self.goto[state][char] = len(self.goto) - 1
+            state = self.goto[state][char]
+
+        self.output[state].append(word)
+
+    def __build(self):
+        queue = deque(self.goto[0].values())
+
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self.goto[state].items():
+                queue.append(next_state)
+
+                fail = self.fail[state]
+                while fail and char not in self.goto[fail]:
+                    fail = self.fail[fail]
+
+                self.fail[next_state] = self.goto[fail].get(char, 0)
+                self.output[next_state] = self.output[next_state] + self.output[self.fail[next_state]]
+
+    def find_all(self, text: str) -> List[Tuple[int, str]]:
+        '''
+        返回 (起始位置, 关键词) 的列表
+        '''
+        result = []
+        state = 0
+
+        for index, char in enumerate(text):
+            while state and char not in self.goto[state]:
+                state = self.fail[state]
+
+            state = self.goto[state].get(char, 0)
+            for word in self.output[state]:
+                result.append((index - len(word) + 1, word))
+
+        return result
+
+    def first(self, text: str):
+        '''
+        返回文本中出现的、在关键词列表中最靠前的关键词，与逐个调用 any_match 的结果一致
+        '''
+        found = {word for _, word in self.find_all(text)}
+        if not found:
+            return None
+
+        return min(found, key=lambda n: self.first_index[n])
+
+    def longest(self, text: str):
+        '''
+        返回文本中出现的最长的关键词，同长度的以在列表中靠后者优先，与逐个比较时 len(item) >= len(res) 的行为一致
+        '''
+        found = {word for _, word in self.find_all(text)}
+        if not found:
+            return ''
+
+        return max(found, key=lambda n: (len(n), self.last_index[n]))
@@ -1,17 +1,90 @@
 import re
+import sys
+import functools
 
-from typing import Dict
+from typing import Any, Dict, Tuple
 from core.util import remove_xml_tag, remove_punctuation, integer
 from core.resource.arknightsGameData import Operator, Token
 
 from .common import ArknightsConfig, JsonData, html_symbol
 
 
+class OperatorCache:
+    '''
+    干员派生数据（技能、模组、皮肤等）的缓存，按游戏数据版本失效
+    缓存的结果会被多次查询共享，调用方不应修改返回值
+    '''
+
+    version = None
+    cache: Dict[Tuple[str, str], Any] = {}
+    hits = 0
+    misses = 0
+
+    @classmethod
+    def get(cls, operator_id: str, view: str, builder):
+        key = (operator_id, view)
+
+        if key in cls.cache:
+            cls.hits += 1
+            return cls.cache[key]
+
+        cls.misses += 1
+        cls.cache[key] = result = builder()
+
+        return result
+
+    @classmethod
+    def clear(cls, version: str = None):
+        cls.version = version
+        cls.cache = {}
+        cls.hits = 0
+        cls.misses = 0
+
+    @classmethod
+    def stats(cls):
+        views = {}
+        for _, view in cls.cache.keys():
+            views[view] = views.get(view, 0) + 1
+
+        return {
+            'version': cls.version,
+            'entries': len(cls.cache),
+            'views': views,
+            'hits': cls.hits,
+            'misses': cls.misses,
+            'size': sum(deep_sizeof(item) for item in cls.cache.values()),
+        }
+
+
+def cached_view(func):
+    @functools.wraps(func)
+    def wrapper(self):
+        return OperatorCache.get(self.id, func.__name__, lambda: func(self))
+
+    return wrapper
+
+
+def deep_sizeof(obj, seen: set = None):
+    seen = seen if seen is not None else set()
+    if id(obj) in seen:
+        return 0
+
+    seen.add(id(obj))
+    size = sys.getsizeof(obj)
+
+    if isinstance(obj, dict):
+        size += sum(deep_sizeof(k, seen) + deep_sizeof(v, seen) for k, v in obj.items())
+    elif isinstance(obj, (list, tuple, set)):
+        size += sum(deep_sizeof(item, seen) for item in obj)
+
+    return size
+
+
 class OperatorImpl(Operator):
     def __init__(self, code: str, data: dict, is_recruit: bool = False):
         super().__init__()
         sub_classes = JsonData.get_json_data('uniequip_table')['subProfDict']
-        character_table = JsonData.get_json_data('character_table')
+        character_table = Collection.character_table
         team_table = JsonData.get_json_data('handbook_team_table')
         item_table = JsonData.get_json_data('item_table')['items']
 
@@ -66,7 +139,7 @@ class OperatorImpl(Operator):
         self.is_sp = data['isSpChar']
 
         self.__cv()
-        self.__race()
+        self.__profile()
         self.__tags()
         self.__drawer()
         self.__range()
@@ -90,6 +163,7 @@ class OperatorImpl(Operator):
             'type': self.type,
         }
 
+    @cached_view
     def detail(self):
         items = JsonData.get_json_data('item_table')['items']
 
@@ -117,6 +191,7 @@ class OperatorImpl(Operator):
 
         return detail, self.data['favorKeyFrames'][-1]['data']
 
+    @cached_view
     def tokens(self):
         token_list = []
 
@@ -144,6 +219,7 @@ class OperatorImpl(Operator):
             for item in token_list
         ]
 
+    @cached_view
     def talents(self):
         talents = []
         if self.data['talents']:
@@ -155,6 +231,7 @@ class OperatorImpl(Operator):
 
         return talents
 
+    @cached_view
     def potential(self):
         potential = []
         if self.data['potentialRanks']:
@@ -174,6 +251,7 @@ class OperatorImpl(Operator):
 
         return evolve_cost
 
+    @cached_view
     def skills(self):
         skill_data = JsonData.get_json_data('skill_table')
         range_data = JsonData.get_json_data('range_table')
@@ -269,6 +347,7 @@ class OperatorImpl(Operator):
 
         return skills, skills_id, skills_cost, skills_desc
 
+    @cached_view
     def building_skills(self):
         building_data = JsonData.get_json_data('building_data')
         building_skills = building_data['buffs']
@@ -309,6 +388,7 @@ class OperatorImpl(Operator):
                 stories.append({'story_title': item['storyTitle'], 'story_text': item['stories'][0]['storyText']})
         return stories
 
+    @cached_view
     def skins(self):
         skins = []
         skin_sort = 0
@@ -349,6 +429,7 @@ class OperatorImpl(Operator):
 
         return skins
 
+    @cached_view
     def modules(self):
         equips = JsonData.get_json_data('uniequip_table')
         equips_battle = JsonData.get_json_data('battle_equip_table')
@@ -391,18 +472,21 @@ class OperatorImpl(Operator):
                 word_data['voiceLangTypeDict'][name]['name']: item['cvName'] for name, item in voice_lang.items()
             }
 
-    def __race(self):
-        for story in self.stories():
-            if story['story_title'] == '基础档案':
-                r = re.search(r'\n【种族】.*?(\S+).*?\n', story['story_text'])
-                if r:
-                    self.race = str(r.group(1))
-                break
+    def __profile(self):
+        profile = Collection.get_profile(self.id)
+        if profile:
+            r = re.search(r'\n【种族】.*?(\S+).*?\n', profile)
+            if r:
+                self.race = str(r.group(1))
+
+            r = re.search(r'性别】(\S+)(\s+)?\n', profile)
+            if r:
+                self.sex = r.group(1)
 
     def __drawer(self):
-        skins_list = self.skins()
-        if skins_list:
-            self.drawer = skins_list[0]['skin_drawer']
+        if self.__skins_list:
+            drawer_list = self.__skins_list[0]['displaySkin']['drawerList']
+            self.drawer = drawer_list[-1] if drawer_list else ''
 
     def __range(self):
         range_data = JsonData.get_json_data('range_table')
@@ -411,11 +495,8 @@ class OperatorImpl(Operator):
             self.range = build_range(range_data[range_id]['grids'])
 
     def __origin(self, character):
-        sp_char = JsonData.get_json_data('char_meta_table')['spCharGroups']
-        for oid, group in sp_char.items():
-            for item in group:
-                if item == self.id:
-                    self.origin_name = character[oid]['name']
+        if self.id in Collection.origin_map:
+            self.origin_name = character[Collection.origin_map[self.id]]['name']
 
     def __extra(self):
         if self.id in ['char_1001_amiya2', 'char_1037_amiya3']:
@@ -458,6 +539,9 @@ class Collection:
     voice_map: dict = {}
     skins_map: dict = {}
     tokens_map: Dict[str, Token] = {}
+    origin_map: Dict[str, str] = {}
+    profile_map: Dict[str, str] = {}
+    character_table: dict = {}
 
     @classmethod
     def get_voice_list(cls, code):
@@ -467,11 +551,18 @@ class Collection:
     def get_skins_list(cls, code):
         return cls.skins_map.get(code, [])
 
+    @classmethod
+    def get_profile(cls, code):
+        return cls.profile_map.get(code, '')
+
     @classmethod
     def clear_all(cls):
         cls.voice_map = {}
         cls.skins_map = {}
         cls.tokens_map = {}
+        cls.origin_map = {}
+        cls.profile_map = {}
+        cls.character_table = {}
 
 
 def html_tag_format(text: str):
@@ -484,12 +575,85 @@ def html_tag_format(text: str):
     return remove_xml_tag(text)
 
 
+template_formatter = {'0%': lambda v: f'{round(v * 100)}%'}
+template_pattern = re.compile(r'({(\S+?)})')
+
+
+class CompiledTemplate:
+    def __init__(self, description: str):
+        desc = html_tag_format(description.replace('>-{', '>{'))
+
+        # 由字面量（str）和占位符（原文, 键名, 格式）组成的序列
+        self.tokens = []
+        self.fallback = False
+
+        placeholders = {}
+        cursor = 0
+        for match in template_pattern.finditer(desc):
+            raw, inner = match.groups()
+            key = inner.split(':')
+
+            if match.start() > cursor:
+                self.tokens.append(desc[cursor : match.start()])
+            self.tokens.append((raw, key[0].lower().strip('-'), key[1] if len(key) >= 2 else None))
+
+            placeholders[raw] = placeholders.get(raw, 0) + 1
+            cursor = match.end()
+
+        if cursor < len(desc):
+            self.tokens.append(desc[cursor:])
+
+        # 占位符原文在匹配位置以外也出现时，逐个 replace 的结果与单次渲染不一致，此时退回原有的替换方式
+        for raw, count in placeholders.items():
+            if desc.count(raw) != count:
+                self.fallback = True
+
+        self.desc = desc
+
+    def render(self, data_dict: dict):
+        result = []
+        for item in self.tokens:
+            if type(item) is str:
+                result.append(item)
+                continue
+
+            raw, fd, fmt = item
+            if fd not in data_dict:
+                result.append(raw)
+                continue
+
+            value = integer(data_dict[fd])
+            if fmt in template_formatter and value:
+                value = template_formatter[fmt](value)
+
+            value = f'{value}'
+            if '{' in value:
+                return None
+
+            result.append(f' [cl {value}@#174CC6 cle] ')
+
+        return ''.join(result)
+
+
+@functools.lru_cache(maxsize=16384)
+def compile_template(description: str):
+    return CompiledTemplate(description)
+
+
 def parse_template(blackboard: list, description: str):
-    formatter = {'0%': lambda v: f'{round(v * 100)}%'}
     data_dict = {item['key']: item.get('valueStr') or item.get('value') for index, item in enumerate(blackboard)}
 
-    desc = html_tag_format(description.replace('>-{', '>{'))
-    format_str = re.findall(r'({(\S+?)})', desc)
+    template = compile_template(description)
+    if not template.fallback:
+        desc = template.render(data_dict)
+        if desc is not None:
+            return desc
+
+    return replace_template(data_dict, template.desc)
+
+
+def replace_template(data_dict: dict, desc: str):
+    format_str = template_pattern.findall(desc)
     if format_str:
         for desc_item in format_str:
             key = desc_item[1].split(':')
@@ -497,8 +661,8 @@ def parse_template(blackboard: list, description: str):
             if fd in data_dict:
                 value = integer(data_dict[fd])
 
-                if len(key) >= 2 and key[1] in formatter and value:
-                    value = formatter[key[1]](value)
+                if len(key) >= 2 and key[1] in template_formatter and value:
+                    value = template_formatter[key[1]](value)
 
                 desc = desc.replace(desc_item[0], f' [cl {value}@#174CC6 cle] ')
 
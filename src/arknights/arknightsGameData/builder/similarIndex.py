@@ -0,0 +1,88 @@
+import time
+
+from typing import List, Dict
+from collections import OrderedDict
+from core.util import find_most_similar
+
+
+class SimilarIndex:
+    '''
+    find_most_similar 的候选剪枝索引
+    与文本没有任何相同字符的候选词相似度为 0，只需把含有相同字符的候选词（保持原顺序）交给 find_most_similar
+    '''
+
+    def __init__(self, words: List[str], cache_size: int = 256):
+        self.words = list(words)
+        self.grams: Dict[str, List[int]] = {}
+        self.cache = OrderedDict()
+        self.cache_size = cache_size
+
+        self.calls = 0
+        self.hits = 0
+        self.candidates = 0
+        self.cost = 0.0
+
+        for index, word in enumerate(self.words):
+            for char in set(word.lower()):
+                if char not in self.grams:
+                    self.grams[char] = []
+                self.grams[char].append(index)
+
+    def get_candidates(self, text: str):
+        indexes = set()
+        for char in set(text.lower()):
+            if char in self.grams:
+                indexes.update(self.grams[char])
+
+        return [self.words[i] for i in sorted(indexes)]
+
+    def find_most_similar(self, text: str):
+        self.calls += 1
+
+        if text in self.cache:
+            self.hits += 1
+            self.cache.move_to_end(text)
+            return self.cache[text]
+
+        start = time.perf_counter()
+
+        candidates = self.get_candidates(text)
+        result = find_most_similar(text, candidates)
+
+        self.cost += time.perf_counter() - start
+        self.candidates += len(candidates)
+
+        self.cache[text] = result
+        if len(self.cache) > self.cache_size:
+            self.cache.popitem(last=False)
+
+        return result
+
+    def stats(self):
+        misses = self.calls - self.hits
+        return {
+            'words': len(self.words),
+            'calls': self.calls,
+            'hits': self.hits,
+            'avg_candidates': round(self.candidates / misses, 1) if misses else 0,
+            'avg_cost': round(self.cost / misses * 1000, 3) if misses else 0,
+        }
+
+
+class SimilarIndexes:
+    indexes: Dict[str, SimilarIndex] = {}
+
+    @classmethod
+    def register(cls, name: str, words: List[str]):
+        cls.indexes[name] = SimilarIndex(words)
+
+    @classmethod
+    def find_most_similar(cls, name: str, text: str, words: List[str] = None):
+        if name in cls.indexes:
+            return cls.indexes[name].find_most_similar(text)
+
+        return find_most_similar(text, words or [])
+
+    @classmethod
+    def stats(cls):
+        return {name: item.stats() for name, item in cls.indexes.items()}
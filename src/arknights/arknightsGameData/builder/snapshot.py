@@ -0,0 +1,72 @@
+import os
+import pickle
+import hashlib
+
+from typing import Optional
+from amiyabot import log
+
+from .common import gamedata_path
+
+curr_dir = os.path.dirname(__file__)
+snapshot_file = f'{gamedata_path}/snapshot.pkl'
+
+
+def get_source_hash():
+    '''
+    构建模块源码的 md5，快照中的 OperatorImpl、Collection 等对象随代码变化，插件更新后旧的快照自动失效
+    '''
+    md5 = hashlib.md5()
+    for name in sorted(os.listdir(curr_dir)):
+        if name.endswith('.py'):
+            md5.update(name.encode())
+            with open(f'{curr_dir}/{name}', mode='rb') as file:
+                md5.update(file.read())
+
+    return md5.hexdigest()
+
+
+source_hash = get_source_hash()
+
+
+class GameDataSnapshot:
+    @staticmethod
+    def get_key(version: str):
+        md5 = hashlib.md5()
+        with open(f'{gamedata_path}/gamedata.zip', mode='rb') as file:
+            for chunk in iter(lambda: file.read(1024 * 1024), b''):
+                md5.update(chunk)
+
+        return f'{source_hash}:{version}:{md5.hexdigest()}'
+
+    @classmethod
+    def load(cls, key: str) -> Optional[dict]:
+        if not os.path.exists(snapshot_file):
+            return None
+
+        # noinspection PyBroadException
+        try:
+            with open(snapshot_file, mode='rb') as file:
+                snapshot = pickle.load(file)
+        except Exception as e:
+            log.warning(f'gamedata snapshot is unavailable: {repr(e)}')
+            return None
+
+        if not isinstance(snapshot, dict) or snapshot.get('key') != key:
+            return None
+
+        return snapshot['data']
+
+    @classmethod
+    def save(cls, key: str, data: dict):
+        temp_file = f'{snapshot_file}.tmp'
+
+        with log.sync_catch('gamedata snapshot save error:'):
+            with open(temp_file, mode='wb') as file:
+                pickle.dump({'key': key, 'data': data}, file, protocol=pickle.HIGHEST_PROTOCOL)
+
+            os.replace(temp_file, snapshot_file)
+
+    @classmethod
+    def remove(cls):
+        if os.path.exists(snapshot_file):
+            os.remove(snapshot_file)
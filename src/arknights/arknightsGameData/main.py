@@ -6,7 +6,16 @@ from amiyabot import Message, Chain, Equal, event_bus
 from core.util import TimeRecorder
 from core.database.bot import Admin
 
-from .builder import bot, initialize_data, download_gamedata, gamedata_path
+from .builder import (
+    bot,
+    initialize_data,
+    download_gamedata,
+    gamedata_path,
+    GameDataSnapshot,
+    JsonData,
+    OperatorCache,
+    SimilarIndexes,
+)
 
 
 @event_bus.subscribe('gameDataFetched')
@@ -44,6 +53,7 @@ async def _(data: Message):
 
     time_rec = TimeRecorder()
 
+    GameDataSnapshot.remove()
     initialize_data()
 
     return Chain(data).text(f'解析完成，耗时{time_rec.total()}')
@@ -59,3 +69,29 @@ async def _(data: Message):
     shutil.rmtree(f'{gamedata_path}/skin')
 
     return Chain(data).text(f'已清除立绘缓存，耗时{time_rec.total()}')
+
+
+@bot.on_message(keywords=Equal('资源缓存状态'))
+async def _(data: Message):
+    if not bool(Admin.get_or_none(account=data.user_id)):
+        return None
+
+    json_stats = JsonData.stats()
+    operator_stats = OperatorCache.stats()
+
+    text = (
+        f'数据表缓存：{json_stats["tables"]} 张表，'
+        f'{round(json_stats["total_size"] / 1024 / 1024, 2)}/{json_stats["max_size"] // 1024 // 1024}MB\n'
+        f'命中 {json_stats["hits"]} 次，未命中 {json_stats["misses"]} 次，淘汰 {json_stats["evictions"]} 次\n\n'
+        f'干员数据缓存（{operator_stats["version"]}）：{operator_stats["entries"]} 项，'
+        f'约 {round(operator_stats["size"] / 1024 / 1024, 2)}MB\n'
+        f'命中 {operator_stats["hits"]} 次，未命中 {operator_stats["misses"]} 次'
+    )
+
+    for name, item in SimilarIndexes.stats().items():
+        text += (
+            f'\n\n模糊匹配词库 {name}：{item["words"]} 个词，调用 {item["calls"]} 次，缓存命中 {item["hits"]} 次\n'
+            f'平均候选 {item["avg_candidates"]} 个，平均耗时 {item["avg_cost"]}ms'
+        )
+
+    return Chain(data).text(text)
@@ -1,3 +1,4 @@
+import math
 import time
 
 from amiyabot import Chain
@@ -39,17 +40,15 @@ async def calc_jade(reply: Chain, text: str):
 
 
 def calc_result(end_date: float):
-    dates = calc_date(end_date)
+    days, mondays = calc_date(end_date)
     end_date_str = stamp_to_date(end_date)
 
-    types = {'s': 0, 'd': 0, 't': 0, 'b': 0}
-
-    for item in dates:
-        types['s'] += sign_in
-        types['d'] += daily_tasks
-        if item['weekDate'] == 0:
-            types['t'] += weekly_tasks
-            types['b'] += weekly_battle
+    types = {
+        's': days * sign_in,
+        'd': days * daily_tasks,
+        't': mondays * weekly_tasks,
+        'b': mondays * weekly_battle,
+    }
 
     jade = 0
     for i in types:
@@ -68,16 +67,19 @@ def calc_result(end_date: float):
 
 
 def calc_date(end_date: float):
+    '''
+    从今天零点起每次加一天，直到超过截止时间，返回经过的天数和其中周一的数量
+    '''
     now_time = date_to_stamp(stamp_to_date(int(time.time())))
 
-    dates = []
+    if now_time >= end_date:
+        return 0, 0
 
-    while now_time < end_date:
-        now_time += 86400
-        time_array = time.localtime(now_time)
-        dates.append({'dateStr': stamp_to_date(now_time), 'weekDate': time_array.tm_wday})
+    days = math.ceil((end_date - now_time) / 86400)
+    week_date = time.localtime(now_time).tm_wday
 
-    return dates
+    # 第 k 天是周一当且仅当 (week_date + k) % 7 == 0，k 取 1 到 days
+    return days, (week_date + days) // 7
 
 
 def date_to_stamp(date: str):
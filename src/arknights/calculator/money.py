@@ -64,69 +64,72 @@ class Recruit:
     price: int
 
 
-def calc_money(money: int):
-    if money > 10000:
-        return f'博士，花费这个数额的计划比较长，请分开计算吧'
+# calc_money 能计算的最大金额
+max_money = 10000
+
 
-    mutable_list: List[Recruit] = []
+def build_recruit_map():
+    recruits: List[Recruit] = []
     minute = 60
-    # 把每个不同时间的招聘单价都丢进去
+    # 每个不同时间的招聘单价，再拼 0-3 个 tag
     for price in recruit_prices:
-        mutable_list.append(Recruit(minute // 60, minute % 60, 0, price))
+        for tag in range(4):
+            recruits.append(Recruit(minute // 60, minute % 60, tag, price + tag * 70))
         minute += 10
 
-    mutable_list2: List[Recruit] = []
-    # 再把每个时间拼 1-3 个 tag 的招聘单价都丢进去
-    for recruit in mutable_list:
-        for tag in range(4):
-            mutable_list2.append(Recruit(recruit.hour, recruit.minute, tag, recruit.price + tag * 70))
+    # 把招聘单价列表转成 map，方便后面查找，同价格的配置保留最后一个
+    return {item.price: item for item in recruits}
 
-    # 得到了一个完整的招聘单价列表
-    # for item in mutable_list2:
-    #     print(f'公招{item.hour}小时{item.minute}分钟，选{item.tags}个tag需要{item.price}龙门币')
 
-    # 把招聘单价列表转成 map，方便后面查找
-    recruit_map: Dict[int, Recruit] = {item.price: item for item in mutable_list2}
-    array: List[int] = [n.price for n in sorted(mutable_list2, key=lambda x: x.price)]
+def build_coin_table(coins: List[int], limit: int) -> Tuple[List[int], List[int]]:
+    '''
+    自底向上的凑硬币表，返回每个金额的公招次数（凑不出为 -1）和最后一次公招的单价
+    取舍规则与原先的递归写法一致：按单价从小到大遍历，次数不多于当前结果 + 1 的单价会覆盖之前的选择
+    '''
+    count = [0] * (limit + 1)
+    last = [0] * (limit + 1)
 
-    # 初始化完成，下面是计算过程
-    # 凑硬币算法，参考 https://leetcode-cn.com/problems/coin-change/solution/322-ling-qian-dui-huan-by-leetcode-solution/
-    # 区别就是这里需要记录每个硬币的招聘配置
-    result: Tuple[int, List[int]] = coin_change(array, money, [0] * money, [[] for _ in range(money)])
-    if result[0] == -1:
-        return f'博士，无法凑出花费 {money} 龙门币的计划'
-    else:
-        if result[0] > 10:
-            return f'博士，花费这个数额的计划比较长，请分开计算吧'
+    for rem in range(1, limit + 1):
+        min_val = None
+        min_coin = 0
 
-        text = f'博士，把 {money} 龙门币刚好花完，推荐 {result[0]} 次公招，分别是以下配置：\n\n'
-        for index in result[1]:
-            item = recruit_map[index]
-            text += f'{item.hour} 小时 {item.minute} 分钟，选 {item.tags} 个tag，花费 {item.price} 龙门币；\n'
+        for coin in coins:
+            if coin > rem:
+                break
+            res = count[rem - coin]
+            if res >= 0 and (min_val is None or res <= min_val):
+                min_val = res + 1
+                min_coin = coin
 
-        return text
+        count[rem] = -1 if min_val is None else min_val
+        last[rem] = min_coin
 
+    return count, last
 
-def coin_change(coins: List[int], rem: int, count: List[int], money_list: List[List[int]]) -> Tuple[int, List[int]]:
-    if rem < 0:
-        return -1, []
 
-    if rem == 0:
-        return 0, []
+recruit_map: Dict[int, Recruit] = build_recruit_map()
+coin_count, coin_last = build_coin_table(sorted(recruit_map.keys()), max_money)
 
-    if count[rem - 1] != 0:
-        return count[rem - 1], money_list[rem - 1]
 
-    min_val = float('inf')
-    min_list = []
+def calc_money(money: int):
+    if money > max_money:
+        return f'博士，花费这个数额的计划比较长，请分开计算吧'
+
+    if money < 0 or coin_count[money] == -1:
+        return f'博士，无法凑出花费 {money} 龙门币的计划'
+
+    if coin_count[money] > 10:
+        return f'博士，花费这个数额的计划比较长，请分开计算吧'
 
-    for coin in coins:
-        res = coin_change(coins, rem - coin, count, money_list)
-        if 0 <= res[0] <= min_val:
-            min_val = 1 + res[0]
-            min_list = res[1] + [coin]
+    prices = []
+    rem = money
+    while rem:
+        prices.append(coin_last[rem])
+        rem -= coin_last[rem]
 
-    count[rem - 1] = -1 if min_val == float('inf') else min_val
-    money_list[rem - 1] = [] if min_val == float('inf') else min_list
+    text = f'博士，把 {money} 龙门币刚好花完，推荐 {coin_count[money]} 次公招，分别是以下配置：\n\n'
+    for price in reversed(prices):
+        item = recruit_map[price]
+        text += f'{item.hour} 小时 {item.minute} 分钟，选 {item.tags} 个tag，花费 {item.price} 龙门币；\n'
 
-    return count[rem - 1], money_list[rem - 1]
+    return text
@@ -1,9 +1,13 @@
 import os
 import re
+import asyncio
 
-from core import Message, Chain, AmiyaBotPluginInstance, Requirement
-from core.util import integer, any_match, find_most_similar, get_index_from_text, remove_punctuation
-from core.resource.arknightsGameData import ArknightsGameData
+from typing import Dict
+from amiyabot import event_bus
+
+from core import log, Message, Chain, AmiyaBotPluginInstance, Requirement
+from core.util import TimeRecorder, any_match, get_index_from_text, remove_punctuation
+from core.resource.arknightsGameData import ArknightsGameData, ArknightsGameDataResource
 
 curr_dir = os.path.dirname(__file__)
 
@@ -12,76 +16,73 @@ side_padding = 10
 
 
 class Enemy:
+    index_map = {}
+    cards: Dict[str, dict] = {}
+
     @classmethod
-    def find_enemies(cls, name: str):
-        result = []
-        name = name.lower()
-        for e_name, item in ArknightsGameData.enemies.items():
-            if name == e_name.lower() or (len(name) > 1 and name in e_name.lower()):
-                result.append([e_name, item])
+    async def init_enemies(cls):
+        log.info('building enemies keywords...')
 
-        return result
+        time_rec = TimeRecorder()
 
-    @classmethod
-    def get_enemy(cls, name: str, get_links: bool = True):
-        key_map = {
-            'attributes.maxHp': {'title': 'maxHp', 'value': ''},
-            'attributes.atk': {'title': 'atk', 'value': ''},
-            'attributes.def': {'title': 'def', 'value': ''},
-            'attributes.magicResistance': {'title': 'magicResistance', 'value': ''},
-            'attributes.moveSpeed': {'title': 'moveSpeed', 'value': ''},
-            'attributes.baseAttackTime': {'title': 'baseAttackTime', 'value': ''},
-            'attributes.hpRecoveryPerSec': {'title': 'hpRecoveryPerSec', 'value': ''},
-            'attributes.massLevel': {'title': 'massLevel', 'value': ''},
-            'attributes.stunImmune': {'title': 'stunImmune', 'value': ''},
-            'attributes.silenceImmune': {'title': 'silenceImmune', 'value': ''},
-            'attributes.sleepImmune': {'title': 'sleepImmune', 'value': ''},
-            'attributes.frozenImmune': {'title': 'frozenImmune', 'value': ''},
-            'attributes.levitateImmune': {'title': 'levitateImmune', 'value': ''},
-            'attributes.disarmedCombatImmune': {'title': 'disarmedCombatImmune', 'value': ''},
-            'attributes.fearedImmune': {'title': 'fearedImmune', 'value': ''},
-            'rangeRadius': {'title': 'rangeRadius', 'value': ''},
-            'lifePointReduce': {'title': 'lifePointReduce', 'value': ''},
+        cls.index_map = {
+            item['info']['enemyIndex']: item['info']['name'] for item in ArknightsGameData.enemies.values()
         }
+        cls.cards = cls.build_cards(ArknightsGameData.enemies)
 
-        enemy = ArknightsGameData.enemies.get(name)
-        attrs = {}
-        link_items = []
+        ArknightsGameDataResource.register_similar_words('enemy', list(ArknightsGameData.enemies.keys()))
 
-        if not enemy:
-            return None
+        log.info(f'enemies keywords and {len(cls.cards)} cards built in {time_rec.total()}.')
 
-        if enemy['data']:
-            for item in enemy['data']:
-                attrs[item['level']] = {}
+    @staticmethod
+    def build_cards(enemies: Dict[str, dict]):
+        '''
+        预先生成每个敌人的模板数据，敌人按名称和 enemyId 各登记一次，共用同一份数据
+        '''
+        base = {}
+        for item in enemies.values():
+            enemy_id = item['info']['enemyId']
+            if enemy_id not in base:
+                attrs = {level: dict(zip(item['attr_keys'], values)) for level, values in item['attr_table']}
+                base[enemy_id] = {**item, 'attrs': attrs, 'link_items': []}
 
-                detail_data = item['enemyData']
-                for key in key_map:
-                    defined, value = cls.get_value(key, detail_data)
-                    if defined:
-                        key_map[key]['value'] = value
-                    else:
-                        value = key_map[key]['value']
+        cards = {}
+        for enemy_id, card in base.items():
+            link_items = []
+            for link_id in card['info']['linkEnemies']:
+                link = enemies.get(link_id)
+                if link:
+                    link_items.append(base[link['info']['enemyId']])
 
-                    attrs[item['level']][key_map[key]['title']] = value
+            cards[enemy_id] = {**card, 'link_items': link_items}
 
-        if get_links:
-            for link_id in enemy['info']['linkEnemies']:
-                res = cls.get_enemy(link_id, get_links=False)
-                if res:
-                    link_items.append(res)
+        return {name: cards[item['info']['enemyId']] for name, item in enemies.items()}
 
-        return {**enemy, 'attrs': attrs, 'link_items': link_items}
+    @classmethod
+    def find_most_similar(cls, text: str):
+        return ArknightsGameDataResource.find_most_similar('enemy', text, list(ArknightsGameData.enemies.keys()))
 
     @classmethod
-    def get_value(cls, key, source):
-        for item in key.split('.'):
-            if item in source:
-                source = source[item]
-        return source['m_defined'], integer(source['m_value'])
+    def find_enemies(cls, name: str):
+        result = []
+        name = name.lower()
+        for e_name, item in ArknightsGameData.enemies.items():
+            if name == e_name.lower() or (len(name) > 1 and name in e_name.lower()):
+                result.append([e_name, item])
 
+        return result
 
-class EnemiesPluginInstance(AmiyaBotPluginInstance): ...
+    @classmethod
+    def get_enemy(cls, name: str):
+        return cls.cards.get(name)
+
+
+class EnemiesPluginInstance(AmiyaBotPluginInstance):
+    def install(self):
+        asyncio.create_task(Enemy.init_enemies())
+
+    def uninstall(self):
+        event_bus.unsubscribe('gameDataInitialized', update)
 
 
 bot = EnemiesPluginInstance(
@@ -97,6 +98,16 @@ bot = EnemiesPluginInstance(
 )
 
 
+@event_bus.subscribe('gameDataInitialized')
+def update(_):
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        pass
+    else:
+        bot.install()
+
+
 async def verify(data: Message):
     limit_length = bot.get_config('searchSetting')['lengthLimit']
     if len(data.text_words) > int(limit_length):
@@ -109,14 +120,10 @@ async def verify(data: Message):
         name_char = r.group(5).strip()
 
     if name_char:
-        index_map = {}
-        for item in ArknightsGameData.enemies.values():
-            index_map[item['info']['enemyIndex']] = item['info']['name']
-
-        if name_char in index_map:
-            name = index_map[name_char]
+        if name_char in Enemy.index_map:
+            name = Enemy.index_map[name_char]
         else:
-            name = find_most_similar(name_char, list(ArknightsGameData.enemies.keys()))
+            name = Enemy.find_most_similar(name_char)
 
     keyword = any_match(data.text, ['查询', '敌人', '敌方'])
     level = (5 + int(bool(name))) if keyword else 1
@@ -159,7 +166,7 @@ async def enemy_query(data: Message):
         if not wait or not wait.text:
             return None
 
-        enemy_name = find_most_similar(wait.text, list(ArknightsGameData.enemies.keys()))
+        enemy_name = Enemy.find_most_similar(wait.text)
 
     if enemy_name:
         result = Enemy.find_enemies(enemy_name)
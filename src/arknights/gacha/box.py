@@ -1,16 +1,124 @@
 import os
 
-from core.database.user import OperatorBox
+from typing import Dict, List
+from peewee import fn
+from core.database.user import *
 from core.resource.arknightsGameData import ArknightsGameData, Operator
 from amiyabot.builtin.lib.imageCreator import ImageElem, create_image
 
-from .gachaBuilder import curr_dir
+curr_dir = os.path.dirname(__file__)
+
+
+@table
+class OperatorBoxItem(UserBaseModel):
+    user_id: str = CharField(index=True)
+    operator_name: str = CharField()
+    rarity: int = IntegerField()
+    count: int = IntegerField(default=0)
+
+    class Meta:
+        indexes = ((('user_id', 'operator_name'), True),)
+
+
+class Box:
+    '''
+    每个干员一行的 BOX，按行的 id 保持获取顺序
+    旧版整串保存在 OperatorBox.operator 的 BOX 会在首次读写时迁移，原数据保留不动，迁移后不再更新
+    '''
+
+    migrated = set()
+
+    @classmethod
+    def migrate(cls, user_id):
+        if user_id in cls.migrated:
+            return
+
+        # 迁移在事务中进行，中途出错不会留下部分数据，(user_id, operator_name) 的唯一索引防止重复迁移
+        with OperatorBoxItem._meta.database.atomic():
+            if not OperatorBoxItem.select().where(OperatorBoxItem.user_id == user_id).exists():
+                box: OperatorBox = OperatorBox.get_or_none(user_id=user_id)
+
+                if box and box.operator:
+                    items: Dict[str, dict] = {}
+                    for item in box.operator.split('|'):
+                        if not item:
+                            continue
+
+                        operator_name, rarity, count = tuple(item.split(':'))
+                        if operator_name in items:
+                            items[operator_name]['count'] += int(count)
+                        else:
+                            items[operator_name] = {
+                                'user_id': user_id,
+                                'operator_name': operator_name,
+                                'rarity': int(rarity),
+                                'count': int(count),
+                            }
+
+                    OperatorBoxItem.batch_insert(list(items.values()))
+
+        cls.migrated.add(user_id)
+
+    @classmethod
+    def add(cls, user_id, counts: Dict[str, List[int]]):
+        '''
+        增加抽到的干员，counts 为 {干员名: [星级, 数量]}，只读写本次抽到的干员所在的行
+        '''
+        cls.migrate(user_id)
+
+        with OperatorBoxItem._meta.database.atomic():
+            exists = {
+                item.operator_name: item
+                for item in OperatorBoxItem.select().where(
+                    OperatorBoxItem.user_id == user_id,
+                    OperatorBoxItem.operator_name.in_(list(counts.keys())),
+                )
+            }
+
+            items = []
+            for name, (rarity, count) in counts.items():
+                if name in exists:
+                    OperatorBoxItem.update(count=OperatorBoxItem.count + count).where(
+                        OperatorBoxItem.id == exists[name].id
+                    ).execute()
+                else:
+                    items.append({'user_id': user_id, 'operator_name': name, 'rarity': rarity, 'count': count})
+
+            if items:
+                OperatorBoxItem.batch_insert(items)
+
+    @classmethod
+    def items(cls, user_id) -> List[OperatorBoxItem]:
+        cls.migrate(user_id)
+
+        return list(
+            OperatorBoxItem.select().where(OperatorBoxItem.user_id == user_id).order_by(OperatorBoxItem.id)
+        )
+
+    @classmethod
+    def summary(cls, user_id) -> Dict[int, List[int]]:
+        '''
+        按星级汇总，返回 {星级: [干员种类数, 干员总数]}
+        '''
+        cls.migrate(user_id)
+
+        query = (
+            OperatorBoxItem.select(
+                OperatorBoxItem.rarity,
+                fn.COUNT(OperatorBoxItem.id).alias('kinds'),
+                fn.SUM(OperatorBoxItem.count).alias('total'),
+            )
+            .where(OperatorBoxItem.user_id == user_id)
+            .group_by(OperatorBoxItem.rarity)
+        )
+
+        return {item.rarity: [item.kinds, int(item.total)] for item in query}
 
 
 def get_user_box(user_id):
-    box: OperatorBox = OperatorBox.get_or_none(user_id=user_id)
+    items = Box.items(user_id)
 
-    if not box or not box.operator:
+    if not items:
         return '博士，您尚未获得任何干员'
 
     operators = ArknightsGameData.operators
@@ -18,8 +126,9 @@ def get_user_box(user_id):
     collect = {6: [], 5: [], 4: [], 3: []}
     images = []
 
-    for item in box.operator.split('|'):
-        operator_name, rarity, count = tuple(item.split(':'))
+    for item in items:
+        operator_name = item.operator_name
+        count = item.count
 
         if operator_name in operators:
             operator: Operator = operators[operator_name]
@@ -64,23 +173,16 @@ def get_user_box(user_id):
 
 
 def get_user_gacha_detail(user_id):
-    box: OperatorBox = OperatorBox.get_or_none(user_id=user_id)
+    summary = Box.summary(user_id)
 
-    if not box:
+    if not summary:
         return None
 
-    count = 0
     rarity = {3: [0, 0], 4: [0, 0], 5: [0, 0], 6: [0, 0]}
-    operators = box.operator.split('|')
-    box_num = len(operators)
-
-    for item in operators:
-        _, r, c = tuple(item.split(':'))
-
-        rarity[int(r)][0] += 1
-        rarity[int(r)][1] += int(c)
+    rarity.update(summary)
 
-        count += int(c)
+    box_num = sum(item[0] for item in summary.values())
+    count = sum(item[1] for item in summary.values())
 
     def rate(n):
         return f'{round(rarity[n][1] / count * 100, 2) if rarity[n][1] else 0}%'
@@ -1,15 +1,17 @@
 import os
-import random
 
+from typing import Dict, Tuple
 from core import Message, Chain
-from core.database.user import OperatorBox, UserGachaInfo, UserInfo
+from core.database.user import UserGachaInfo, UserInfo
 from core.database.bot import *
-from core.util import insert_empty
+from core.util import insert_empty, run_in_thread_pool, TimeRecorder
 from core.resource.arknightsGameData import ArknightsGameData
+from .box import Box
 from .utils.create_gacha_image import create_gacha_image
 from .utils.get_operators import get_operators
-from .utils.pool_methods import get_pool_name, get_custom_pool, get_official_pool
+from .utils.pool_methods import get_pool_name, get_custom_pool, get_custom_pool_file, get_official_pool
 from .utils.logger import debug_log
+from .utils.gacha_engine import GachaEngine, GachaResult
 
 curr_dir = os.path.dirname(__file__)
 
@@ -30,22 +32,82 @@ class PoolSpOperator(BotBaseModel):
     image: str = CharField()
 
 
+class CompiledPool:
+    def __init__(self, pool: Pool, gacha_operator_pool: Dict[int, Dict[str, float]], engine: GachaEngine):
+        self.pool = pool
+        self.gacha_operator_pool = gacha_operator_pool
+        self.engine = engine
+
+
+class PoolCache:
+    '''
+    已编译卡池的缓存，卡池同步或游戏数据更新后清空
+    每个卡池只保留最新的一份，自定义卡池文件被修改后旧的编译结果直接被替换
+    '''
+
+    pools: Dict[tuple, Tuple[tuple, CompiledPool]] = {}
+
+    @classmethod
+    def get(cls, pool_selector, is_custom: bool):
+        if is_custom:
+            file_path = get_custom_pool_file(pool_selector)
+            mtime = os.path.getmtime(file_path) if file_path else None
+        else:
+            mtime = None
+
+        key = (is_custom, str(pool_selector).lower())
+        version = (mtime, getattr(ArknightsGameData, 'version', None))
+
+        cached = cls.pools.get(key)
+        if cached and cached[0] == version:
+            return cached[1]
+
+        if is_custom:
+            debug_log(f'使用自定义寻访池' + str(pool_selector))
+            pool: Pool = get_custom_pool(pool_selector)
+        else:
+            debug_log(f'使用官方寻访池' + str(pool_selector))
+            pool: Pool = get_official_pool(pool_selector)
+
+        compiled = GachaBuilder.compile_pool(pool)
+        cls.pools[key] = (version, compiled)
+
+        return compiled
+
+    @classmethod
+    def clear(cls):
+        cls.pools = {}
+
+
 class GachaBuilder:
+    rarity_range = {6: 2, 5: 8, 4: 50, 3: 40, 2: 0, 1: 0}
+    '''
+    概率：
+    3 星 40% 区间为 1 ~ 40
+    4 星 50% 区间为 41 ~ 90
+    5 星 8% 区间为 91 ~ 98
+    6 星 2% 区间为 99 ~ 100
+    '''
+
     def __init__(self, data: Message):
         self.data = data
         self.user_gacha: UserGachaInfo = UserGachaInfo.get_or_create(user_id=data.user_id)[0]
 
         if self.user_gacha.use_custom_gacha_pool:
-            debug_log(f'使用自定义寻访池' + str(self.user_gacha.custom_gacha_pool))
-            pool: Pool = get_custom_pool(self.user_gacha.custom_gacha_pool)
+            compiled = PoolCache.get(self.user_gacha.custom_gacha_pool, True)
         else:
-            debug_log(f'使用官方寻访池' + str(self.user_gacha.gacha_pool))
-            pool: Pool = get_official_pool(self.user_gacha.gacha_pool)
+            compiled = PoolCache.get(self.user_gacha.gacha_pool, False)
 
-        self.pool = pool
+        self.pool = compiled.pool
+        self.gacha_operator_pool = compiled.gacha_operator_pool
+        self.engine = compiled.engine
 
+        self.break_even = self.user_gacha.gacha_break_even
+
+    @classmethod
+    def compile_pool(cls, pool: Pool):
         # 获取填充用干员
-        all_operators = get_operators(self.__is_classic_only(pool))
+        all_operators = get_operators(cls.__is_classic_only(pool))
 
         # 按稀有度拆分填充到 fillin_operators[raity]
         fillin_operators = {}
@@ -64,54 +126,44 @@ class GachaBuilder:
         # 按顺序获取干员并计算weight
 
         gacha_operator_pool = {}
-        gacha_operator_pool[6] = self.__get_gacha(
-            self.__get_weight(pool.pickup_6),
-            self.__get_weight(pool.pickup_s),
-            self.__get_pickup_rate(pool, 6),
+        gacha_operator_pool[6] = cls.__get_gacha(
+            cls.__get_weight(pool.pickup_6),
+            cls.__get_weight(pool.pickup_s),
+            cls.__get_pickup_rate(pool, 6),
             fillin_operators[6],
         )
-        gacha_operator_pool[5] = self.__get_gacha(
-            self.__get_weight(pool.pickup_5),
-            self.__get_weight(pool.pickup_s_5),
-            self.__get_pickup_rate(pool, 5),
+        gacha_operator_pool[5] = cls.__get_gacha(
+            cls.__get_weight(pool.pickup_5),
+            cls.__get_weight(pool.pickup_s_5),
+            cls.__get_pickup_rate(pool, 5),
             fillin_operators[5],
         )
-        gacha_operator_pool[4] = self.__get_gacha(
-            self.__get_weight(pool.pickup_4),
-            self.__get_weight(pool.pickup_s_4),
-            self.__get_pickup_rate(pool, 4),
+        gacha_operator_pool[4] = cls.__get_gacha(
+            cls.__get_weight(pool.pickup_4),
+            cls.__get_weight(pool.pickup_s_4),
+            cls.__get_pickup_rate(pool, 4),
             fillin_operators[4],
         )
-        gacha_operator_pool[3] = self.__get_gacha(
-            self.__get_weight(pool.pickup_3),
-            self.__get_weight(pool.pickup_s_3),
-            self.__get_pickup_rate(pool, 3),
+        gacha_operator_pool[3] = cls.__get_gacha(
+            cls.__get_weight(pool.pickup_3),
+            cls.__get_weight(pool.pickup_s_3),
+            cls.__get_pickup_rate(pool, 3),
             fillin_operators[3],
         )
-        gacha_operator_pool[2] = self.__get_gacha(
-            self.__get_weight(pool.pickup_2),
-            self.__get_weight(pool.pickup_s_2),
-            self.__get_pickup_rate(pool, 2),
+        gacha_operator_pool[2] = cls.__get_gacha(
+            cls.__get_weight(pool.pickup_2),
+            cls.__get_weight(pool.pickup_s_2),
+            cls.__get_pickup_rate(pool, 2),
             fillin_operators[2],
         )
-        gacha_operator_pool[1] = self.__get_gacha(
-            self.__get_weight(pool.pickup_1),
-            self.__get_weight(pool.pickup_s_1),
-            self.__get_pickup_rate(pool, 1),
+        gacha_operator_pool[1] = cls.__get_gacha(
+            cls.__get_weight(pool.pickup_1),
+            cls.__get_weight(pool.pickup_s_1),
+            cls.__get_pickup_rate(pool, 1),
             fillin_operators[1],
         )
 
-        self.gacha_operator_pool = gacha_operator_pool
-
-        self.break_even = self.user_gacha.gacha_break_even
-        self.rarity_range = {6: 2, 5: 8, 4: 50, 3: 40, 2: 0, 1: 0}
-        '''
-        概率：
-        3 星 40% 区间为 1 ~ 40
-        4 星 50% 区间为 41 ~ 90
-        5 星 8% 区间为 91 ~ 98
-        6 星 2% 区间为 99 ~ 100
-        '''
+        return CompiledPool(pool, gacha_operator_pool, GachaEngine(cls.rarity_range, gacha_operator_pool))
 
     @staticmethod
     def __get_pickup_rate(pool: Pool, rarity: int):
@@ -284,42 +336,13 @@ class GachaBuilder:
     def continuous_mode(self, times, coupon, point):
         operators = self.start_gacha(times, coupon, point)
 
-        rarity_sum = [0, 0, 0, 0]
-        high_star = {5: {}, 6: {}}
-
-        ten_gacha = []
-        purple_pack = 0
-        multiple_rainbow = {}
+        # 记录抽到的各星级干员的数量、抽中的高星干员以及每十连的情况
+        rarity_sum = operators.rarity_sum()
+        high_star = operators.high_star()
+        purple_pack, multiple_rainbow = operators.ten_gacha()
 
         result = f'阿米娅给博士扔来了{times}张简历，博士细细地检阅着...\n\n【{self.pool.pool_name}】\n'
 
-        for item in operators:
-            rarity = item['rarity']
-            name = item['name']
-
-            # 记录抽到的各星级干员的数量
-            rarity_sum[rarity - 3] += 1
-
-            # 记录抽中的高星干员
-            if rarity >= 5:
-                if name not in high_star[rarity]:
-                    high_star[rarity][name] = 0
-                high_star[rarity][name] += 1
-
-            # 记录每十连的情况
-            ten_gacha.append(rarity)
-            if len(ten_gacha) >= 10:
-                five = ten_gacha.count(5)
-                six = ten_gacha.count(6)
-
-                if five == 0 and six == 0:
-                    purple_pack += 1
-
-                if six > 1:
-                    if six not in multiple_rainbow:
-                        multiple_rainbow[six] = 0
-                    multiple_rainbow[six] += 1
-                ten_gacha = []
         for r in high_star:
             sd = high_star[r]
             if sd:
@@ -358,11 +381,11 @@ class GachaBuilder:
 
         return Chain(self.data).text_image(result)
 
-    def detailed_mode(self, times, coupon, point, *args, **kwargs):
+    async def detailed_mode(self, times, coupon, point, *args, **kwargs):
         '''
         抽卡次数小于等于10次时的逻辑
         '''
-        operators = self.start_gacha(times, coupon, point)
+        operators = self.start_gacha(times, coupon, point).operators
         operators_info = {}
 
         game_data = ArknightsGameData
@@ -422,12 +445,24 @@ class GachaBuilder:
 
                 result_list.append(op_dt)
 
-            reply.image(create_gacha_image(result_list))
-
             show_name = False
+            image_format = 'PNG'
+            image_quality = 80
+            compress_level = 6
             if bot_caller is not None:
                 if bot_caller['plugin_instance'] is not None:
-                    show_name = bot_caller['plugin_instance'].get_config('display_operator_name')
+                    plugin = bot_caller['plugin_instance']
+                    show_name = plugin.get_config('display_operator_name')
+                    image_format = plugin.get_config('image_format') or image_format
+                    image_quality = plugin.get_config('image_quality') or image_quality
+                    if plugin.get_config('png_compress_level') is not None:
+                        compress_level = plugin.get_config('png_compress_level')
+
+            # 图片合成在线程池中进行，避免阻塞事件循环
+            image = await run_in_thread_pool(
+                create_gacha_image, result_list, image_format, image_quality, compress_level
+            )
+            reply.image(image)
 
             if show_name:
                 return reply.text(f'【{get_pool_name(self.pool)}】\n{operator_name_list}\n{self.check_break_even()}')
@@ -450,51 +485,18 @@ class GachaBuilder:
         )
 
     def get_rates(self):
-        rates = self.rarity_range.copy()
-
-        break_even_rate = rates[6]
-
-        if self.break_even > 50:
-            break_even_rate += (self.break_even - 50) * 2
+        return self.engine.get_rates(self.break_even)
 
-        # 计算水位提升量
-        shift_up_amount = break_even_rate - rates[6]
-        rates[6] = break_even_rate
-
-        # 6星概率提高，其他星级概率降低，从低到高挨个扣除，直到break_even_rate扣完
-        for i in range(1, 5):
-            if shift_up_amount >= rates[i]:
-                shift_up_amount -= rates[i]
-                rates[i] = 0
-            else:
-                rates[i] -= shift_up_amount
-                break
-
-        return rates
-
-    def start_gacha(self, times, coupon, point):
+    def start_gacha(self, times, coupon, point) -> GachaResult:
         '''
         抽卡核心函数，continuous_mode和detailed_mode的实际逻辑位置。
         '''
 
-        operators = []
-
-        for i in range(0, times):
-            self.break_even += 1
-
-            rates = self.get_rates()
+        time_rec = TimeRecorder()
 
-            rates_keys = list(rates.keys())
-            rates_weight = list(rates.values())
+        operators, self.break_even = self.engine.simulate(times, self.break_even)
 
-            rarity = random.choices(rates_keys, weights=rates_weight, k=1)[0]
-
-            if rarity == 6:
-                self.break_even = 0
-
-            operator = self.choose_operator(rarity)
-
-            operators.append({'rarity': rarity, 'name': operator})
+        debug_log(f'gacha {times} times in {time_rec.total()}.')
 
         UserGachaInfo.update(gacha_break_even=self.break_even, coupon=UserGachaInfo.coupon - coupon).where(
             UserGachaInfo.user_id == self.data.user_id
@@ -508,15 +510,8 @@ class GachaBuilder:
         return operators
 
     def choose_operator(self, rarity):
-        char_pool = self.gacha_operator_pool[rarity]
-
-        names = list(char_pool.keys())
-        weights = list(char_pool.values())
-
         # 基于权重随机选择一个 name
-        chosen_name = random.choices(names, weights=weights, k=1)[0]
-
-        return chosen_name
+        return self.engine.choose_operator(rarity)
 
     def __get_operator(self, name):
         use_official = True
@@ -567,23 +562,5 @@ class GachaBuilder:
             else:
                 return None
 
-    def set_box(self, result):
-        user_box: OperatorBox = OperatorBox.get_or_create(user_id=self.data.user_id)[0]
-        box_map = {}
-
-        if user_box.operator:
-            for n in user_box.operator.split('|'):
-                n = n.split(':')
-                box_map[n[0]] = [n[0], int(n[1]), int(n[2])]
-
-        for item in result:
-            name = item['name']
-
-            if name in box_map:
-                box_map[name][2] += 1
-            else:
-                box_map[name] = [name, item['rarity'], 1]
-
-        box_res = '|'.join([':'.join([str(i) for i in item]) for n, item in box_map.items()])
-
-        OperatorBox.update(operator=box_res).where(OperatorBox.user_id == self.data.user_id).execute()
+    def set_box(self, result: GachaResult):
+        Box.add(self.data.user_id, result.box_counts())
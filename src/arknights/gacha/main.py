@@ -5,7 +5,7 @@ import asyncio
 import shutil
 
 from typing import List, Tuple
-from amiyabot import QQGuildBotInstance, GroupConfig
+from amiyabot import QQGuildBotInstance, GroupConfig, event_bus
 from amiyabot.network.httpRequests import http_requests
 from core import log, Message, Chain, Equal, AmiyaBotPluginInstance
 from core.util import any_match, create_dir
@@ -13,9 +13,11 @@ from core.resource import remote_config
 from core.database.user import UserInfo, UserGachaInfo
 from core.database.bot import OperatorConfig, Admin
 
-from .gachaBuilder import GachaBuilder, curr_dir, Pool, bot_caller
-from .box import get_user_box
+from .gachaBuilder import GachaBuilder, PoolCache, curr_dir, Pool, bot_caller
+from .box import Box, get_user_box
 from .utils.pool_methods import get_pool_name, get_pool_selector, get_pool_image, get_custom_pool, get_official_pool
+from .utils.image_index import ImageIndex
+from .utils.create_gacha_image import GachaSprites
 from .utils.logger import debug_log
 
 
@@ -48,17 +50,32 @@ class GachaPluginInstance(AmiyaBotPluginInstance):
                 OperatorConfig.batch_insert(res['OperatorConfig'])
                 Pool.batch_insert(res['Pool'])
 
+                PoolCache.clear()
+
                 return True
 
+    @staticmethod
+    def get_box_summary(user_id: str):
+        '''
+        供其他插件读取 BOX 统计，返回 {星级: [干员种类数, 干员总数]}
+        '''
+        return Box.summary(user_id)
+
     def install(self):
         asyncio.create_task(self.sync_pool())
         bot_caller['plugin_instance'] = self
 
+        for dir_name in [pool_image, custom_pool_image, custom_operator]:
+            ImageIndex.scan(dir_name)
+
         # 把demo卡池文件复制到自定义卡池文件夹
         dest_file = f'{custom_pool}/f175f6a942a746b6a0e00b151253955a.json'
         demo_file = f'{curr_dir}/config/f175f6a942a746b6a0e00b151253955a.json'
         shutil.copyfile(demo_file, dest_file)
 
+    def uninstall(self):
+        event_bus.unsubscribe('gameDataInitialized', update)
+
 
 bot = GachaPluginInstance(
     name='明日方舟模拟抽卡',
@@ -77,6 +94,12 @@ re_list = [r'抽卡\d+次', r'寻访\d+次', r'抽\d+次', r'\d+次寻访', r'\d
 bot.set_group_config(GroupConfig('gacha', allow_direct=True))
 
 
+@event_bus.subscribe('gameDataInitialized')
+def update(_):
+    PoolCache.clear()
+    GachaSprites.clear()
+
+
 def find_once(reg, text):
     r = re.compile(reg)
     f = r.findall(text)
@@ -162,7 +185,7 @@ async def _(data: Message):
                 )
 
         if times <= 10:
-            return gc.detailed_mode(times, coupon_need, point_need)
+            return await gc.detailed_mode(times, coupon_need, point_need)
         else:
             return gc.continuous_mode(times, coupon_need, point_need)
 
@@ -1,25 +1,107 @@
 import os
+import threading
+
 from io import BytesIO
+from collections import OrderedDict
 from PIL import Image, ImageDraw
 from .logger import debug_log
 
 
 curr_dir = os.path.dirname(__file__)
 
+tile_width = 82
+portrait_height = 252
+portrait_cache_size = 128
+
+
+class GachaSprites:
+    '''
+    十连图片的素材缓存：背景、稀有度边框、职业图标只读取一次，干员立绘按路径和修改时间缓存裁剪缩放后的结果
+    立绘文件被替换后修改时间变化，会重新读取；游戏数据更新时清空全部缓存
+    '''
+
+    lock = threading.Lock()
+
+    bg = None
+    rarity = {}
+    classes = {}
+    portraits = OrderedDict()
+
+    @classmethod
+    def load(cls):
+        with cls.lock:
+            if cls.bg is not None:
+                return cls.bg, cls.rarity, cls.classes
+
+            cls.bg = Image.open(f'{curr_dir}/../gacha/bg.png')
+            cls.bg.load()
+
+            for rarity in range(1, 7):
+                path = f'{curr_dir}/../gacha/{rarity}.png'
+                if os.path.exists(path):
+                    cls.rarity[rarity] = Image.open(path).convert('RGBA')
+
+            for file in os.listdir(f'{curr_dir}/../classify'):
+                name, ext = os.path.splitext(file)
+                if ext == '.png':
+                    img = Image.open(f'{curr_dir}/../classify/{file}').convert('RGBA')
+                    cls.classes[name] = img.resize(size=(59, 59))
+
+            return cls.bg, cls.rarity, cls.classes
+
+    @classmethod
+    def get_portrait(cls, path: str):
+        key = (path, os.path.getmtime(path))
+
+        with cls.lock:
+            if key in cls.portraits:
+                cls.portraits.move_to_end(key)
+                return cls.portraits[key]
+
+        img = Image.open(path).convert('RGBA')
 
-def create_gacha_image(result: list):
-    image = Image.open(f'{curr_dir}/../gacha/bg.png')
+        radio = portrait_height / img.size[1]
+
+        width = int(img.size[0] * radio)
+        height = int(img.size[1] * radio)
+
+        step = int((width - tile_width) / 2)
+        crop = (step, 0, width - step, height)
+
+        img = img.resize(size=(width, height))
+        img = img.crop(crop)
+
+        with cls.lock:
+            cls.portraits[key] = img
+            if len(cls.portraits) > portrait_cache_size:
+                cls.portraits.popitem(last=False)
+
+        return img
+
+    @classmethod
+    def clear(cls):
+        with cls.lock:
+            cls.bg = None
+            cls.rarity = {}
+            cls.classes = {}
+            cls.portraits.clear()
+
+
+def create_gacha_image(result: list, image_format: str = 'PNG', quality: int = 80, compress_level: int = 6):
+    # 取出素材的引用，合成过程中缓存被清空也不受影响
+    bg, rarity_sprites, class_sprites = GachaSprites.load()
+
+    image = bg.copy()
     draw = ImageDraw.ImageDraw(image)
 
     x = 78
     for item in result:
         if item is None:
-            x += 82
+            x += tile_width
             continue
 
-        rarity = f'{curr_dir}/../gacha/%s.png' % item['rarity']
-        if os.path.exists(rarity):
-            img = Image.open(rarity).convert('RGBA')
+        if item['rarity'] in rarity_sprites:
+            img = rarity_sprites[item['rarity']]
             image.paste(img, box=(x, 0), mask=img)
 
         portrait = item['portrait']
@@ -27,33 +109,23 @@ def create_gacha_image(result: list):
         debug_log(f"item is {item}")
 
         if portrait and os.path.exists(portrait):
-            img = Image.open(portrait).convert('RGBA')
-
-            radio = 252 / img.size[1]
-
-            width = int(img.size[0] * radio)
-            height = int(img.size[1] * radio)
-
-            step = int((width - 82) / 2)
-            crop = (step, 0, width - step, height)
-
-            img = img.resize(size=(width, height))
-            img = img.crop(crop)
+            img = GachaSprites.get_portrait(portrait)
             image.paste(img, box=(x, 112), mask=img)
 
         draw.rectangle((x + 10, 321, x + 70, 381), fill='white')
-        class_img = f'{curr_dir}/../classify/%s.png' % item['class']
-        if os.path.exists(class_img):
-            img = Image.open(class_img).convert('RGBA')
-            img = img.resize(size=(59, 59))
+        if item['class'] in class_sprites:
+            img = class_sprites[item['class']]
             image.paste(img, box=(x + 11, 322), mask=img)
 
-        x += 82
+        x += tile_width
 
     x, y = image.size
-    image = image.resize((int(x * 0.8), int(y * 0.8)), Image.ANTIALIAS)
+    image = image.resize((int(x * 0.8), int(y * 0.8)), Image.LANCZOS)
 
     container = BytesIO()
-    image.save(container, quality=80, format='PNG')
+    if image_format.upper() == 'JPEG':
+        image.convert('RGB').save(container, quality=quality, format='JPEG')
+    else:
+        image.save(container, compress_level=compress_level, format='PNG')
 
     return container.getvalue()
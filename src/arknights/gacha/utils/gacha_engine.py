@@ -0,0 +1,299 @@
+import random
+import itertools
+
+from bisect import bisect
+from typing import Dict, List, Union
+
+try:
+    import numpy as np
+except ModuleNotFoundError:
+    np = None
+
+# 抽卡次数达到该值且安装了 numpy 时使用批量模拟
+numpy_threshold = 100
+
+# numpy 模拟时六星间隔分布的截断长度，水位超过 99 后每抽出六星的概率都在 92% 以上，截断处的剩余概率远小于浮点精度
+gap_limit = 300
+
+
+class WeightTable:
+    '''
+    累积权重表，抽取方式与 random.choices(population, weights=weights, k=1) 完全一致
+    '''
+
+    def __init__(self, population: list, weights: list):
+        self.population = population
+        self.cum_weights = list(itertools.accumulate(weights))
+        self.total = self.cum_weights[-1] + 0.0 if self.cum_weights else 0.0
+        self.hi = len(population) - 1
+        self.array = None
+
+    def choice(self):
+        if self.total <= 0.0:
+            raise ValueError('Total of weights must be greater than zero')
+
+        return self.population[bisect(self.cum_weights, random.random() * self.total, 0, self.hi)]
+
+    def choice_index(self, uniform):
+        '''
+        numpy 版本的 choice，传入 [0, 1) 的随机数数组，返回被抽中的下标数组
+        '''
+        if self.total <= 0.0:
+            raise ValueError('Total of weights must be greater than zero')
+
+        if self.array is None:
+            self.array = np.asarray(self.cum_weights, dtype=np.float64)
+
+        return np.minimum(np.searchsorted(self.array, uniform * self.total, side='right'), self.hi)
+
+
+class GachaResult:
+    '''
+    一次寻访的结果，按抽取顺序保存星级和干员名，统计时不再为每一抽生成字典
+    '''
+
+    def __init__(self, rarities: Union[list, 'np.ndarray'], names: Union[list, 'np.ndarray']):
+        self.rarities = rarities
+        self.names = names
+
+    def __len__(self):
+        return len(self.rarities)
+
+    @property
+    def operators(self):
+        return [{'rarity': int(rarity), 'name': name} for rarity, name in zip(self.rarities, self.names)]
+
+    def rarity_sum(self):
+        '''
+        三星至六星的数量
+        '''
+        if np is not None and isinstance(self.rarities, np.ndarray):
+            counts = np.bincount(self.rarities, minlength=7)
+            return [int(counts[r]) for r in range(3, 7)]
+
+        return [self.rarities.count(r) for r in range(3, 7)]
+
+    def high_star(self):
+        '''
+        抽中的五星、六星干员及数量，按首次抽中的顺序排列
+        '''
+        high_star = {5: {}, 6: {}}
+
+        if np is not None and isinstance(self.rarities, np.ndarray):
+            positions = np.flatnonzero(self.rarities >= 5).tolist()
+        else:
+            positions = [i for i, rarity in enumerate(self.rarities) if rarity >= 5]
+
+        for i in positions:
+            group = high_star[int(self.rarities[i])]
+            name = self.names[i]
+            group[name] = group.get(name, 0) + 1
+
+        return high_star
+
+    def ten_gacha(self):
+        '''
+        统计每十连的情况，返回十连紫气东来的次数和十连内多个六星的次数
+        '''
+        purple_pack = 0
+        multiple_rainbow = {}
+
+        full = len(self.rarities) // 10 * 10
+
+        if np is not None and isinstance(self.rarities, np.ndarray):
+            groups = self.rarities[:full].reshape(-1, 10)
+            six = (groups == 6).sum(axis=1)
+            five = (groups == 5).sum(axis=1)
+
+            purple_pack = int(((six == 0) & (five == 0)).sum())
+            sixes = six[six > 1].tolist()
+        else:
+            sixes = []
+            for i in range(0, full, 10):
+                group = self.rarities[i : i + 10]
+                six = group.count(6)
+
+                if six == 0 and group.count(5) == 0:
+                    purple_pack += 1
+                if six > 1:
+                    sixes.append(six)
+
+        for num in sixes:
+            multiple_rainbow[num] = multiple_rainbow.get(num, 0) + 1
+
+        return purple_pack, multiple_rainbow
+
+    def box_counts(self):
+        '''
+        每个干员的星级和数量，按首次抽中的顺序排列
+        '''
+        counts: Dict[str, List[int]] = {}
+
+        for rarity, name in zip(self.rarities, self.names):
+            if name in counts:
+                counts[name][1] += 1
+            else:
+                counts[name] = [int(rarity), 1]
+
+        return counts
+
+
+class GachaEngine:
+    '''
+    寻访模拟器，卡池的星级与干员累积权重只计算一次
+    '''
+
+    def __init__(self, rarity_range: Dict[int, int], operator_pool: Dict[int, Dict[str, float]]):
+        self.rarity_range = rarity_range
+        self.rarity_keys = list(rarity_range.keys())
+        self.operator_tables = {
+            rarity: WeightTable(list(pool.keys()), list(pool.values())) for rarity, pool in operator_pool.items()
+        }
+
+        # 下标为水位
+        self.rarity_tables: List[WeightTable] = []
+        self.rarity_matrix = None
+        self.reset_gap_cdf = None
+
+    def get_rates(self, break_even: int):
+        rates = self.rarity_range.copy()
+
+        break_even_rate = rates[6]
+
+        if break_even > 50:
+            break_even_rate += (break_even - 50) * 2
+
+        # 计算水位提升量
+        shift_up_amount = break_even_rate - rates[6]
+        rates[6] = break_even_rate
+
+        # 6星概率提高，其他星级概率降低，从低到高挨个扣除，直到break_even_rate扣完
+        for i in range(1, 5):
+            if shift_up_amount >= rates[i]:
+                shift_up_amount -= rates[i]
+                rates[i] = 0
+            else:
+                rates[i] -= shift_up_amount
+                break
+
+        return rates
+
+    def rarity_table(self, break_even: int):
+        while len(self.rarity_tables) <= break_even:
+            rates = self.get_rates(len(self.rarity_tables))
+            self.rarity_tables.append(WeightTable(self.rarity_keys, [rates[r] for r in self.rarity_keys]))
+
+        return self.rarity_tables[break_even]
+
+    def choose_operator(self, rarity: int):
+        return self.operator_tables[rarity].choice()
+
+    def simulate(self, times: int, break_even: int):
+        '''
+        连续抽取 times 次，返回结果和抽取后的水位
+        '''
+        if np is not None and times >= numpy_threshold:
+            return self.__simulate_numpy(times, break_even)
+
+        rarities = []
+        names = []
+
+        for _ in range(times):
+            break_even += 1
+
+            rarity = self.rarity_table(break_even).choice()
+
+            if rarity == 6:
+                break_even = 0
+
+            rarities.append(rarity)
+            names.append(self.operator_tables[rarity].choice())
+
+        return GachaResult(rarities, names), break_even
+
+    def __get_rarity_matrix(self, max_break_even: int):
+        if self.rarity_matrix is None or len(self.rarity_matrix) <= max_break_even:
+            self.rarity_table(max_break_even)
+            self.rarity_matrix = np.asarray([table.cum_weights for table in self.rarity_tables], dtype=np.float64)
+
+        return self.rarity_matrix
+
+    def __get_gap_cdf(self, break_even: int):
+        '''
+        从水位 break_even 开始，距离下一个六星的抽数的累积分布，下标 k 对应第 k + 1 抽出六星
+        '''
+        matrix = self.__get_rarity_matrix(break_even + gap_limit)
+
+        six_index = self.rarity_keys.index(6)
+        rows = matrix[break_even + 1 : break_even + gap_limit + 1]
+        totals = rows[:, -1]
+        six = rows[:, six_index] - (rows[:, six_index - 1] if six_index else 0)
+
+        rate = six / totals
+        survival = np.concatenate(([1.0], np.cumprod(1 - rate)[:-1]))
+
+        return np.cumsum(rate * survival)
+
+    @staticmethod
+    def __sample_gaps(rng, cdf, count: int):
+        return np.searchsorted(cdf, rng.random(count) * cdf[-1], side='right') + 1
+
+    def __simulate_numpy(self, times: int, break_even: int):
+        '''
+        水位只在抽出六星时重置，因此两个六星之间的间隔独立同分布
+        先按间隔分布抽出所有六星的位置，再按每一抽所在的水位抽取其余星级，与逐抽模拟的分布一致
+        '''
+        rng = np.random.default_rng()
+
+        if self.reset_gap_cdf is None:
+            self.reset_gap_cdf = self.__get_gap_cdf(0)
+
+        gaps = self.__sample_gaps(rng, self.__get_gap_cdf(break_even), 1)
+        while gaps.sum() < times:
+            more = self.__sample_gaps(rng, self.reset_gap_cdf, max(times // 30, 1))
+            gaps = np.concatenate((gaps, more))
+
+        six_positions = np.cumsum(gaps) - 1
+        six_positions = six_positions[six_positions < times]
+
+        # 每一抽的水位 = 距离上一个六星（或本次寻访前的水位）的抽数
+        last_six = np.full(times, -1 - break_even, dtype=np.int64)
+        following = six_positions + 1
+        last_six[following[following < times]] = six_positions[following < times]
+        levels = np.arange(times) - np.maximum.accumulate(last_six)
+
+        keys = np.asarray(self.rarity_keys, dtype=np.int8)
+        six_index = self.rarity_keys.index(6)
+
+        matrix = self.__get_rarity_matrix(int(levels.max()))
+
+        # 非六星的抽取：在该水位的权重中去掉六星，区间整体平移
+        others = np.ones(times, dtype=bool)
+        others[six_positions] = False
+        other_levels = levels[others]
+
+        rows = matrix[other_levels]
+        offset = rows[:, six_index]
+        lower = rows[:, six_index - 1] if six_index else 0
+        point = rng.random(len(other_levels)) * (rows[:, -1] - offset + lower)
+        point = np.where(point >= lower, np.maximum(point + offset - lower, offset), point)
+
+        index = np.minimum((rows <= point[:, None]).sum(axis=1), len(keys) - 1)
+
+        rarities = np.empty(times, dtype=np.int8)
+        rarities[six_positions] = 6
+        rarities[others] = keys[index]
+
+        if len(six_positions):
+            break_even = times - 1 - int(six_positions[-1])
+        else:
+            break_even += times
+
+        names = np.empty(times, dtype=object)
+        for rarity, table in self.operator_tables.items():
+            positions = np.flatnonzero(rarities == rarity)
+            if len(positions):
+                population = np.asarray(table.population, dtype=object)
+                names[positions] = population[table.choice_index(rng.random(len(positions)))]
+
+        return GachaResult(rarities, names), break_even
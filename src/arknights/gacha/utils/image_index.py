@@ -0,0 +1,115 @@
+import os
+import time
+import threading
+
+from typing import Dict, List, Optional
+
+
+class DirectoryIndex:
+    '''
+    目录下文件名的内存索引，保持 os.walk 的遍历顺序
+    记录各级目录的修改时间，有文件被外部增删时重新扫描
+    '''
+
+    def __init__(self, path: str):
+        self.path = path
+        self.files: List[tuple] = []
+        self.dir_mtimes: Dict[str, Optional[int]] = {}
+        self.lookups: Dict[str, List[str]] = {}
+
+        self.scan()
+
+    @staticmethod
+    def get_mtime(path: str):
+        try:
+            return os.stat(path).st_mtime_ns
+        except OSError:
+            return None
+
+    def scan(self):
+        self.files = []
+        self.dir_mtimes = {self.path: self.get_mtime(self.path)}
+        self.lookups = {}
+
+        for root, dirs, files in os.walk(self.path):
+            self.dir_mtimes[root] = self.get_mtime(root)
+            for file in files:
+                self.files.append((file, os.path.join(root, file)))
+
+    def is_stale(self):
+        return any(self.get_mtime(path) != mtime for path, mtime in self.dir_mtimes.items())
+
+    def find(self, key: str):
+        if key not in self.lookups:
+            self.lookups[key] = [path for file, path in self.files if key in file]
+
+        return self.lookups[key]
+
+    def add(self, path: str):
+        self.files.append((os.path.basename(path), path))
+        self.lookups = {}
+
+        root = os.path.dirname(path)
+        if root in self.dir_mtimes:
+            self.dir_mtimes[root] = self.get_mtime(root)
+
+
+class ImageIndex:
+    lock = threading.Lock()
+    directories: Dict[str, DirectoryIndex] = {}
+
+    calls = 0
+    rescans = 0
+    cost = 0.0
+
+    @classmethod
+    def scan(cls, dir_name: str):
+        with cls.lock:
+            cls.directories[os.path.normpath(dir_name)] = DirectoryIndex(dir_name)
+
+    @classmethod
+    def find(cls, dir_name: str, key: str) -> List[str]:
+        '''
+        返回目录内文件名包含 key 的文件路径
+        '''
+        if not dir_name:
+            return []
+
+        start = time.perf_counter()
+        name = os.path.normpath(dir_name)
+
+        with cls.lock:
+            cls.calls += 1
+
+            index = cls.directories.get(name)
+            if index is None:
+                index = cls.directories[name] = DirectoryIndex(dir_name)
+                cls.rescans += 1
+            elif index.is_stale():
+                index.scan()
+                cls.rescans += 1
+
+            result = index.find(key)
+
+            cls.cost += time.perf_counter() - start
+
+        return result
+
+    @classmethod
+    def add(cls, path: str):
+        '''
+        保存新文件后登记到所在目录的索引
+        '''
+        with cls.lock:
+            for name, index in cls.directories.items():
+                if os.path.normpath(path).startswith(name + os.sep):
+                    index.add(path)
+
+    @classmethod
+    def stats(cls):
+        return {
+            'directories': len(cls.directories),
+            'calls': cls.calls,
+            'rescans': cls.rescans,
+            'avg_cost': round(cls.cost / cls.calls * 1000, 3) if cls.calls else 0,
+        }
@@ -1,5 +1,6 @@
 import json
 import os
+import time
 from typing import List
 from PIL import Image
 from io import BytesIO
@@ -9,6 +10,7 @@ import hashlib
 from core.database.bot import Pool
 
 from .logger import debug_log
+from .image_index import ImageIndex
 
 pool_image = 'resource/plugins/gacha/pool'
 custom_pool = 'resource/plugins/gacha/custom-pools'
@@ -57,7 +59,8 @@ def get_pool_image(pool: Pool):
     '''
     获取卡池的题头图片
     '''
-    pic = []
+    start = time.perf_counter()
+
     pool_image_filename = pool.pool_name
     if pool.is_official == False:
         pool_image_filename = pool.pool_image
@@ -65,16 +68,13 @@ def get_pool_image(pool: Pool):
         base_name_with_path, _ = os.path.splitext(pool_image_filename)
         base_name = os.path.basename(base_name_with_path)
         dir_name = os.path.dirname(pool_image_filename)
-        for root, dirs, files in os.walk(dir_name):
-            for file in files:
-                if base_name in file:
-                    pic.append(os.path.join(root, file))
+        pic = ImageIndex.find(dir_name, base_name)
     else:
         debug_log(f"pool_image_filename: {pool_image_filename}")
-        for root, dirs, files in os.walk(pool_image):
-            for file in files:
-                if pool_image_filename in file:
-                    pic.append(os.path.join(root, file))
+        pic = ImageIndex.find(pool_image, pool_image_filename)
+
+    debug_log(f"pool image resolved in {round((time.perf_counter() - start) * 1000, 3)}ms, {ImageIndex.stats()}")
+
     if pic:
         return pic[-1]
     else:
@@ -119,11 +119,10 @@ def save_image_from_base64(image_base64: str, output_file: str):
         base_name = os.path.basename(base_name_with_path)
         dir_name = os.path.dirname(output_file)
         debug_log(f"base_name: {base_name}")
-        for root, dirs, files in os.walk(dir_name):
-            for file in files:
-                if base_name in file:
-                    debug_log(f"已存在图片文件 {file}，不再保存")
-                    return os.path.join(root, file)
+        exists = ImageIndex.find(dir_name, base_name)
+        if exists:
+            debug_log(f"已存在图片文件 {exists[0]}，不再保存")
+            return exists[0]
 
         image_data = base64.b64decode(image_base64)
 
@@ -139,6 +138,7 @@ def save_image_from_base64(image_base64: str, output_file: str):
 
         # 保存图片到指定路径
         image.save(output_file)
+        ImageIndex.add(output_file)
         debug_log(f"图片已保存为 {output_file}")
         return output_file
     except Exception as e:
@@ -146,6 +146,18 @@ def save_image_from_base64(image_base64: str, output_file: str):
         return None
 
 
+def get_custom_pool_file(pool_selector):
+    '''
+    获取自定义池子的json文件路径，文件不存在时返回None
+    '''
+    pool_id_str = str(pool_selector).lower()
+    if pool_id_str.startswith("custom-"):
+        file_path = os.path.join(custom_pool, pool_id_str[7:] + '.json')
+        if os.path.exists(file_path):
+            return file_path
+    return None
+
+
 def get_custom_pool(pool_selector):
     '''
     根据池子的Id(存在UserGacha里的内容)获取池子
@@ -1,10 +1,13 @@
 import os
 import time
+import heapq
+import asyncio
 
+from typing import Dict, List, Optional
 from amiyabot.database import *
 from amiyabot.adapters.tencent.qqGroup import QQGroupBotInstance
 
-from core import bot as main_bot, Message, Chain, AmiyaBotPluginInstance
+from core import log, bot as main_bot, Message, Chain, AmiyaBotPluginInstance
 from core.database.user import UserBaseModel
 
 curr_dir = os.path.dirname(__file__)
@@ -23,7 +26,115 @@ class Intellect(UserBaseModel):
     status: int = IntegerField()
 
 
+class IntellectScheduler:
+    '''
+    理智提醒的调度器，待提醒的记录按回满时间放在最小堆中，只在最近一条到期时醒来
+    同一个用户重新记录后，堆中旧的条目会在弹出时被跳过
+    '''
+
+    def __init__(self, concurrency: int = 8, retry_interval: float = 10):
+        self.concurrency = concurrency
+        self.retry_interval = retry_interval
+        self.heap: List[tuple] = []
+        self.pending: Dict[str, dict] = {}
+        self.wakeup = asyncio.Event()
+        self.task: Optional[asyncio.Task] = None
+
+    def start(self):
+        self.heap = []
+        self.pending = {}
+
+        for item in Intellect.select().where(Intellect.status == 0):
+            self.add(item.__data__)
+
+        if self.task is None or self.task.done():
+            self.task = asyncio.create_task(self.run())
+
+    def stop(self):
+        if self.task:
+            self.task.cancel()
+            self.task = None
+
+    def add(self, record: dict):
+        self.pending[record['user_id']] = record
+        heapq.heappush(self.heap, (record['full_time'], record['user_id']))
+        self.wakeup.set()
+
+    def restore(self, due: List[dict]):
+        for item in due:
+            if item['user_id'] not in self.pending:
+                self.add(item)
+
+    def pop_due(self):
+        now = int(time.time())
+        due = []
+
+        while self.heap and self.heap[0][0] <= now:
+            full_time, user_id = heapq.heappop(self.heap)
+            record = self.pending.get(user_id)
+            if record and record['full_time'] == full_time:
+                due.append(self.pending.pop(user_id))
+
+        return due
+
+    def next_timeout(self):
+        return self.heap[0][0] - time.time() if self.heap else None
+
+    async def run(self):
+        while True:
+            self.wakeup.clear()
+
+            try:
+                await self.tick()
+            except Exception as e:
+                # 数据库断开等错误不结束任务，等待一段时间后重试，与原先的定时任务一样
+                log.error(e, desc='intellect scheduler error:')
+                await asyncio.sleep(self.retry_interval)
+
+    async def tick(self):
+        due = self.pop_due()
+        if due:
+            try:
+                Intellect.update(status=1).where(
+                    Intellect.user_id.in_([item['user_id'] for item in due]), Intellect.status == 0
+                ).execute()
+            except Exception:
+                # 状态没有写入时放回堆中，下次重试时再提醒
+                self.restore(due)
+                raise
+
+            semaphore = asyncio.Semaphore(self.concurrency)
+            await asyncio.gather(*[self.send(semaphore, item) for item in due])
+            return
+
+        try:
+            await asyncio.wait_for(self.wakeup.wait(), self.next_timeout())
+        except asyncio.TimeoutError:
+            pass
+
+    @staticmethod
+    async def send(semaphore: asyncio.Semaphore, item: dict):
+        text = f'博士！博士！您的理智已经满 {item["full_num"]} 了，快点上线查看吧～'
+
+        async with semaphore:
+            try:
+                await main_bot[item['belong_id']].send_message(
+                    Chain().at(item['user_id']).text(text), user_id=item['user_id'], channel_id=item['group_id']
+                )
+            except Exception as e:
+                log.error(e, desc='intellect remind error:')
+
+
+scheduler = IntellectScheduler()
+
+
 class IntellectPluginInstance(AmiyaBotPluginInstance):
+    def install(self):
+        scheduler.start()
+
+    def uninstall(self):
+        scheduler.stop()
+
     @staticmethod
     def set_record(data: Message, cur_num: int, full_num: int, full_time: int = None):
         full_time = full_time or (full_num - cur_num) * 6 * 60 + int(time.time())
@@ -44,6 +155,8 @@ class IntellectPluginInstance(AmiyaBotPluginInstance):
         else:
             Intellect.update(**update).where(Intellect.user_id == data.user_id).execute()
 
+        scheduler.add({'user_id': data.user_id, **update})
+
         return Chain(data).text(f'阿米娅已经帮博士记住了（{cur_num}/{full_num}），回复满的时候阿米娅会提醒博士的哦～')
 
 
@@ -127,17 +240,3 @@ async def _(data: Message):
         return bot.set_record(data, ap_info['current'] + int(ap), ap_info['max'], ap_info['completeRecoveryTime'])
     else:
         return Chain(data).text('未检测到森空岛插件，无法使用功能。')
-
-
-@bot.timed_task(each=10)
-async def _(_):
-    conditions = (Intellect.status == 0, Intellect.full_time <= int(time.time()))
-    results: List[Intellect] = Intellect.select().where(*conditions)
-    if results:
-        Intellect.update(status=1).where(*conditions).execute()
-        for item in results:
-            text = f'博士！博士！您的理智已经满 {item.full_num} 了，快点上线查看吧～'
-
-            await main_bot[item.belong_id].send_message(
-                Chain().at(item.user_id).text(text), user_id=item.user_id, channel_id=item.group_id
-            )
@@ -1,15 +1,16 @@
 import os
 import json
 import asyncio
+import hashlib
 
 from typing import Dict
 from amiyabot import event_bus
 from amiyabot.network.httpRequests import http_requests
 
 from core import log, Message, Chain, AmiyaBotPluginInstance, Requirement
-from core.util import any_match, find_most_similar, remove_punctuation
+from core.util import any_match, remove_punctuation, TimeRecorder
 from core.database.bot import *
-from core.resource.arknightsGameData import ArknightsGameData
+from core.resource.arknightsGameData import ArknightsGameData, ArknightsGameDataResource
 
 from functools import cmp_to_key
 
@@ -36,13 +37,26 @@ class YituliuData(BotBaseModel):
 
 class MaterialData:
     materials: List[str] = []
+    material_trees: Dict[str, List[dict]] = {}
+    material_descendants: Dict[str, List[tuple]] = {}
+    yituliu_index: Dict[str, List[dict]] = {}
+    yituliu_hash: str = ''
 
     @staticmethod
     async def save_yituliu_data():
+        time_rec = TimeRecorder()
+
         async with log.catch('yituliu data save error:'):
             t3 = await http_requests.get(yituliu_t3)
-            t3 = json.loads(t3)
             t2 = await http_requests.get(yituliu_t2)
+
+            # 数据没有变化时跳过写入
+            payload_hash = hashlib.md5(f'{t3}\n{t2}'.encode()).hexdigest()
+            if payload_hash == MaterialData.yituliu_hash and MaterialData.yituliu_index:
+                log.info(f'yituliu data has not changed, checked in {time_rec.total()}.')
+                return
+
+            t3 = json.loads(t3)
             t2 = json.loads(t2)
 
             yituliu_data = []
@@ -77,23 +91,138 @@ class MaterialData:
                         }
                     )
 
-            YituliuData.truncate_table()
-            YituliuData.batch_insert(yituliu_data)
+            inserted, updated, deleted = MaterialData.apply_yituliu_data(yituliu_data)
+            MaterialData.yituliu_hash = payload_hash
+
+            log.info(
+                f'yituliu data save successful: {inserted} inserted, {updated} updated, {deleted} deleted '
+                f'in {time_rec.total()}.'
+            )
 
-            log.info('yituliu data save successful.')
+        MaterialData.init_yituliu_index()
+
+    @staticmethod
+    def apply_yituliu_data(yituliu_data: List[dict]):
+        '''
+        与库内数据按 (materialId, stageId) 比较，只写入变化的行，并在同一个事务内完成，查询不会读到空表
+        变化的行分别用一条批量 UPDATE、一条 DELETE 和批量 INSERT 写入，数据没有变化时不产生任何写入
+        '''
+        fields = ['sampleConfidence', 'stageEfficiency', 'apExpect', 'knockRating']
+
+        exists: Dict[tuple, YituliuData] = {}
+        duplicated: List[int] = []
+        for item in YituliuData.select().order_by(YituliuData.id):
+            key = (item.materialId, item.stageId)
+            if key in exists:
+                duplicated.append(item.id)
+            else:
+                exists[key] = item
+
+        inserts = []
+        updates: List[YituliuData] = []
+        received = set()
+
+        for row in yituliu_data:
+            key = (row['materialId'], row['stageId'])
+            if key in received:
+                continue
+            received.add(key)
+
+            if key not in exists:
+                inserts.append(row)
+                continue
+
+            item = exists[key]
+            if any(getattr(item, field) != row[field] for field in fields):
+                for field in fields:
+                    setattr(item, field, row[field])
+                updates.append(item)
+
+        removed = [item.id for key, item in exists.items() if key not in received] + duplicated
+
+        with YituliuData._meta.database.atomic():
+            if updates:
+                YituliuData.bulk_update(updates, fields=fields, batch_size=200)
+
+            if removed:
+                YituliuData.delete().where(YituliuData.id.in_(removed)).execute()
+
+            if inserts:
+                YituliuData.batch_insert(inserts)
+
+        return len(inserts), len(updates), len(removed)
+
+    @classmethod
+    def init_yituliu_index(cls):
+        '''
+        按材料分组并预先排序一图流数据，查询材料时不再访问数据库
+        '''
+        groups: Dict[str, List[YituliuData]] = {}
+        for item in YituliuData.select().order_by(YituliuData.id):
+            if item.materialId not in groups:
+                groups[item.materialId] = []
+            groups[item.materialId].append(item)
+
+        index = {}
+        for material_id, items in groups.items():
+            sorted_list = sorted(items, key=cmp_to_key(cls.compare_efficiency), reverse=True)
+            index[material_id] = [
+                {
+                    'stageId': j.stageId,
+                    'stageEfficiency': f'{round(j.stageEfficiency)}%',
+                    'apExpect': round(j.apExpect),
+                    'knockRating': f'{round(j.knockRating * 100)}%',
+                    'sampleConfidence': f'{round(j.sampleConfidence)}%',
+                }
+                for j in sorted_list
+            ]
+
+        cls.yituliu_index = index
 
     @staticmethod
     async def init_materials():
         log.info('building materials names keywords...')
 
-        for name in ArknightsGameData.materials_map.keys():
-            MaterialData.materials.append(name)
+        MaterialData.materials = list(ArknightsGameData.materials_map.keys())
+
+        ArknightsGameDataResource.register_similar_words('material', MaterialData.materials)
+
+        MaterialData.init_material_trees()
 
     @classmethod
-    def find_material_children(cls, material_id: str, parent_id: str = ''):
+    def init_material_trees(cls):
+        '''
+        预先生成每个材料的合成树，以及合成树内所有材料按先序遍历展开的列表
+        '''
+        cache = {}
+
+        cls.material_trees = {
+            material_id: cls.find_material_children(material_id, cache=cache)
+            for material_id in ArknightsGameData.materials.keys()
+        }
+        cls.material_descendants = {
+            material_id: cls.flatten_material_tree(children) for material_id, children in cls.material_trees.items()
+        }
+
+    @classmethod
+    def flatten_material_tree(cls, children: List[dict]):
+        result = []
+        for item in children:
+            result.append((item['material_id'], item['material_name']))
+            result += cls.flatten_material_tree(item['children'])
+
+        return result
+
+    @classmethod
+    def find_material_children(cls, material_id: str, parent_id: str = '', cache: dict = None):
         game_data = ArknightsGameData
         children = []
 
+        if cache is not None:
+            if (material_id, parent_id) in cache:
+                return cache[(material_id, parent_id)]
+            cache[(material_id, parent_id)] = children
+
         if material_id in game_data.materials_made:
             for item in game_data.materials_made[material_id]:
                 children.append(
@@ -101,7 +230,7 @@ class MaterialData:
                         **item,
                         **game_data.materials[item['use_material_id']],
                         'children': (
-                            cls.find_material_children(item['use_material_id'], material_id)
+                            cls.find_material_children(item['use_material_id'], material_id, cache)
                             if item['use_material_id'] != parent_id
                             else []
                         ),
@@ -120,33 +249,25 @@ class MaterialData:
         material = game_data.materials[game_data.materials_map[name]]
         material_id = material['material_id']
 
+        if material_id not in cls.material_trees:
+            cls.material_trees[material_id] = cls.find_material_children(material_id)
+            cls.material_descendants[material_id] = cls.flatten_material_tree(cls.material_trees[material_id])
+
         result = {
             'name': name,
             'info': material,
-            'children': cls.find_material_children(material_id),
+            'children': cls.material_trees[material_id],
             'source': {'main': [], 'act': []},
             'recommend': [],
         }
 
-        yituliu_data = cls.find_yituliu_data([material, *cls.find_material_children(material_id)])
-        if yituliu_data:
-            for material_name, items in yituliu_data.items():
-                sorted_list = sorted(list(items), key=cmp_to_key(cls.compare_efficiency), reverse=True)
-                result['recommend'].append(
-                    {
-                        'name': material_name,
-                        'stages': [
-                            {
-                                'stageId': j.stageId,
-                                'stageEfficiency': f'{round(j.stageEfficiency)}%',
-                                'apExpect': round(j.apExpect),
-                                'knockRating': f'{round(j.knockRating * 100)}%',
-                                'sampleConfidence': f'{round(j.sampleConfidence)}%',
-                            }
-                            for j in sorted_list
-                        ],
-                    }
-                )
+        recommend = {}
+        for item_id, item_name in [(material_id, material['material_name']), *cls.material_descendants[material_id]]:
+            if item_id in cls.yituliu_index:
+                recommend[item_name] = cls.yituliu_index[item_id]
+
+        for material_name, stages in recommend.items():
+            result['recommend'].append({'name': material_name, 'stages': stages})
 
         if material_id in game_data.materials_source:
             source = game_data.materials_source[material_id]
@@ -165,18 +286,6 @@ class MaterialData:
 
         return result
 
-    @classmethod
-    def find_yituliu_data(cls, items: List[dict]):
-        data: Dict[str, List[YituliuData]] = {}
-        for item in items:
-            stages = YituliuData.select().where(YituliuData.materialId == item['material_id'])
-            if stages:
-                data[item['material_name']] = stages
-            if 'children' in item:
-                data.update(cls.find_yituliu_data(item['children']))
-
-        return data
-
     @classmethod
     def compare_knock_rating(cls, a, b):
         return a.knockRating - b.knockRating
@@ -239,7 +348,9 @@ async def verify(data: Message):
     if len(data.text_words) > int(limit_length):
         return False
 
-    name = find_most_similar(data.text.replace('材料', '').replace('阿米娅', ''), MaterialData.materials)
+    name = ArknightsGameDataResource.find_most_similar(
+        'material', data.text.replace('材料', '').replace('阿米娅', ''), MaterialData.materials
+    )
     keyword = any_match(data.text, ['检索', '材料'])
 
     if not keyword and name and remove_punctuation(name) not in remove_punctuation(data.text):
@@ -263,7 +374,7 @@ async def _(data: Message):
         wait = await data.wait(Chain(data).text('博士，请说明需要查询的材料名称'))
         if not wait or not wait.text:
             return None
-        name = find_most_similar(wait.text, MaterialData.materials)
+        name = ArknightsGameDataResource.find_most_similar('material', wait.text, MaterialData.materials)
 
         if not name:
             return Chain(data).text(f'博士，没有找到材料{wait.text}的资料 >.<')
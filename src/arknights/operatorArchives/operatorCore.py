@@ -5,8 +5,8 @@ from dataclasses import dataclass
 from amiyabot import GroupConfig, event_bus
 
 from core import Message, AmiyaBotPluginInstance, Requirement
-from core.util import any_match, find_most_similar, get_index_from_text, remove_punctuation
-from core.resource.arknightsGameData import ArknightsGameData, Operator
+from core.util import any_match, get_index_from_text, remove_punctuation
+from core.resource.arknightsGameData import ArknightsGameData, ArknightsGameDataResource, Operator
 
 from .operatorInfo import OperatorInfo, curr_dir
 
@@ -92,15 +92,18 @@ class FuncsVerify:
         return bool(info.group_key), default_level + 1, info
 
 
-def search_info(data: Message, source_keys: Optional[list] = None):
+def get_info_source(key_name: str):
     info_source = {
-        'name': OperatorInfo.operator_list + list(OperatorInfo.operator_en_name_map.keys()),
-        'skin_key': list(OperatorInfo.skins_map.keys()),
-        'group_key': list(OperatorInfo.operator_group_map.keys()),
-        'voice_key': OperatorInfo.voice_keywords,
-        'story_key': OperatorInfo.stories_keywords,
+        'name': lambda: OperatorInfo.operator_list + list(OperatorInfo.operator_en_name_map.keys()),
+        'skin_key': lambda: list(OperatorInfo.skins_map.keys()),
+        'group_key': lambda: list(OperatorInfo.operator_group_map.keys()),
+        'voice_key': lambda: OperatorInfo.voice_keywords,
+        'story_key': lambda: OperatorInfo.stories_keywords,
     }
+    return info_source[key_name]()
+
 
+def search_info(data: Message, source_keys: Optional[list] = None):
     info = OperatorSearchInfo()
     similar_mode = bot.get_config('searchSetting')['similarMode']
     limit_length = bot.get_config('searchSetting')['lengthLimit']
@@ -108,10 +111,16 @@ def search_info(data: Message, source_keys: Optional[list] = None):
     if len(data.text_words) > int(limit_length):
         return info
 
-    match_method = find_most_similar if similar_mode else get_longest
-
     for key_name in source_keys:
-        res = match_method(data.text, info_source[key_name])
+        if similar_mode:
+            res = ArknightsGameDataResource.find_most_similar(
+                f'operator.{key_name}', data.text, get_info_source(key_name)
+            )
+        elif key_name in OperatorInfo.keywords_index:
+            res = OperatorInfo.keywords_index[key_name].longest(data.text)
+        else:
+            res = get_longest(data.text, get_info_source(key_name))
+
         if res and remove_punctuation(res) in remove_punctuation(data.text):
             setattr(info, key_name, res)
 
@@ -2,10 +2,10 @@ import os
 import re
 import jieba
 
-from typing import Dict, List
+from typing import Any, Dict, List
 from core import log
 from core.util import chinese_to_digits, is_contain_digit, create_dir
-from core.resource.arknightsGameData import ArknightsGameData, Operator
+from core.resource.arknightsGameData import ArknightsGameData, ArknightsGameDataResource, Operator
 
 curr_dir = os.path.dirname(__file__)
 
@@ -20,6 +20,9 @@ class OperatorInfo:
     operator_en_name_map = {}
     operator_group_map: Dict[str, List[Operator]] = {}
 
+    # 关键词自动机由游戏数据插件的 ArknightsGameDataResource.build_keyword_index 建立
+    keywords_index: Dict[str, Any] = {}
+
     voice_keywords = [
         '任命助理',
         '任命队长',
@@ -66,6 +69,11 @@ class OperatorInfo:
         cls.operator_en_name_map = {}
         cls.operator_group_map = {}
 
+    @classmethod
+    def build_index(cls, key_name: str, words: List[str]):
+        cls.keywords_index[key_name] = ArknightsGameDataResource.build_keyword_index(words)
+        ArknightsGameDataResource.register_similar_words(f'operator.{key_name}', words)
+
     @classmethod
     def set_jieba_dict(cls):
         dict_file = 'resource/plugins/operators.txt'
@@ -109,6 +117,10 @@ class OperatorInfo:
 
         cls.set_jieba_dict()
 
+        cls.build_index('name', cls.operator_list + list(cls.operator_en_name_map.keys()))
+        cls.build_index('group_key', list(cls.operator_group_map.keys()))
+        cls.build_index('voice_key', cls.voice_keywords)
+
     @classmethod
     async def init_stories_keywords(cls):
         log.info('building operator stories keywords...')
@@ -125,6 +137,7 @@ class OperatorInfo:
                 stories_keyword.append(item + ' 500 n')
 
         cls.stories_keywords = list(stories_title.keys()) + [i for k, i in stories_title.items()]
+        cls.build_index('story_key', cls.stories_keywords)
 
     @classmethod
     async def init_skins_keywords(cls):
@@ -138,3 +151,4 @@ class OperatorInfo:
                 skins_map[n['skin_name']] = n
 
         cls.skins_map = skins_map
+        cls.build_index('skin_key', list(skins_map.keys()))
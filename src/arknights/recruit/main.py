@@ -1,15 +1,16 @@
 import os
 import dhash
+import hashlib
 import jieba
 import shutil
-import random
 import asyncio
 import platform
 
 from io import BytesIO
 from PIL import Image
 from jieba import posseg
-from typing import List
+from typing import List, Dict
+from collections import OrderedDict
 from attrdict import AttrDict
 from itertools import combinations
 from amiyabot import event_bus
@@ -18,10 +19,12 @@ from amiyabot.adapters.cqhttp import CQHttpBotInstance
 from amiyabot.adapters.tencent.qqGroup import QQGroupBotInstance
 
 from core import log, Message, Chain, AmiyaBotPluginInstance, Requirement
-from core.util import all_match, read_yaml, create_dir, run_in_thread_pool
+from core.util import read_yaml, create_dir, run_in_thread_pool, TimeRecorder
 from core.lib.baiduCloud import BaiduCloud
 from core.resource.arknightsGameData import ArknightsGameData
 
+from .ocrService import OcrService, BaiduBackend, CQHttpBackend, PaddleBackend, WindowsBackend
+
 curr_dir = os.path.dirname(__file__)
 config_path = 'resource/plugins/baiduCloud.yaml'
 localOCR_path = 'resource/plugins/Windows.Media.Ocr.Cli.exe'
@@ -37,6 +40,7 @@ if not os.path.exists(localOCR_path):
 
 recruit_config = read_yaml(f'{curr_dir}/recruit.yaml')
 discern = recruit_config.autoDiscern
+ocr_config = recruit_config.ocr
 
 localOCR_enabled = platform.release() == '10'
 paddle_enabled = False
@@ -53,6 +57,8 @@ except ModuleNotFoundError:
 
 class Recruit:
     tags_list: List[str] = []
+    tags_bit: Dict[str, int] = {}
+    combinations_table: Dict[int, dict] = {}
 
     @staticmethod
     async def init_tags_list():
@@ -71,6 +77,84 @@ class Recruit:
 
         Recruit.tags_list = tags
 
+        Recruit.init_combinations_table()
+
+    @staticmethod
+    def init_combinations_table():
+        '''
+        预先计算所有 1 ~ 3 个标签的组合能锁定的干员
+        标签编码为二进制位，组合以各标签位之和作为键，查询时只需查表
+        '''
+        time_rec = TimeRecorder()
+
+        operators = sorted(
+            [item for item in ArknightsGameData.operators.values() if item.is_recruit],
+            key=lambda n: -n.rarity,
+        )
+
+        tags_bit = {}
+        table: Dict[int, list] = {}
+
+        for item in operators:
+            operator = {
+                'operator_id': item.id,
+                'operator_name': item.name,
+                'operator_rarity': item.rarity,
+                'operator_tags': item.tags,
+            }
+            for tag in item.tags:
+                if tag not in tags_bit:
+                    tags_bit[tag] = 1 << len(tags_bit)
+
+            for comb in find_combinations(list(dict.fromkeys(item.tags))):
+                key = sum(tags_bit[tag] for tag in comb)
+                if key not in table:
+                    table[key] = []
+                table[key].append(operator)
+
+        high_star = tags_bit.get('高级资深干员', 0)
+        combinations_table = {}
+
+        for key, items in table.items():
+            # 未选择高级资深干员时不会出现六星干员
+            if not key & high_star:
+                items = [n for n in items if n['operator_rarity'] != 6]
+
+            rarities = [n['operator_rarity'] for n in items]
+
+            # 可能出现二星或三星干员的组合无法锁定稀有干员
+            if not items or 2 in rarities or 3 in rarities:
+                continue
+
+            combinations_table[key] = {
+                'operators': items,
+                'min_rarity': min(rarities),
+                'max_rarity': max(rarities),
+            }
+
+        Recruit.tags_bit = tags_bit
+        Recruit.combinations_table = combinations_table
+
+        log.info(
+            f'recruit combinations table built: {len(combinations_table)} of {len(table)} combinations '
+            f'from {len(operators)} operators in {time_rec.total()}.'
+        )
+
+    @classmethod
+    def find_groups(cls, tags: List[str]):
+        groups = []
+
+        for comb in find_combinations(tags):
+            if any(tag not in cls.tags_bit for tag in comb):
+                continue
+
+            key = sum(cls.tags_bit[tag] for tag in comb)
+            if key in cls.combinations_table:
+                item = cls.combinations_table[key]
+                groups.append({'tags': comb, 'max_rarity': item['max_rarity'], 'operators': item['operators']})
+
+        return sorted(groups, key=lambda n: (-len(n['tags']), -n['max_rarity']))
+
     @classmethod
     async def action(cls, data: Message, text: str, ocr: bool = False):
         reply = Chain(data)
@@ -83,7 +167,6 @@ class Recruit:
         words = posseg.lcut(text.replace('公招', ''))
 
         tags = []
-        max_rarity = 5
         for item in words:
             if item.word in cls.tags_list:
                 if item.word in ['资深', '资深干员'] and '资深干员' not in tags:
@@ -91,44 +174,15 @@ class Recruit:
                     continue
                 if item.word in ['高资', '高级资深', '高级资深干员'] and '高级资深干员' not in tags:
                     tags.append('高级资深干员')
-                    max_rarity = 6
                     continue
                 if item.word not in tags:
                     tags.append(item.word)
 
         if tags:
-            result = find_operator_tags_by_tags(tags, max_rarity=max_rarity)
-            if result:
-                operators = {}
-                for item in result:
-                    name = item['operator_name']
-                    if name not in operators:
-                        operators[name] = item
-                    else:
-                        operators[name]['operator_tags'] += item['operator_tags']
-
-                groups = []
-
-                for comb in [tags] if len(tags) == 1 else find_combinations(tags):
-                    lst = []
-                    max_r = 0
-                    for name, item in operators.items():
-                        rarity = item['operator_rarity']
-                        if all_match(item['operator_tags'], comb):
-                            if rarity == 6 and '高级资深干员' not in comb:
-                                continue
-                            if rarity >= 4 or rarity == 1:
-                                if rarity > max_r:
-                                    max_r = rarity
-                                lst.append(item)
-                            else:
-                                break
-                    else:
-                        if lst:
-                            groups.append({'tags': comb, 'max_rarity': max_r, 'operators': lst})
+            if any(tag in cls.tags_bit for tag in tags):
+                groups = cls.find_groups(tags)
 
                 if groups:
-                    groups = sorted(groups, key=lambda n: (-len(n['tags']), -n['max_rarity']))
                     return reply.html(f'{curr_dir}/template/operatorRecruit.html', {'groups': groups, 'tags': tags})
                 else:
                     return reply.text('博士，没有找到可以锁定稀有干员的组合')
@@ -145,6 +199,7 @@ class RecruitPluginInstance(AmiyaBotPluginInstance):
 
     def uninstall(self):
         event_bus.unsubscribe('gameDataInitialized', update)
+        ocr_service.close()
 
 
 bot = RecruitPluginInstance(
@@ -186,25 +241,6 @@ def get_baidu():
     return baidu
 
 
-def find_operator_tags_by_tags(tags, max_rarity):
-    res = []
-    for name, item in ArknightsGameData.operators.items():
-        if not item.is_recruit or item.rarity > max_rarity:
-            continue
-        for tag in item.tags:
-            if tag in tags:
-                res.append(
-                    {
-                        'operator_id': item.id,
-                        'operator_name': name,
-                        'operator_rarity': item.rarity,
-                        'operator_tags': tag,
-                    }
-                )
-
-    return sorted(res, key=lambda n: -n['operator_rarity'])
-
-
 def find_combinations(_list):
     result = []
     for i in range(3):
@@ -216,69 +252,142 @@ def find_combinations(_list):
     return result
 
 
+class AutoDiscern:
+    '''
+    公招截图自动识别，依次经过：结果缓存 -> 图片头部尺寸检查 -> 线程池内解码并计算 dhash
+    '''
+
+    semaphore = asyncio.Semaphore(discern.concurrency)
+
+    url_cache = OrderedDict()
+    hash_cache = OrderedDict()
+
+    scanned = 0
+    matched = 0
+    cache_hits = 0
+    filtered = 0
+
+    @staticmethod
+    def cache_get(cache: OrderedDict, key):
+        if key in cache:
+            cache.move_to_end(key)
+            return cache[key]
+
+    @staticmethod
+    def cache_set(cache: OrderedDict, key, value):
+        cache[key] = value
+        if len(cache) > discern.cacheSize:
+            cache.popitem(last=False)
+
+    @staticmethod
+    def check_size(img: bytes):
+        '''
+        可选的尺寸预筛选，各项为 0 时不限制，默认全部不限制
+        '''
+        if not (discern.minWidth or discern.minRatio or discern.maxRatio):
+            return True
+
+        # Image.open 只读取文件头，不会解码像素
+        with Image.open(BytesIO(img)) as image:
+            width, height = image.size
+
+        if not height:
+            return False
+
+        ratio = width / height
+
+        if discern.minWidth and width < discern.minWidth:
+            return False
+        if discern.minRatio and ratio < discern.minRatio:
+            return False
+        if discern.maxRatio and ratio > discern.maxRatio:
+            return False
+
+        return True
+
+    @staticmethod
+    def get_diff(img: bytes):
+        hash_value = dhash.dhash_int(Image.open(BytesIO(img)))
+        return dhash.get_num_bits_different(hash_value, discern.templateHash)
+
+    @classmethod
+    async def is_recruit_image(cls, item):
+        url = item if isinstance(item, str) else None
+
+        if url and cls.cache_get(cls.url_cache, url) is False:
+            cls.cache_hits += 1
+            return None
+
+        async with cls.semaphore:
+            img = await download_async(item) if url else item
+            if not img:
+                return None
+
+            cls.scanned += 1
+
+            key = hashlib.md5(img).hexdigest()
+            result = cls.cache_get(cls.hash_cache, key)
+
+            if result is not None:
+                cls.cache_hits += 1
+            elif not cls.check_size(img):
+                cls.filtered += 1
+                result = False
+            else:
+                result = await run_in_thread_pool(cls.get_diff, img) <= discern.maxDifferent
+
+            cls.cache_set(cls.hash_cache, key, result)
+            if url:
+                cls.cache_set(cls.url_cache, url, result)
+
+        if cls.scanned and cls.scanned % 1000 == 0:
+            log.info(f'recruit auto discern: {cls.stats()}')
+
+        if result:
+            cls.matched += 1
+            return img
+
+    @classmethod
+    def stats(cls):
+        return {
+            'scanned': cls.scanned,
+            'matched': cls.matched,
+            'cache_hits': cls.cache_hits,
+            'filtered': cls.filtered,
+        }
+
+
 async def auto_discern(data: Message):
     for item in data.image:
-        img = await download_async(item)
+        try:
+            img = await AutoDiscern.is_recruit_image(item)
+        except OSError:
+            return False
+
         if img:
-            try:
-                hash_value = dhash.dhash_int(Image.open(BytesIO(img)))
-                diff = dhash.get_num_bits_different(hash_value, discern.templateHash)
-            except OSError:
-                return False
-
-            if diff <= discern.maxDifferent:
-                data.image = [img]
-                return True
+            data.image = [img]
+            return True
     return False
 
 
-async def get_ocr_result(data: Message):
-    result = ''
-    baidu = get_baidu()
-
-    if baidu.enable:
-        res = await baidu.basic_accurate(data.image[0])
-        if not res:
-            res = await baidu.basic_general(data.image[0])
-
-        if res and 'words_result' in res:
-            result = ''.join([item['words'] for item in res['words_result']])
-
-    # 如果百度 OCR 没有结果且实例是 go-cq，调用 go-cq OCR
-    if not result and type(data.instance) is CQHttpBotInstance:
-        instance: CQHttpBotInstance = data.instance
-        async with log.catch():
-            images_id = [item['data']['file'] for item in data.message['message'] if item['type'] == 'image']
-            if images_id:
-                cq_res = await instance.api.post('/ocr_image', {'image': images_id[0]})
-                result = ''.join([item['text'] for item in cq_res.json['data']['texts']])
-
-    # 如果都没有结果调用paddle OCR
-    if paddle_enabled and not result:
-        try:
-            res = await run_in_thread_pool(paddle_ocr.ocr, data.image[0])
-            str_ret = [text[1][0] for text in res[0]]
-            result = ''.join(str_ret)
-        except Exception as e:
-            log.error(e, desc='ocr error:')
-
-    # 如果存在本地 OCR 程序，调用
-    if localOCR_enabled and not result:
-        try:
-            f_name = f'{curr_dir}/{random.random()}.png'
-            img = data.image[0]
-            if isinstance(img, str):
-                img = await download_async(data.image[0])
-            pil_image = Image.open(BytesIO(img))
-            pil_image.save(f_name, 'PNG')
-            with os.popen(f'"{os.path.abspath(localOCR_path)}" {f_name}', 'r') as pipe:
-                result = await run_in_thread_pool(pipe.read)
-            result.replace('\n', '')
-            os.remove(f_name)
-        except Exception as e:
-            log.error(e, desc='Windows.Media.Ocr error:')
+def create_ocr_service():
+    # 依次尝试：百度 OCR、go-cq OCR、PaddleOCR、Windows.Media.Ocr.Cli
+    worker_config = {'batch_size': ocr_config.batchSize, 'batch_window': ocr_config.batchWindow}
 
-    return result
+    backends = [BaiduBackend(get_baidu), CQHttpBackend()]
+    if paddle_enabled:
+        backends.append(PaddleBackend(paddle_ocr, **worker_config))
+    if localOCR_enabled:
+        backends.append(WindowsBackend(localOCR_path, os.path.dirname(localOCR_path), **worker_config))
+
+    return OcrService(backends, timeout=ocr_config.timeout, cache_size=ocr_config.cacheSize)
+
+
+ocr_service = create_ocr_service()
+
+
+async def get_ocr_result(data: Message):
+    return await ocr_service.recognize(data)
 
 
 @bot.on_message(keywords=['公招', '公开招募'], allow_direct=True, level=10)
@@ -0,0 +1,302 @@
+import os
+import abc
+import time
+import asyncio
+import locale
+import hashlib
+import tempfile
+import subprocess
+
+from io import BytesIO
+from PIL import Image
+from typing import List, Callable, Optional
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from amiyabot.network.download import download_async
+from amiyabot.adapters.cqhttp import CQHttpBotInstance
+
+from core import log, Message
+
+
+class LocalWorker:
+    '''
+    本地 OCR 引擎的常驻工作线程
+    短时间内到达的请求合并为一批交给同一个线程处理，相同的图片只识别一次
+    '''
+
+    def __init__(self, name: str, handler: Callable[[bytes], str], batch_size: int = 4, batch_window: float = 0.05):
+        self.handler = handler
+        self.batch_size = batch_size
+        self.batch_window = batch_window
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix=f'ocr-{name}')
+
+        self.pending = []
+        self.timer: Optional[asyncio.TimerHandle] = None
+
+        self.batches = 0
+
+    async def submit(self, img: bytes):
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+
+        self.pending.append((img, future))
+
+        if len(self.pending) >= self.batch_size:
+            self.flush()
+        elif self.timer is None:
+            self.timer = loop.call_later(self.batch_window, self.flush)
+
+        return await future
+
+    def flush(self):
+        if self.timer is not None:
+            self.timer.cancel()
+            self.timer = None
+
+        batch, self.pending = self.pending, []
+        if not batch:
+            return
+
+        job = asyncio.get_running_loop().run_in_executor(self.executor, self.run_batch, [img for img, _ in batch])
+
+        def callback(task: asyncio.Future):
+            results = task.result() if not task.exception() else [task.exception()] * len(batch)
+            for (_, future), result in zip(batch, results):
+                if future.done():
+                    continue
+                if isinstance(result, Exception):
+                    future.set_exception(result)
+                else:
+                    future.set_result(result)
+
+        job.add_done_callback(callback)
+
+    def run_batch(self, images: List[bytes]):
+        self.batches += 1
+
+        done = {}
+        results = []
+
+        for img in images:
+            key = hashlib.md5(img).hexdigest()
+            if key not in done:
+                try:
+                    done[key] = self.handler(img)
+                except Exception as e:
+                    done[key] = e
+            results.append(done[key])
+
+        return results
+
+    def close(self):
+        self.executor.shutdown(wait=False)
+
+
+class OcrBackend(abc.ABC):
+    name = 'backend'
+
+    def __init__(self):
+        self.calls = 0
+        self.hits = 0
+        self.errors = 0
+        self.timeouts = 0
+        self.cost = 0.0
+
+    def available(self, data: Message) -> bool:
+        return True
+
+    @abc.abstractmethod
+    async def recognize(self, data: Message, img: bytes) -> str:
+        ...
+
+    async def run(self, data: Message, img: bytes, timeout: float):
+        self.calls += 1
+        start = time.perf_counter()
+
+        try:
+            result = await asyncio.wait_for(self.recognize(data, img), timeout)
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            log.warning(f'{self.name} ocr timeout.')
+            result = ''
+        except Exception as e:
+            self.errors += 1
+            log.error(e, desc=f'{self.name} ocr error:')
+            result = ''
+
+        self.cost += time.perf_counter() - start
+
+        if result:
+            self.hits += 1
+
+        return result
+
+    def stats(self):
+        return {
+            'calls': self.calls,
+            'hits': self.hits,
+            'errors': self.errors,
+            'timeouts': self.timeouts,
+            'avg_cost': round(self.cost / self.calls * 1000, 3) if self.calls else 0,
+        }
+
+    def close(self):
+        pass
+
+
+class BaiduBackend(OcrBackend):
+    name = 'baidu'
+
+    def __init__(self, get_baidu: Callable):
+        super().__init__()
+        self.get_baidu = get_baidu
+
+    def available(self, data: Message):
+        return self.get_baidu().enable
+
+    async def recognize(self, data: Message, img: bytes):
+        baidu = self.get_baidu()
+
+        res = await baidu.basic_accurate(img)
+        if not res:
+            res = await baidu.basic_general(img)
+
+        if res and 'words_result' in res:
+            return ''.join([item['words'] for item in res['words_result']])
+        return ''
+
+
+class CQHttpBackend(OcrBackend):
+    name = 'cqhttp'
+
+    def available(self, data: Message):
+        return type(data.instance) is CQHttpBotInstance
+
+    async def recognize(self, data: Message, img: bytes):
+        instance: CQHttpBotInstance = data.instance
+        images_id = [item['data']['file'] for item in data.message['message'] if item['type'] == 'image']
+        if images_id:
+            cq_res = await instance.api.post('/ocr_image', {'image': images_id[0]})
+            return ''.join([item['text'] for item in cq_res.json['data']['texts']])
+        return ''
+
+
+class LocalBackend(OcrBackend):
+    def __init__(self, handler: Callable[[bytes], str], batch_size: int = 4, batch_window: float = 0.05):
+        super().__init__()
+        self.worker = LocalWorker(self.name, handler, batch_size, batch_window)
+
+    async def recognize(self, data: Message, img: bytes):
+        return await self.worker.submit(img)
+
+    def close(self):
+        self.worker.close()
+
+
+class PaddleBackend(LocalBackend):
+    name = 'paddle'
+
+    def __init__(self, paddle_ocr, **kwargs):
+        super().__init__(self.ocr, **kwargs)
+        self.paddle_ocr = paddle_ocr
+
+    def ocr(self, img: bytes):
+        res = self.paddle_ocr.ocr(img)
+        return ''.join([text[1][0] for text in res[0]]) if res and res[0] else ''
+
+
+class WindowsBackend(LocalBackend):
+    name = 'windows'
+
+    def __init__(self, exe_path: str, work_dir: str, **kwargs):
+        super().__init__(self.ocr, **kwargs)
+        self.exe_path = os.path.abspath(exe_path)
+        self.work_dir = os.path.abspath(work_dir)
+
+    def ocr(self, img: bytes):
+        # Windows.Media.Ocr.Cli 只接受文件路径，不能从标准输入读取图片，因此仍需写入临时文件
+        # 统一转存为 PNG，保证 CLI 能解码各种格式的截图
+        fd, image_path = tempfile.mkstemp(suffix='.png', dir=self.work_dir)
+        try:
+            with os.fdopen(fd, mode='wb') as file:
+                Image.open(BytesIO(img)).save(file, 'PNG')
+
+            res = subprocess.run([self.exe_path, image_path], capture_output=True)
+        finally:
+            os.remove(image_path)
+
+        return res.stdout.decode(locale.getpreferredencoding(False), errors='ignore').strip()
+
+
+class FakeBackend(LocalBackend):
+    '''
+    测试用的本地后端，识别过程由传入的 ocr 函数决定，同样经过 LocalWorker 合并请求
+    '''
+
+    name = 'fake'
+
+    def __init__(self, ocr: Callable[[bytes], str], **kwargs):
+        super().__init__(ocr, **kwargs)
+        self.ocr = ocr
+
+
+class OcrService:
+    '''
+    按顺序尝试各个 OCR 后端，识别结果按图片内容的 md5 缓存
+    公招截图的布局都相同，感知哈希相近的两张截图可能是不同的标签，因此不能按 dhash 缓存
+    '''
+
+    def __init__(self, backends: List[OcrBackend], timeout: float = 15, cache_size: int = 128):
+        self.backends = backends
+        self.timeout = timeout
+        self.cache_size = cache_size
+        self.cache = OrderedDict()
+
+        self.calls = 0
+        self.cache_hits = 0
+
+    async def recognize(self, data: Message):
+        if not data.image:
+            return ''
+
+        img = data.image[0]
+        if isinstance(img, str):
+            img = await download_async(img)
+        if not img:
+            return ''
+
+        self.calls += 1
+
+        key = hashlib.md5(img).hexdigest()
+        if key in self.cache:
+            self.cache_hits += 1
+            self.cache.move_to_end(key)
+            return self.cache[key]
+
+        result = ''
+        for backend in self.backends:
+            if backend.available(data):
+                result = await backend.run(data, img, self.timeout)
+                if result:
+                    break
+
+        if result:
+            self.cache[key] = result
+            if len(self.cache) > self.cache_size:
+                self.cache.popitem(last=False)
+
+        if self.calls % 100 == 0:
+            log.info(f'recruit ocr service: {self.stats()}')
+
+        return result
+
+    def stats(self):
+        return {
+            'calls': self.calls,
+            'cache_hits': self.cache_hits,
+            'backends': {item.name: item.stats() for item in self.backends},
+        }
+
+    def close(self):
+        for backend in self.backends:
+            backend.close()
@@ -1,33 +1,72 @@
 import re
 import os
 import json
-import jieba
 import asyncio
 
+from typing import Any, Dict, Optional
 from amiyabot import event_bus
-from amiyabot.network.download import download_async
 
 from core import log, Message, Chain, AmiyaBotPluginInstance, Requirement
-from core.util import any_match, remove_punctuation, get_index_from_text, create_dir
-from core.resource.arknightsGameData import ArknightsGameData
+from core.util import TimeRecorder, any_match, read_yaml, remove_punctuation, get_index_from_text, create_dir
+from core.resource.arknightsGameData import ArknightsGameData, ArknightsGameDataResource
+
+from .mapCache import MapCache
+from .stageIndex import segment
 
 curr_dir = os.path.dirname(__file__)
 cache_dir = 'resource/plugins/stages'
 
+stage_config = read_yaml(f'{curr_dir}/stage.yaml')
+map_cache = MapCache(cache_dir, stage_config.maps.baseUrl)
+
 multiple_zone_stage = {'CF-9': 2}
+stage_levels = ['_hard', '_easy', '_tough']
 
 
 class Stage:
-    @staticmethod
-    async def init_stages():
+    sxys_maps: Dict[str, str] = {}
+    # 关键词自动机由游戏数据插件提供，在 init_stages 中建立
+    sxys_index: Optional[Any] = None
+    stages_index: Optional[Any] = None
+    prefetch_task: Optional[asyncio.Task] = None
+
+    @classmethod
+    async def init_stages(cls):
         log.info('building stages keywords dict...')
 
-        stages = list(ArknightsGameData.stages_map.keys()) + list(ArknightsGameData.side_story_map.keys())
+        time_rec = TimeRecorder()
+
+        with open(f'{curr_dir}/sxys.json', mode='r', encoding='utf-8') as f:
+            sxys_maps: dict = json.load(f)
+
+        no_punctuation = {remove_punctuation(item, ['-']): key for item, key in sxys_maps.items()}
+
+        # 原标题优先于去掉标点的标题
+        cls.sxys_maps = {**no_punctuation, **sxys_maps}
+        cls.sxys_index = ArknightsGameDataResource.build_keyword_index(
+            list(sxys_maps.keys()) + list(no_punctuation.keys())
+        )
 
-        with open(f'{cache_dir}/stages.txt', mode='w', encoding='utf-8') as file:
-            file.write('\n'.join([f'{name} 500 n' for name in stages]))
+        # 关卡代号和关卡名去掉难度后缀后与活动名一起建立索引，难度在查询时再拼接
+        stages = []
+        for key in ArknightsGameData.stages_map.keys():
+            for level in stage_levels:
+                if key.endswith(level):
+                    key = key[: -len(level)]
+                    break
+            stages.append(key)
 
-        jieba.load_userdict(f'{cache_dir}/stages.txt')
+        cls.stages_index = ArknightsGameDataResource.build_keyword_index(
+            stages + list(ArknightsGameData.side_story_map.keys())
+        )
+
+        log.info(f'stages keywords dict built, {len(cls.stages_index.first_index)} keywords in {time_rec.total()}.')
+
+        # 游戏数据更新会再次初始化，上一次的预下载还没有结束时不重复启动
+        if stage_config.maps.prefetch and (cls.prefetch_task is None or cls.prefetch_task.done()):
+            cls.prefetch_task = asyncio.create_task(
+                map_cache.prefetch(list(sxys_maps.values()), stage_config.maps.concurrency)
+            )
 
 
 class StagePluginInstance(AmiyaBotPluginInstance):
@@ -67,26 +106,19 @@ async def _(data: Message):
         if not r.group(3).strip():
             return Chain(data).text('博士，请发送“地图 + 地图编号/地图名”查询信息~')
 
-    with open(f'{curr_dir}/sxys.json', mode='r', encoding='utf-8') as f:
-        sxys_maps: dict = json.load(f)
+    if Stage.sxys_index is None or Stage.stages_index is None:
+        return Chain(data).text('抱歉博士，关卡数据正在初始化，请稍后再试')
 
-    no_punctuation = {remove_punctuation(item, ['-']): key for item, key in sxys_maps.items()}
-    sxys_titles = list(sxys_maps.keys()) + list(no_punctuation.keys())
-    sxys_match = any_match(data.text_original, sxys_titles)
+    sxys_match = Stage.sxys_index.first(data.text_original)
     if sxys_match:
-        sxys_key = sxys_maps.get(sxys_match) or no_punctuation.get(sxys_match)
-        sxys_file = os.path.join(cache_dir, f'{sxys_key}.jpg')
-
-        if not os.path.exists(os.path.join(cache_dir, sxys_file)):
-            f = await download_async(
-                f'https://amiyabot-1302462817.cos.ap-guangzhou.myqcloud.com/resource/maps/{sxys_key}.jpg'
-            )
-            with open(sxys_file, mode='wb') as cache_file:
-                cache_file.write(f)
+        sxys_key = Stage.sxys_maps[sxys_match]
+        sxys_file = await map_cache.get(sxys_key)
+        if not sxys_file:
+            return Chain(data).text('抱歉博士，地图下载失败，请稍后再试')
 
         return Chain(data).image(sxys_file)
 
-    words = jieba.lcut(remove_punctuation(data.text, ['-']).upper().replace(' ', ''))
+    words = segment(Stage.stages_index, remove_punctuation(data.text, ['-']).upper().replace(' ', ''))
 
     level = ''
     level_str = ''
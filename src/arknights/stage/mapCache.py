@@ -0,0 +1,97 @@
+import os
+import asyncio
+import tempfile
+
+from typing import Dict, List, Optional
+from amiyabot.network.download import download_async
+
+from core import log
+
+
+class MapCache:
+    '''
+    sxys 地图的本地缓存
+    同一张地图同时只会下载一次，下载完成后先写入临时文件再替换，不会读到写了一半的图片
+    '''
+
+    def __init__(self, cache_dir: str, base_url: str):
+        self.cache_dir = cache_dir
+        self.base_url = base_url.rstrip('/')
+        self.pending: Dict[str, asyncio.Future] = {}
+
+        self.hits = 0
+        self.downloads = 0
+        self.failures = 0
+
+    def path(self, key: str):
+        return os.path.join(self.cache_dir, f'{key}.jpg')
+
+    async def get(self, key: str) -> Optional[str]:
+        '''
+        返回地图的本地路径，下载失败时返回 None
+        '''
+        path = self.path(key)
+
+        if os.path.exists(path):
+            self.hits += 1
+            return path
+
+        if key not in self.pending:
+            self.pending[key] = asyncio.ensure_future(self.__download(key))
+            self.pending[key].add_done_callback(lambda _: self.pending.pop(key, None))
+
+        return await asyncio.shield(self.pending[key])
+
+    async def __download(self, key: str):
+        self.downloads += 1
+
+        content = await download_async(f'{self.base_url}/{key}.jpg')
+        if not content:
+            self.failures += 1
+            log.warning(f'stage map {key} download failed.')
+            return None
+
+        path = self.path(key)
+
+        fd, temp = tempfile.mkstemp(dir=self.cache_dir, suffix='.tmp')
+        try:
+            with os.fdopen(fd, mode='wb') as file:
+                file.write(content)
+            os.replace(temp, path)
+        except OSError:
+            if os.path.exists(temp):
+                os.remove(temp)
+            raise
+
+        return path
+
+    async def prefetch(self, keys: List[str], concurrency: int = 4):
+        '''
+        预先下载所有未缓存的地图
+        '''
+        semaphore = asyncio.Semaphore(max(concurrency, 1))
+
+        async def fetch(key: str):
+            async with semaphore:
+                try:
+                    await self.get(key)
+                except Exception as e:
+                    self.failures += 1
+                    log.error(e, desc=f'stage map {key} prefetch error:')
+
+        missing = [key for key in dict.fromkeys(keys) if not os.path.exists(self.path(key))]
+        if not missing:
+            return
+
+        log.info(f'prefetching {len(missing)} stage maps...')
+
+        await asyncio.gather(*[fetch(key) for key in missing])
+
+        log.info(f'stage maps prefetched: {self.stats()}')
+
+    def stats(self):
+        return {
+            'hits': self.hits,
+            'downloads': self.downloads,
+            'failures': self.failures,
+        }
@@ -0,0 +1,21 @@
+from typing import Dict
+
+
+def segment(index, text: str):
+    '''
+    按最左最长的原则从文本中切分出互不重叠的关键词
+    index 为 ArknightsGameDataResource.build_keyword_index 建立的关键词自动机
+    '''
+    longest: Dict[int, str] = {}
+    for start, word in index.find_all(text):
+        if start not in longest or len(word) > len(longest[start]):
+            longest[start] = word
+
+    result = []
+    position = 0
+    for start in sorted(longest):
+        if start >= position:
+            result.append(longest[start])
+            position = start + len(longest[start])
+
+    return result
@@ -7,7 +7,7 @@ import shutil
 from amiyabot import GroupConfig
 from amiyabot.network.download import download_async
 
-from core import Message, Chain, AmiyaBotPluginInstance
+from core import bot as main_bot, Message, Chain, AmiyaBotPluginInstance
 from core.util import read_yaml, check_sentence_by_re, any_match
 from core.database.user import UserInfo, UserGachaInfo
 
@@ -125,6 +125,10 @@ async def user_info(data: Message):
 
     info = {'avatar': image, 'nickname': data.nickname, **UserInfo.get_user_info(data.user_id)}
 
+    # 抽卡插件的 BOX 已按干员分行保存，operator_box 中的旧字符串迁移后不再更新
+    if 'amiyabot-arknights-gacha' in main_bot.plugins:
+        info['box_summary'] = main_bot.plugins['amiyabot-arknights-gacha'].get_box_summary(data.user_id)
+
     return Chain(data).html(f'{curr_dir}/template/userInfo.html', info, width=700, height=300)
 
 
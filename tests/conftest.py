@@ -0,0 +1,17 @@
+import os
+import sys
+
+import pytest
+
+from helpers import plugins_dir, StubServer
+
+# 插件以包的形式导入（如 material.main），依赖 Amiya-Bot 的 core 的测试需在 Amiya-Bot 根目录下运行
+sys.path.insert(0, plugins_dir)
+
+
+@pytest.fixture
+def stub_server(tmp_path):
+    server = StubServer(str(tmp_path / 'www'))
+    os.makedirs(server.directory, exist_ok=True)
+    yield server
+    server.close()
@@ -0,0 +1,57 @@
+import os
+import threading
+import importlib.util
+
+from http.server import ThreadingHTTPServer, SimpleHTTPRequestHandler
+
+root_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+plugins_dir = os.path.join(root_dir, 'src', 'arknights')
+
+
+def load_module(name: str, path: str):
+    '''
+    按文件路径单独导入插件内不依赖 core 的模块，不触发插件的 __init__
+    '''
+    spec = importlib.util.spec_from_file_location(name, os.path.join(plugins_dir, path))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+
+    return module
+
+
+class StubServer:
+    '''
+    在临时目录上启动的本地静态文件服务，记录收到的请求路径
+    '''
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self.requests = []
+
+        server = self
+
+        class Handler(SimpleHTTPRequestHandler):
+            def __init__(self, *args, **kwargs):
+                super().__init__(*args, directory=directory, **kwargs)
+
+            def do_GET(self):
+                server.requests.append(self.path)
+                super().do_GET()
+
+            def log_message(self, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.url = f'http://127.0.0.1:{self.httpd.server_port}'
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+
+    def write(self, name: str, content: bytes):
+        path = os.path.join(self.directory, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, mode='wb') as file:
+            file.write(content)
+
+    def close(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
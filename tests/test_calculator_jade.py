@@ -0,0 +1,69 @@
+import time
+
+import pytest
+
+pytest.importorskip('core')
+
+from helpers import load_module
+
+jade = load_module('calculator_jade', 'calculator/jade.py')
+
+
+def calc_date(end_date: float):
+    # 原先逐天累加的写法，作为对照
+    now_time = jade.date_to_stamp(jade.stamp_to_date(int(time.time())))
+
+    dates = []
+
+    while now_time < end_date:
+        now_time += 86400
+        time_array = time.localtime(now_time)
+        dates.append({'dateStr': jade.stamp_to_date(now_time), 'weekDate': time_array.tm_wday})
+
+    return len(dates), len([item for item in dates if item['weekDate'] == 0])
+
+
+@pytest.fixture(params=['Asia/Shanghai', 'UTC'])
+def timezone(request, monkeypatch):
+    monkeypatch.setenv('TZ', request.param)
+    time.tzset()
+    yield request.param
+    monkeypatch.undo()
+    time.tzset()
+
+
+def local_stamp(text: str):
+    return time.mktime(time.strptime(text, '%Y-%m-%d %H:%M'))
+
+
+@pytest.mark.parametrize(
+    'now',
+    [
+        '2026-10-12 00:00',  # 周一零点
+        '2026-10-14 12:30',
+        '2026-10-18 23:59',  # 周日
+        '2026-12-31 08:00',
+    ],
+)
+def test_calc_date_matches_reference(timezone, monkeypatch, now):
+    now_stamp = local_stamp(now)
+    monkeypatch.setattr(time, 'time', lambda: now_stamp)
+
+    # 截止时间覆盖过去、当天和之后一年内的各个时刻
+    for hours in range(-30, 24 * 400, 11):
+        end_date = now_stamp + hours * 3600
+        assert jade.calc_date(end_date) == calc_date(end_date), (now, hours)
+
+
+def test_calc_result_totals(timezone, monkeypatch):
+    now_stamp = local_stamp('2026-10-14 12:30')
+    monkeypatch.setattr(time, 'time', lambda: now_stamp)
+
+    # 截止到下下周三零点：14 天，其中 2 个周一
+    result = jade.calc_result(local_stamp('2026-10-28 00:00'))
+
+    assert '预计得到 8800 合成玉' in result
+    assert '- 月卡签到共计：2800\n' in result
+    assert '- 每日任务共计：1400\n' in result
+    assert '- 每周任务共计：1000\n' in result
+    assert '- 剿灭行动共计：3600\n' in result
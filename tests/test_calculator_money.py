@@ -0,0 +1,106 @@
+from typing import List, Tuple
+
+import pytest
+
+from helpers import load_module
+
+money = load_module('calculator_money', 'calculator/money.py')
+
+
+def coin_change(coins: List[int], rem: int, count: List[int], money_list: List[List[int]]) -> Tuple[int, List[int]]:
+    # 原先的递归写法，作为对照
+    if rem < 0:
+        return -1, []
+
+    if rem == 0:
+        return 0, []
+
+    if count[rem - 1] != 0:
+        return count[rem - 1], money_list[rem - 1]
+
+    min_val = float('inf')
+    min_list = []
+
+    for coin in coins:
+        res = coin_change(coins, rem - coin, count, money_list)
+        if 0 <= res[0] <= min_val:
+            min_val = 1 + res[0]
+            min_list = res[1] + [coin]
+
+    count[rem - 1] = -1 if min_val == float('inf') else min_val
+    money_list[rem - 1] = [] if min_val == float('inf') else min_list
+
+    return count[rem - 1], money_list[rem - 1]
+
+
+@pytest.fixture(scope='module')
+def reference():
+    '''
+    原先每次计算都新建备忘录，结果只与金额有关，这里共用一份备忘录一次算出所有金额
+    '''
+    coins = sorted(money.recruit_map.keys())
+    count = [0] * money.max_money
+    money_list = [[] for _ in range(money.max_money)]
+
+    def calc(value: int):
+        if value > money.max_money:
+            return '博士，花费这个数额的计划比较长，请分开计算吧'
+
+        result = coin_change(coins, value, count, money_list)
+        if result[0] == -1:
+            return f'博士，无法凑出花费 {value} 龙门币的计划'
+        if result[0] > 10:
+            return '博士，花费这个数额的计划比较长，请分开计算吧'
+
+        text = f'博士，把 {value} 龙门币刚好花完，推荐 {result[0]} 次公招，分别是以下配置：\n\n'
+        for index in result[1]:
+            item = money.recruit_map[index]
+            text += f'{item.hour} 小时 {item.minute} 分钟，选 {item.tags} 个tag，花费 {item.price} 龙门币；\n'
+
+        return text
+
+    # 由小到大计算，避免递归过深
+    for value in range(0, money.max_money + 1, 100):
+        calc(value)
+
+    return calc
+
+
+def test_calc_money_matches_reference(reference):
+    mismatched = [value for value in range(0, money.max_money + 2) if money.calc_money(value) != reference(value)]
+
+    assert mismatched == []
+
+
+@pytest.mark.parametrize('value', [-1, -5, -140, -10000, -10001])
+def test_negative_money_cannot_be_made(value):
+    assert money.calc_money(value) == f'博士，无法凑出花费 {value} 龙门币的计划'
+
+
+def test_known_results():
+    assert money.calc_money(1) == '博士，无法凑出花费 1 龙门币的计划'
+    assert money.calc_money(140) == (
+        '博士，把 140 龙门币刚好花完，推荐 1 次公招，分别是以下配置：\n\n'
+        '1 小时 0 分钟，选 0 个tag，花费 140 龙门币；\n'
+    )
+    assert money.calc_money(10001) == '博士，花费这个数额的计划比较长，请分开计算吧'
+    assert money.calc_money(0).startswith('博士，把 0 龙门币刚好花完，推荐 0 次公招')
+
+
+def test_coin_table_counts():
+    coins = sorted(money.recruit_map.keys())
+
+    for value in range(0, money.max_money + 1):
+        count = money.coin_count[value]
+        if count == -1:
+            continue
+
+        prices = []
+        rem = value
+        while rem:
+            assert money.coin_last[rem] in coins
+            prices.append(money.coin_last[rem])
+            rem -= money.coin_last[rem]
+
+        assert len(prices) == count
+        assert sum(prices) == value
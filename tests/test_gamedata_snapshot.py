@@ -0,0 +1,75 @@
+import os
+import shutil
+
+import pytest
+
+pytest.importorskip('core')
+
+import arknightsGameData.builder.snapshot as snapshot
+from arknightsGameData.builder.snapshot import GameDataSnapshot
+
+
+@pytest.fixture
+def gamedata(tmp_path, monkeypatch):
+    path = tmp_path / 'gamedata'
+    path.mkdir()
+    (path / 'gamedata.zip').write_bytes(b'gamedata-v1')
+
+    monkeypatch.setattr(snapshot, 'gamedata_path', str(path))
+    monkeypatch.setattr(snapshot, 'snapshot_file', str(path / 'snapshot.pkl'))
+
+    return path
+
+
+@pytest.fixture
+def builder_copy(tmp_path, monkeypatch):
+    path = tmp_path / 'builder'
+    shutil.copytree(snapshot.curr_dir, path, ignore=shutil.ignore_patterns('__pycache__'))
+
+    monkeypatch.setattr(snapshot, 'curr_dir', str(path))
+
+    return path
+
+
+def test_source_hash_changes_with_builder_code(builder_copy):
+    before = snapshot.get_source_hash()
+    assert snapshot.get_source_hash() == before
+
+    with open(builder_copy / 'operatorBuilder.py', mode='a', encoding='utf-8') as file:
+        file.write('\n# changed\n')
+
+    assert snapshot.get_source_hash() != before
+
+
+def test_source_hash_ignores_other_files(builder_copy):
+    before = snapshot.get_source_hash()
+
+    (builder_copy / 'notes.txt').write_text('not code')
+    os.makedirs(builder_copy / '__pycache__', exist_ok=True)
+
+    assert snapshot.get_source_hash() == before
+
+
+def test_key_covers_code_version_and_data(gamedata):
+    key = GameDataSnapshot.get_key('v1')
+
+    assert key.startswith(snapshot.source_hash)
+    assert GameDataSnapshot.get_key('v1') == key
+    assert GameDataSnapshot.get_key('v2') != key
+
+    (gamedata / 'gamedata.zip').write_bytes(b'gamedata-v2')
+    assert GameDataSnapshot.get_key('v1') != key
+
+
+def test_snapshot_from_older_code_is_not_loaded(gamedata, monkeypatch):
+    key = GameDataSnapshot.get_key('v1')
+    GameDataSnapshot.save(key, {'operators': {'阿米娅': 1}})
+
+    assert GameDataSnapshot.load(key) == {'operators': {'阿米娅': 1}}
+
+    # 插件更新后构建代码变化，同一份游戏数据的快照也不再使用
+    monkeypatch.setattr(snapshot, 'source_hash', 'changed')
+    assert GameDataSnapshot.load(GameDataSnapshot.get_key('v1')) is None
+
+    GameDataSnapshot.remove()
+    assert not os.path.exists(snapshot.snapshot_file)
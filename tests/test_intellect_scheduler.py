@@ -0,0 +1,154 @@
+import time
+import asyncio
+
+import pytest
+
+pytest.importorskip('core')
+
+from peewee import SqliteDatabase, OperationalError
+
+import intellect.main as intellect_main
+from intellect.main import Intellect, IntellectScheduler
+
+
+class FlakyDatabase(SqliteDatabase):
+    '''
+    前几条 UPDATE 语句抛出连接错误，模拟数据库断开
+    '''
+
+    def __init__(self, *args, failures: int = 1, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.failures = failures
+
+    def execute_sql(self, sql, *args, **kwargs):
+        if sql.startswith('UPDATE') and self.failures:
+            self.failures -= 1
+            raise OperationalError('server has gone away')
+        return super().execute_sql(sql, *args, **kwargs)
+
+
+def record(user_id: str, full_time: int):
+    return {
+        'user_id': user_id,
+        'belong_id': 'bot',
+        'cur_num': 10,
+        'full_num': 135,
+        'full_time': full_time,
+        'message_type': 'channel',
+        'group_id': 'group',
+        'in_time': 0,
+        'status': 0,
+    }
+
+
+@pytest.fixture
+def now(monkeypatch):
+    clock = {'now': 1000}
+    monkeypatch.setattr(time, 'time', lambda: clock['now'])
+    return clock
+
+
+def test_pop_due_skips_stale_entries(now):
+    scheduler = IntellectScheduler()
+    scheduler.add(record('u1', 1000))
+    scheduler.add(record('u1', 2000))
+
+    # 重新记录后，旧的 1000 条目到期时被跳过
+    assert scheduler.pop_due() == []
+    assert scheduler.heap == [(2000, 'u1')]
+
+    now['now'] = 2000
+    assert [item['full_time'] for item in scheduler.pop_due()] == [2000]
+    assert scheduler.heap == [] and scheduler.pending == {}
+
+
+def test_pop_due_with_earlier_record(now):
+    scheduler = IntellectScheduler()
+    scheduler.add(record('u1', 2000))
+    scheduler.add(record('u1', 1000))
+
+    assert [item['full_time'] for item in scheduler.pop_due()] == [1000]
+
+    now['now'] = 2000
+    assert scheduler.pop_due() == []
+    assert scheduler.heap == []
+
+
+def test_pop_due_returns_users_due_in_the_same_second(now):
+    scheduler = IntellectScheduler()
+    for user_id in ['u3', 'u1', 'u2']:
+        scheduler.add(record(user_id, 1000))
+    scheduler.add(record('u4', 1001))
+    scheduler.add(record('u5', 900))
+
+    assert sorted(item['user_id'] for item in scheduler.pop_due()) == ['u1', 'u2', 'u3', 'u5']
+    assert scheduler.heap == [(1001, 'u4')]
+
+    now['now'] = 1001
+    assert [item['user_id'] for item in scheduler.pop_due()] == ['u4']
+
+
+def test_wait_timeout_is_the_next_full_time(now, monkeypatch):
+    scheduler = IntellectScheduler()
+    assert scheduler.next_timeout() is None
+
+    scheduler.add(record('u1', 1300))
+    scheduler.add(record('u2', 1120))
+    assert scheduler.next_timeout() == 120
+
+    timeouts = []
+
+    async def wait_for(coroutine, timeout):
+        coroutine.close()
+        timeouts.append(timeout)
+        raise asyncio.CancelledError
+
+    monkeypatch.setattr(intellect_main.asyncio, 'wait_for', wait_for)
+
+    with pytest.raises(asyncio.CancelledError):
+        asyncio.run(scheduler.run())
+
+    assert timeouts == [120]
+
+
+def test_failed_update_is_retried(monkeypatch):
+    database = Intellect._meta.database
+    db = FlakyDatabase(':memory:')
+
+    Intellect.bind(db)
+    db.create_tables([Intellect])
+
+    errors = []
+    sent = []
+
+    async def send(semaphore, item):
+        sent.append(item['user_id'])
+
+    monkeypatch.setattr(intellect_main.log, 'error', lambda e, desc=None, **kwargs: errors.append(desc))
+
+    try:
+        scheduler = IntellectScheduler(retry_interval=0.01)
+        scheduler.send = send
+
+        past = int(time.time()) - 10
+        for user_id in ['u1', 'u2']:
+            Intellect.create(**record(user_id, past))
+            scheduler.add(record(user_id, past))
+
+        async def run():
+            scheduler.task = asyncio.create_task(scheduler.run())
+            for _ in range(100):
+                if sent:
+                    break
+                await asyncio.sleep(0.01)
+            scheduler.stop()
+
+        asyncio.run(run())
+
+        # 第一次写入状态失败，记录放回堆中，重试时才发送提醒，且只发送一次
+        assert errors == ['intellect scheduler error:']
+        assert sorted(sent) == ['u1', 'u2']
+        assert [item.status for item in Intellect.select()] == [1, 1]
+        assert scheduler.heap == [] and scheduler.pending == {}
+    finally:
+        Intellect.bind(database)
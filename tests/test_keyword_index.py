@@ -0,0 +1,71 @@
+import random
+
+import pytest
+
+from helpers import load_module
+
+KeywordIndex = load_module('gamedata_keyword_index', 'arknightsGameData/builder/keywordIndex.py').KeywordIndex
+
+
+def get_longest(text: str, items: list):
+    # 与 operatorArchives.operatorCore.get_longest 一致，旧的干员查询逐个比较关键词
+    res = ''
+    for item in items:
+        if item in text and len(item) >= len(res):
+            res = item
+
+    return res
+
+
+def any_match(text: str, items: list):
+    for item in items:
+        if item in text:
+            return item
+
+
+keywords = ['阿米娅', '阿米', '米娅', '能天使', '天使', '新约能天使', '陈', '假日威龙陈', '阿米娅', '娅']
+
+longest_cases = [
+    '兔兔查看阿米娅的资料',
+    '兔兔查看新约能天使',
+    '能天使和阿米娅',
+    '查看假日威龙陈的皮肤',
+    '陈',
+    '米娅',
+    '没有关键词',
+    '',
+]
+
+
+@pytest.mark.parametrize('text', longest_cases)
+def test_longest_matches_get_longest(text):
+    assert KeywordIndex(keywords).longest(text) == get_longest(text, keywords)
+
+
+@pytest.mark.parametrize('text', longest_cases)
+def test_first_matches_any_match(text):
+    assert KeywordIndex(keywords).first(text) == any_match(text, keywords)
+
+
+def test_longest_prefers_later_keyword_of_same_length():
+    assert KeywordIndex(['天使', '阿米']).longest('阿米和天使') == '阿米'
+    assert KeywordIndex(['天使', '阿米', '天使']).longest('阿米和天使') == '天使'
+
+
+def test_random_keywords_match_references():
+    random.seed(2024)
+    chars = '阿米娅能天使陈'
+
+    for _ in range(200):
+        words = [''.join(random.choices(chars, k=random.randint(1, 3))) for _ in range(8)]
+        text = ''.join(random.choices(chars, k=10))
+        index = KeywordIndex(words)
+
+        assert index.longest(text) == get_longest(text, words), (words, text)
+        assert index.first(text) == any_match(text, words), (words, text)
+
+
+def test_find_all_reports_positions():
+    index = KeywordIndex(['阿米', '阿米娅', '娅'])
+
+    assert sorted(index.find_all('阿米娅阿米')) == [(0, '阿米'), (0, '阿米娅'), (2, '娅'), (3, '阿米')]
@@ -0,0 +1,134 @@
+import json
+import asyncio
+
+import pytest
+
+pytest.importorskip('core')
+
+from peewee import SqliteDatabase
+
+import material.main as material_main
+from material.main import MaterialData, YituliuData
+
+
+class RecordingDatabase(SqliteDatabase):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.statements = []
+
+    def execute_sql(self, sql, *args, **kwargs):
+        self.statements.append(sql)
+        return super().execute_sql(sql, *args, **kwargs)
+
+    def writes(self):
+        return [sql for sql in self.statements if sql.split()[0].upper() in ('INSERT', 'UPDATE', 'DELETE')]
+
+
+def stage(item_id: str, code: str, efficiency: float):
+    return {
+        'itemId': item_id,
+        'stageCode': code,
+        'sampleConfidence': 99.0,
+        'stageEfficiency': efficiency,
+        'apExpect': 20.5,
+        'knockRating': 0.5,
+    }
+
+
+def payload(groups):
+    return json.dumps({'data': groups}).encode()
+
+
+t3_groups = [
+    [stage('30013', '1-7', 100.0), stage('30013', 'S3-1', 98.5)],
+    [stage('30063', '4-4', 101.2), stage('30063', 'R8-1', 97.0)],
+]
+t2_groups = [
+    [stage('30062', '3-1', 95.0)],
+]
+
+
+@pytest.fixture
+def yituliu(stub_server, monkeypatch):
+    database = YituliuData._meta.database
+    db = RecordingDatabase(':memory:')
+
+    YituliuData.bind(db)
+    db.create_tables([YituliuData])
+
+    stub_server.write('t3', payload(t3_groups))
+    stub_server.write('t2', payload(t2_groups))
+
+    monkeypatch.setattr(material_main, 'yituliu_t3', f'{stub_server.url}/t3')
+    monkeypatch.setattr(material_main, 'yituliu_t2', f'{stub_server.url}/t2')
+    monkeypatch.setattr(MaterialData, 'yituliu_hash', '')
+    monkeypatch.setattr(MaterialData, 'yituliu_index', {})
+
+    yield db
+
+    YituliuData.bind(database)
+
+
+def sync():
+    asyncio.run(MaterialData.save_yituliu_data())
+
+
+def rows():
+    return sorted(
+        (item.materialId, item.stageId, item.stageEfficiency) for item in YituliuData.select().order_by(YituliuData.id)
+    )
+
+
+def test_first_sync_inserts_all_rows(yituliu):
+    sync()
+
+    assert len(rows()) == 5
+    assert [n['stageId'] for n in MaterialData.yituliu_index['30063']] == ['4-4', 'R8-1']
+
+
+def test_second_sync_of_same_payload_makes_no_writes(yituliu, stub_server):
+    sync()
+    yituliu.statements.clear()
+
+    sync()
+
+    assert len(stub_server.requests) == 4
+    assert yituliu.writes() == []
+    assert len(rows()) == 5
+
+
+def test_unchanged_payload_diff_makes_no_writes(yituliu):
+    sync()
+    before = rows()
+
+    # 跳过内容哈希的判断，确认逐行比较后同样没有写入
+    MaterialData.yituliu_hash = ''
+    yituliu.statements.clear()
+
+    sync()
+
+    assert yituliu.writes() == []
+    assert rows() == before
+
+
+def test_changed_payload_uses_bulk_writes(yituliu, stub_server):
+    sync()
+
+    changed = [
+        [stage('30013', '1-7', 110.0), stage('30013', 'S3-1', 98.5), stage('30013', 'S4-1', 90.0)],
+        [stage('30063', '4-4', 101.2)],
+    ]
+    stub_server.write('t3', payload(changed))
+    yituliu.statements.clear()
+
+    sync()
+
+    writes = [sql.split()[0].upper() for sql in yituliu.writes()]
+    assert sorted(writes) == ['DELETE', 'INSERT', 'UPDATE']
+    assert rows() == [
+        ('30013', '1-7', 110.0),
+        ('30013', 'S3-1', 98.5),
+        ('30013', 'S4-1', 90.0),
+        ('30062', '3-1', 95.0),
+        ('30063', '4-4', 101.2),
+    ]
@@ -0,0 +1,175 @@
+import os
+import sys
+import asyncio
+import hashlib
+import threading
+
+from io import BytesIO
+from PIL import Image
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip('core')
+
+from helpers import load_module
+
+ocr_service = load_module('recruit_ocr_service', 'recruit/ocrService.py')
+OcrService = ocr_service.OcrService
+FakeBackend = ocr_service.FakeBackend
+WindowsBackend = ocr_service.WindowsBackend
+
+
+def message(img: bytes):
+    return SimpleNamespace(image=[img])
+
+
+def scripted(results: dict, calls: list = None):
+    def ocr(img: bytes):
+        if calls is not None:
+            calls.append(img)
+        return results.get(img, '')
+
+    return ocr
+
+
+def test_empty_result_falls_back_to_next_backend():
+    first = FakeBackend(scripted({}), batch_window=0)
+    second = FakeBackend(scripted({b'img': '高级资深干员'}), batch_window=0)
+    service = OcrService([first, second])
+
+    assert asyncio.run(service.recognize(message(b'img'))) == '高级资深干员'
+    assert first.stats()['calls'] == 1 and first.stats()['hits'] == 0
+    assert second.stats()['calls'] == 1 and second.stats()['hits'] == 1
+
+    service.close()
+
+
+def test_error_falls_back_to_next_backend():
+    def broken(img: bytes):
+        raise RuntimeError('engine crashed')
+
+    first = FakeBackend(broken, batch_window=0)
+    second = FakeBackend(scripted({b'img': '狙击干员'}), batch_window=0)
+    service = OcrService([first, second])
+
+    assert asyncio.run(service.recognize(message(b'img'))) == '狙击干员'
+    assert first.stats()['errors'] == 1
+
+    service.close()
+
+
+def test_timeout_falls_back_to_next_backend():
+    release = threading.Event()
+
+    def slow(img: bytes):
+        release.wait(5)
+        return '资深干员'
+
+    first = FakeBackend(slow, batch_window=0)
+    second = FakeBackend(scripted({b'img': '狙击干员'}), batch_window=0)
+    service = OcrService([first, second], timeout=0.05)
+
+    async def run():
+        result = await service.recognize(message(b'img'))
+
+        # 超时后工作线程仍在执行，放行后等待回调完成，晚到的结果不会再写回
+        release.set()
+        await asyncio.sleep(0.1)
+
+        return result
+
+    assert asyncio.run(run()) == '狙击干员'
+    assert first.stats()['timeouts'] == 1 and first.stats()['hits'] == 0
+    assert service.cache == {hashlib.md5(b'img').hexdigest(): '狙击干员'}
+
+    service.close()
+
+
+def test_cache_hits_and_eviction():
+    calls = []
+    backend = FakeBackend(scripted({b'a': 'A', b'b': 'B', b'c': 'C'}, calls), batch_window=0)
+    service = OcrService([backend], cache_size=2)
+
+    async def run():
+        return [await service.recognize(message(img)) for img in [b'a', b'b', b'a', b'c', b'a', b'b']]
+
+    assert asyncio.run(run()) == ['A', 'B', 'A', 'C', 'A', 'B']
+
+    # 第二次查询 a 后 a 成为最近使用，加入 c 时淘汰的是 b
+    assert calls == [b'a', b'b', b'c', b'b']
+    assert service.stats()['calls'] == 6
+    assert service.stats()['cache_hits'] == 2
+    assert list(service.cache.values()) == ['A', 'B']
+
+    service.close()
+
+
+def test_empty_result_is_not_cached():
+    calls = []
+    backend = FakeBackend(scripted({}, calls), batch_window=0)
+    service = OcrService([backend])
+
+    async def run():
+        return [await service.recognize(message(b'img')) for _ in range(2)]
+
+    assert asyncio.run(run()) == ['', '']
+    assert calls == [b'img', b'img']
+    assert service.cache_hits == 0
+
+    service.close()
+
+
+def test_concurrent_calls_share_one_worker_pass():
+    calls = []
+    backend = FakeBackend(scripted({b'a': 'A', b'b': 'B', b'c': 'C'}, calls), batch_size=8, batch_window=0.05)
+    service = OcrService([backend])
+
+    async def run():
+        return await asyncio.gather(*[service.recognize(message(img)) for img in [b'a', b'b', b'a', b'c']])
+
+    assert asyncio.run(run()) == ['A', 'B', 'A', 'C']
+
+    # 一批之内相同的图片只识别一次
+    assert backend.worker.batches == 1
+    assert calls == [b'a', b'b', b'c']
+
+    service.close()
+
+
+def test_full_batch_flushes_without_waiting():
+    backend = FakeBackend(scripted({b'a': 'A', b'b': 'B'}), batch_size=2, batch_window=10)
+    service = OcrService([backend])
+
+    async def run():
+        return await asyncio.wait_for(
+            asyncio.gather(service.recognize(message(b'a')), service.recognize(message(b'b'))), 1
+        )
+
+    assert asyncio.run(run()) == ['A', 'B']
+    assert backend.worker.batches == 1
+    assert backend.worker.timer is None
+
+    service.close()
+
+
+@pytest.mark.skipif(sys.platform == 'win32', reason='用 Python 脚本代替 Windows.Media.Ocr.Cli')
+def test_windows_backend_passes_a_png_and_removes_it(tmp_path):
+    exe_path = tmp_path / 'ocr-cli'
+    exe_path.write_text(
+        f'#!{sys.executable}\n'
+        'import sys\n'
+        'with open(sys.argv[1], mode="rb") as file:\n'
+        '    print(sys.argv[1].endswith(".png") and file.read(8) == b"\\x89PNG\\r\\n\\x1a\\n")\n'
+    )
+    exe_path.chmod(0o755)
+
+    buffer = BytesIO()
+    Image.new('RGB', (8, 8)).save(buffer, 'JPEG')
+
+    backend = WindowsBackend(str(exe_path), str(tmp_path))
+
+    assert backend.ocr(buffer.getvalue()) == 'True'
+    assert os.listdir(tmp_path) == ['ocr-cli']
+
+    backend.close()
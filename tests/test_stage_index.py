@@ -0,0 +1,115 @@
+import os
+import re
+import json
+
+import pytest
+
+from helpers import plugins_dir, load_module
+
+KeywordIndex = load_module('gamedata_keyword_index', 'arknightsGameData/builder/keywordIndex.py').KeywordIndex
+segment = load_module('stage_index', 'stage/stageIndex.py').segment
+
+with open(os.path.join(plugins_dir, 'stage/sxys.json'), mode='r', encoding='utf-8') as f:
+    sxys_maps: dict = json.load(f)
+
+sxys_titles = list(sxys_maps.keys()) + [re.sub(r'[^\w-]', '', item) for item in sxys_maps.keys()]
+
+
+def any_match(text: str, items: list):
+    # 与 core.util.any_match 一致，旧的地图查询逐个调用它
+    for item in items:
+        if item in text:
+            return item
+
+
+first_cases = (
+    [f'兔兔地图{title}' for title in sxys_titles]
+    + [f'地图 {title} 怎么打' for title in sxys_titles]
+    + [
+        '地图寻觅道路和丢失的订单',
+        '地图丢失的订单和寻觅道路',
+        '地图失落的“长生军”',
+        '地图失落的长生军',
+        '地图“金库”',
+        '地图金库',
+        '地图别塔卜-阿帕卡里',
+        '地图别塔卜阿帕卡里',
+        '地图1-7',
+        '地图',
+        '',
+    ]
+)
+
+
+@pytest.mark.parametrize('text', first_cases)
+def test_first_matches_any_match(text):
+    index = KeywordIndex(sxys_titles)
+
+    assert index.first(text) == any_match(text, sxys_titles)
+
+
+def test_first_prefers_earlier_keyword():
+    index = KeywordIndex(['长生军', '失落的“长生军”', '失落的长生军'])
+
+    assert index.first('地图失落的“长生军”') == '长生军'
+    assert index.first('地图失落的长生军') == '长生军'
+
+
+# 与 Stage.init_stages 相同：关卡代号和关卡名去掉难度后缀，再加上活动名
+stage_keywords = [
+    '0-1',
+    '1-1',
+    '1-7',
+    '1-10',
+    'S3-1',
+    '3-1',
+    'CF-9',
+    'CF-10',
+    '暴君',
+    '二次感染',
+    'H5-4',
+    '骑兵与猎人',
+    '将进酒',
+    'IW-8',
+    '风雪过境',
+]
+
+segment_cases = [
+    ('地图1-7', ['1-7']),
+    ('关卡1-7突袭', ['1-7']),
+    ('关卡1-10', ['1-10']),
+    ('关卡S3-1', ['S3-1']),
+    ('关卡3-1磨难', ['3-1']),
+    ('地图CF-9', ['CF-9']),
+    ('地图CF-10', ['CF-10']),
+    ('地图H5-4', ['H5-4']),
+    ('关卡暴君', ['暴君']),
+    ('关卡暴君困难', ['暴君']),
+    ('关卡二次感染剧情', ['二次感染']),
+    ('地图骑兵与猎人', ['骑兵与猎人']),
+    ('地图将进酒IW-8', ['将进酒', 'IW-8']),
+    ('地图风雪过境活动', ['风雪过境']),
+    ('关卡1-71-10', ['1-7', '1-10']),
+    ('地图2-1', []),
+    ('地图', []),
+]
+
+
+@pytest.mark.parametrize('text, words', segment_cases)
+def test_segment_stage_queries(text, words):
+    index = KeywordIndex(stage_keywords)
+
+    assert segment(index, text) == words
+
+
+def test_find_all_reports_overlapping_words():
+    index = KeywordIndex(['1-1', '1-10', '0-1'])
+
+    assert sorted(index.find_all('1-10-1')) == [(0, '1-1'), (0, '1-10'), (3, '0-1')]
+
+
+def test_empty_index():
+    index = KeywordIndex([])
+
+    assert index.first('地图1-7') is None
+    assert segment(index, '地图1-7') == []
@@ -0,0 +1,110 @@
+import os
+import asyncio
+
+import pytest
+
+pytest.importorskip('core')
+
+from helpers import load_module
+
+MapCache = load_module('stage_map_cache', 'stage/mapCache.py').MapCache
+KeywordIndex = load_module('gamedata_keyword_index', 'arknightsGameData/builder/keywordIndex.py').KeywordIndex
+
+
+@pytest.fixture
+def cache(stub_server, tmp_path):
+    cache_dir = tmp_path / 'maps'
+    cache_dir.mkdir()
+
+    return MapCache(str(cache_dir), stub_server.url + '/maps/')
+
+
+def test_concurrent_gets_share_one_download(cache, stub_server):
+    stub_server.write('maps/m1.jpg', b'map-1')
+
+    async def run():
+        return await asyncio.gather(*[cache.get('m1') for _ in range(8)])
+
+    paths = asyncio.run(run())
+
+    assert stub_server.requests == ['/maps/m1.jpg']
+    assert paths == [cache.path('m1')] * 8
+    assert cache.pending == {}
+    with open(cache.path('m1'), mode='rb') as file:
+        assert file.read() == b'map-1'
+
+    assert asyncio.run(cache.get('m1')) == cache.path('m1')
+    assert stub_server.requests == ['/maps/m1.jpg']
+    assert cache.stats() == {'hits': 1, 'downloads': 1, 'failures': 0}
+
+
+def test_failed_download_returns_none_and_leaves_no_file(cache, stub_server):
+    async def run():
+        return await asyncio.gather(cache.get('missing'), cache.get('missing'))
+
+    assert asyncio.run(run()) == [None, None]
+    assert stub_server.requests == ['/maps/missing.jpg']
+    assert os.listdir(cache.cache_dir) == []
+    assert cache.stats() == {'hits': 0, 'downloads': 1, 'failures': 1}
+
+    # 失败不会被缓存，下一次查询会重新下载
+    stub_server.write('maps/missing.jpg', b'map')
+    assert asyncio.run(cache.get('missing')) == cache.path('missing')
+    assert os.listdir(cache.cache_dir) == ['missing.jpg']
+
+
+def test_prefetch_skips_cached_keys(cache, stub_server):
+    for key in ['m1', 'm2', 'm3']:
+        stub_server.write(f'maps/{key}.jpg', key.encode())
+
+    with open(cache.path('m1'), mode='wb') as file:
+        file.write(b'cached')
+
+    asyncio.run(cache.prefetch(['m1', 'm2', 'm3', 'm2', 'm4'], concurrency=2))
+
+    assert sorted(stub_server.requests) == ['/maps/m2.jpg', '/maps/m3.jpg', '/maps/m4.jpg']
+    assert sorted(os.listdir(cache.cache_dir)) == ['m1.jpg', 'm2.jpg', 'm3.jpg']
+    with open(cache.path('m1'), mode='rb') as file:
+        assert file.read() == b'cached'
+
+    stub_server.requests.clear()
+    asyncio.run(cache.prefetch(['m1', 'm2', 'm3']))
+
+    assert stub_server.requests == []
+
+
+def test_init_stages_starts_one_prefetch_at_a_time(monkeypatch):
+    import stage.main as stage_main
+
+    Stage = stage_main.Stage
+
+    # 关键词自动机由游戏数据插件注册，这里单独注册
+    monkeypatch.setattr(stage_main.ArknightsGameDataResource, 'build_keyword_index', KeywordIndex, raising=False)
+    monkeypatch.setattr(stage_main.stage_config.maps, 'prefetch', True)
+    monkeypatch.setattr(Stage, 'prefetch_task', None)
+
+    async def run():
+        calls = []
+        release = asyncio.Event()
+
+        async def prefetch(keys, concurrency):
+            calls.append(keys)
+            await release.wait()
+
+        monkeypatch.setattr(stage_main.map_cache, 'prefetch', prefetch)
+
+        await Stage.init_stages()
+        await Stage.init_stages()
+        await asyncio.sleep(0)
+
+        assert len(calls) == 1
+
+        release.set()
+        await Stage.prefetch_task
+
+        await Stage.init_stages()
+        await Stage.prefetch_task
+
+        assert len(calls) == 2
+
+    asyncio.run(run())